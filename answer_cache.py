@@ -0,0 +1,172 @@
+"""
+Answer cache for stateless file search queries.
+
+Quick Reply buttons send fixed prompts, so several group members tapping the
+same button ask the exact same question of the same documents. Answers are
+cached per (store, document set version, normalized prompt); uploading or
+deleting a document bumps the store's version, which retires its answers.
+With a shared session backend the version lives there, so a bump on one
+worker retires the answers cached by every worker.
+"""
+
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from session_backend import SessionBackend
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = ' 。．.！!？?～~'
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt for cache lookup: NFKC (full/half width), case,
+    whitespace and trailing punctuation are ignored.
+    """
+    text = unicodedata.normalize('NFKC', prompt).lower()
+    text = _WHITESPACE.sub(' ', text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+
+class AnswerCache:
+    """
+    TTL + LRU cache of (answer text, citations) per store and prompt.
+
+    Features:
+    - Key includes a per-store document set version
+    - Version bump on upload/delete invalidates the store's answers
+    - Optional shared backend holding the versions for all workers
+    - Entries expire after a configurable TTL
+    - Bounded size with least-recently-used eviction
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_entries: int = 500, backend: Optional[SessionBackend] = None):
+        """
+        Initialize AnswerCache.
+
+        Args:
+            ttl_seconds: How long an answer stays valid
+            max_entries: Maximum cached answers
+            backend: Shared storage for document set versions; None keeps them in this process
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.backend = backend
+        self.versions: Dict[str, str] = {}  # store name -> document set version (no backend)
+        # (store, version, prompt) -> {text, citations, cached_at}
+        self.entries: "OrderedDict[Tuple[str, str, str], dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_key(store_name: str) -> str:
+        return f"docset:{store_name}"
+
+    async def version(self, store_name: str) -> Optional[str]:
+        """
+        Current document set version of a store.
+
+        Returns:
+            Version to pass to get()/set(), or None if the shared backend could
+            not be read (the cache is then bypassed)
+        """
+        if self.backend is None:
+            return self.versions.get(store_name, "0")
+        try:
+            return await self.backend.get(self._version_key(store_name)) or "0"
+        except Exception as e:
+            logger.warning("Could not read document set version of %s: %s", store_name, e)
+            return None
+
+    def get(self, store_name: str, prompt: str, version: Optional[str]) -> Optional[Tuple[str, List[dict]]]:
+        """
+        Get a cached answer.
+
+        Args:
+            store_name: Actual store name (fileSearchStores/...)
+            prompt: User prompt
+            version: Document set version from version()
+
+        Returns:
+            (text, citations), or None if missing or expired
+        """
+        if version is None:
+            self.misses += 1
+            return None
+        key = (store_name, version, normalize_prompt(prompt))
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry['cached_at'] >= self.ttl_seconds:
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry['text'], list(entry['citations'])
+
+    def set(
+        self,
+        store_name: str,
+        prompt: str,
+        text: str,
+        citations: List[dict],
+        version: Optional[str]
+    ):
+        """
+        Cache an answer.
+
+        Args:
+            store_name: Actual store name
+            prompt: User prompt
+            text: Answer text
+            citations: Citations shown with the answer
+            version: Document set version read before the query was sent, so an
+                     answer computed across an upload is filed under the old set
+        """
+        if version is None:
+            return
+        key = (store_name, version, normalize_prompt(prompt))
+        self.entries[key] = {
+            'text': text,
+            'citations': list(citations),
+            'cached_at': time.monotonic()
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def bump(self, store_name: str):
+        """
+        Mark a store's document set as changed (upload or delete).
+
+        Args:
+            store_name: Actual store name
+        """
+        # A fresh random version: concurrent bumps on two workers never collide
+        version = uuid.uuid4().hex
+        if self.backend is None:
+            self.versions[store_name] = version
+        else:
+            try:
+                # Outlives every answer cached under the previous version
+                await self.backend.set(self._version_key(store_name), version, self.ttl_seconds + 60)
+            except Exception as e:
+                logger.error("Could not publish document set version of %s: %s", store_name, e)
+        for key in [key for key in self.entries if key[0] == store_name]:
+            del self.entries[key]
+
+    def get_stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with hits, misses and cached answers
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
@@ -4,76 +4,104 @@ Chat Session Manager for Google ADK Chat Sessions.
 Manages conversation memory and context for each user.
 """
 
-from google import genai
+import asyncio
+import json
+import logging
+import uuid
+import weakref
 from google.genai import types
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from datetime import datetime
+from typing import Optional
+
+from gemini_client import AsyncGeminiClient
+from history_compactor import HistoryCompactor
+from session_backend import SessionBackend
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
 
 
 class ChatSessionManager:
     """
-    Manages Google ADK Chat Sessions for multiple users.
+    Manages Google ADK Chat Sessions for multiple users and groups.
 
     Features:
-    - Per-user session management
-    - Automatic session timeout (1 hour)
+    - Sessions keyed by (store, user), or one shared session per group
+    - Cached chat is rebuilt when its resolved File Search store changes
+    - Automatic session timeout (1 hour by default)
+    - Bounded memory: least recently used sessions are evicted at max_sessions
     - Optional File Search tool integration
-    - Session cleanup
+    - Background reaper for expired sessions
+    - Optional shared backend (SQLite/Redis): history is saved after each turn and
+      the chat is rebuilt from it on any worker
+    - Every save writes a unique version token, so a worker whose chat diverged
+      always notices another worker's save
+    - A failed backend read keeps the local chat and skips saving it, so a
+      transient error never overwrites the stored history
+    - Optional history compaction: old turns are summarized once over a token budget
     """
 
-    def __init__(self, client: genai.Client, model_name: str = "gemini-2.5-flash"):
+    def __init__(
+        self,
+        gemini: AsyncGeminiClient,
+        model_name: str = "gemini-2.5-flash",
+        max_sessions: int = 1000,
+        session_timeout_seconds: float = 3600,
+        backend: Optional[SessionBackend] = None,
+        compactor: Optional[HistoryCompactor] = None
+    ):
         """
         Initialize ChatSessionManager.
 
         Args:
-            client: Google GenAI client
+            gemini: Async Gemini access layer (chats are created through it)
             model_name: Model name to use for chat sessions
+            max_sessions: Maximum sessions kept in memory
+            session_timeout_seconds: Idle seconds before a session expires
+            backend: Shared session storage; None keeps sessions in this process only
+            compactor: Summarizes old turns of long sessions; None keeps full history
         """
-        self.client = client
+        self.gemini = gemini
         self.model_name = model_name
-        self.sessions: Dict[str, dict] = {}  # user_id -> {chat, last_active, store_name}
-        self.session_timeout = timedelta(hours=1)
+        self.backend = backend
+        self.compactor = compactor
+        self.session_timeout_seconds = session_timeout_seconds
+        # session_key -> {chat, created_at, store_name, enable_file_search, version, tokens_saved, unsynced}
+        self.sessions = SessionStore(
+            max_entries=max_sessions,
+            ttl_seconds=session_timeout_seconds,
+            on_remove=self._on_session_removed
+        )
+        # session_key -> lock held for a whole turn (entries vanish when unused)
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.metrics = {
+            'requests': 0,
+            'tokens_saved': 0,  # input tokens not replayed thanks to compaction, over all requests
+        }
 
-    def get_or_create_session(
-        self,
-        user_id: str,
-        store_name: str,
-        enable_file_search: bool = True
-    ):
+    @staticmethod
+    def _on_session_removed(session_key: str, session_data: dict, reason: str):
+        logger.info("Session %s: %s", reason, session_key)
+
+    @staticmethod
+    def make_session_key(store_name: str, user_id: Optional[str] = None) -> str:
         """
-        Get existing chat session or create a new one.
+        Build the session key for a chat.
 
         Args:
-            user_id: User ID for session management
-            store_name: File search store name (actual API name, not display name)
-            enable_file_search: Whether to enable File Search tool
+            store_name: Store display name of the chat (e.g. "group_xxx")
+            user_id: Speaker's user ID; None for one session shared by the whole chat
 
         Returns:
-            Chat session object
-        """
-        # Check if session exists and is still valid
-        if user_id in self.sessions:
-            session_data = self.sessions[user_id]
-            last_active = session_data['last_active']
-
-            # Check timeout
-            if datetime.now() - last_active < self.session_timeout:
-                # Session is still valid - update last_active and return
-                session_data['last_active'] = datetime.now()
-                print(f"[INFO] Reusing existing session for user: {user_id}")
-                return session_data['chat']
-            else:
-                # Session expired
-                print(f"[INFO] Session expired for user: {user_id}, creating new session")
-                del self.sessions[user_id]
+            "store_name:user_id", or store_name for a shared session
+        """
+        return f"{store_name}:{user_id}" if user_id else store_name
 
-        # Create new session
-        print(f"[INFO] Creating new chat session for user: {user_id}")
-        print(f"[INFO] File Search enabled: {enable_file_search}")
-        if enable_file_search:
-            print(f"[INFO] Using store: {store_name}")
+    @staticmethod
+    def _backend_key(session_key: str) -> str:
+        return f"session:{session_key}"
 
-        # Build config
+    def _build_config(self, store_name: str, enable_file_search: bool) -> types.GenerateContentConfig:
         tools = []
         if enable_file_search:
             # Add File Search tool
@@ -85,7 +113,7 @@ class ChatSessionManager:
                 )
             )
 
-        config = types.GenerateContentConfig(
+        return types.GenerateContentConfig(
             tools=tools if tools else None,
             temperature=0.7,
             system_instruction="""你是一個專業的文件分析助手。
@@ -106,74 +134,352 @@ class ChatSessionManager:
 - 提供簡潔但完整的回答"""
         )
 
-        # Create chat session
-        chat = self.client.chats.create(
+    def _create_chat(
+        self,
+        session_key: str,
+        store_name: str,
+        enable_file_search: bool,
+        history: Optional[list] = None,
+        created_at: Optional[datetime] = None,
+        version: Optional[str] = None,
+        tokens_saved: int = 0,
+        unsynced: bool = False
+    ):
+        # Create async chat session (send_message must be awaited)
+        chat = self.gemini.create_chat(
             model=self.model_name,
-            config=config
+            config=self._build_config(store_name, enable_file_search),
+            history=history or []
         )
 
         # Store session
-        self.sessions[user_id] = {
+        self.sessions.set(session_key, {
             'chat': chat,
-            'last_active': datetime.now(),
-            'store_name': store_name
-        }
+            'created_at': created_at or datetime.now(),
+            'store_name': store_name,
+            'enable_file_search': enable_file_search,
+            'version': version,
+            'tokens_saved': tokens_saved,
+            # Backend state unknown (failed read): do not save over it
+            'unsynced': unsynced
+        })
+        return chat
+
+    async def _load_from_backend(self, session_key: str) -> Optional[dict]:
+        """
+        Read a stored session.
+
+        Returns:
+            Stored session dict, or None if it expired or was cleared
+
+        Raises:
+            Exception: If the backend read fails (not a miss)
+        """
+        raw = await self.backend.get(self._backend_key(session_key))
+        return json.loads(raw) if raw else None
+
+    async def get_or_create_session(
+        self,
+        session_key: str,
+        store_name: str,
+        enable_file_search: bool = True
+    ):
+        """
+        Get existing chat session or create a new one.
+        With a shared backend, the chat is rebuilt from the stored history when
+        another worker has advanced the conversation since this one last saw it.
+        If the backend cannot be read, the local chat is used and not saved.
+
+        Args:
+            session_key: Session key from make_session_key()
+            store_name: File search store name (actual API name, not display name)
+            enable_file_search: Whether to enable File Search tool
+
+        Returns:
+            Async chat session object
+        """
+        # Reuse the session if it exists and has not timed out (refreshes last access)
+        session_data = self.sessions.get(session_key)
+        local_data = session_data
+        if session_data is not None and (
+            session_data['store_name'] != store_name
+            or session_data['enable_file_search'] != enable_file_search
+        ):
+            # Store was recreated (or File Search toggled): keep the conversation,
+            # rebuild the chat so the File Search tool points at the right store
+            logger.info("Store changed for session: %s, rebuilding chat", session_key)
+            if self.backend is None:
+                return self._create_chat(
+                    session_key,
+                    store_name,
+                    enable_file_search,
+                    history=session_data['chat'].get_history(curated=False),
+                    created_at=session_data['created_at'],
+                    version=session_data['version'],
+                    tokens_saved=session_data['tokens_saved']
+                )
+            # With a backend, the chat is rebuilt from the stored history below
+            session_data = None
+
+        if self.backend is not None:
+            try:
+                stored = await self._load_from_backend(session_key)
+            except Exception as e:
+                # Unknown, not a miss: keep this worker's chat and leave the stored one alone
+                logger.error("Failed to load session %s, continuing without saving: %s", session_key, e)
+                if local_data is None:
+                    return self._create_chat(session_key, store_name, enable_file_search, unsynced=True)
+                return self._create_chat(
+                    session_key,
+                    store_name,
+                    enable_file_search,
+                    history=local_data['chat'].get_history(curated=False),
+                    created_at=local_data['created_at'],
+                    version=local_data['version'],
+                    tokens_saved=local_data['tokens_saved'],
+                    unsynced=True
+                )
+            if stored is not None:
+                if session_data is not None and session_data['version'] == stored['version']:
+                    logger.debug("Reusing existing session: %s", session_key)
+                    session_data['unsynced'] = False
+                    return session_data['chat']
+
+                logger.info("Restoring session: %s (%s messages)", session_key, len(stored['history']))
+                return self._create_chat(
+                    session_key,
+                    store_name,
+                    enable_file_search,
+                    history=[types.Content.model_validate(content) for content in stored['history']],
+                    created_at=datetime.fromisoformat(stored['created_at']),
+                    version=stored['version'],
+                    tokens_saved=stored.get('tokens_saved', 0)
+                )
+            # Expired or cleared elsewhere: start over
+            session_data = None
+
+        if session_data is not None:
+            logger.debug("Reusing existing session: %s", session_key)
+            return session_data['chat']
 
-        print(f"[INFO] Chat session created successfully for user: {user_id}")
+        # Create new session
+        logger.info("Creating new chat session: %s", session_key)
+        logger.debug("File Search enabled: %s", enable_file_search)
+        if enable_file_search:
+            logger.debug("Using store: %s", store_name)
+
+        chat = self._create_chat(session_key, store_name, enable_file_search)
+
+        logger.info("Chat session created successfully: %s", session_key)
         return chat
 
-    def clear_session(self, user_id: str) -> bool:
+    async def save_session(self, session_key: str):
+        """
+        Persist a session's history to the shared backend under a new version token.
+        Call after each completed turn; no-op without a backend, and skipped
+        while the session could not be read from the backend.
+
+        Args:
+            session_key: Session key
+        """
+        if self.backend is None:
+            return
+        session_data = self.sessions.peek(session_key)
+        if session_data is None:
+            return
+        if session_data['unsynced']:
+            logger.warning("Not saving session %s: stored history could not be read", session_key)
+            return
+
+        # Unique per save: two workers saving the same chat never write the same version
+        session_data['version'] = uuid.uuid4().hex
+        payload = {
+            'store_name': session_data['store_name'],
+            'enable_file_search': session_data['enable_file_search'],
+            'created_at': session_data['created_at'].isoformat(),
+            'version': session_data['version'],
+            'tokens_saved': session_data['tokens_saved'],
+            'history': [
+                content.model_dump(mode='json', exclude_none=True)
+                for content in session_data['chat'].get_history(curated=False)
+            ]
+        }
+        try:
+            await self.backend.set(
+                self._backend_key(session_key),
+                json.dumps(payload, ensure_ascii=False),
+                self.session_timeout_seconds
+            )
+        except Exception as e:
+            logger.error("Failed to save session %s: %s", session_key, e)
+
+    def session_lock(self, session_key: str) -> asyncio.Lock:
+        """
+        Lock to hold from get_or_create_session() until end_turn(), so the
+        chat is not replaced by a compaction while a message is in flight.
+
+        Args:
+            session_key: Session key
+        """
+        lock = self._locks.get(session_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_key] = lock
+        return lock
+
+    async def end_turn(self, session_key: str):
+        """
+        Record a completed send_message and persist the session.
+
+        Args:
+            session_key: Session key
+        """
+        session_data = self.sessions.peek(session_key)
+        if session_data is not None:
+            self.metrics['requests'] += 1
+            self.metrics['tokens_saved'] += session_data['tokens_saved']
+        await self.save_session(session_key)
+
+    async def compact_session(self, session_key: str) -> bool:
+        """
+        Summarize old turns of a session if its history is over the token budget.
+        Safe to run in the background: turns added while summarizing are kept.
+
+        Args:
+            session_key: Session key
+
+        Returns:
+            True if the history was compacted
+        """
+        if self.compactor is None:
+            return False
+        session_data = self.sessions.peek(session_key)
+        if session_data is None:
+            return False
+
+        chat = session_data['chat']
+        history = chat.get_history(curated=False)
+        compacted = await self.compactor.compact(history)
+        if compacted is None:
+            return False
+
+        async with self.session_lock(session_key):
+            current = self.sessions.peek(session_key)
+            if current is None or current['chat'] is not chat:
+                return False  # Cleared or replaced while summarizing
+
+            saved = self.compactor.count_tokens(history) - self.compactor.count_tokens(compacted)
+            self._create_chat(
+                session_key,
+                current['store_name'],
+                current['enable_file_search'],
+                history=compacted + chat.get_history(curated=False)[len(history):],
+                created_at=current['created_at'],
+                version=current['version'],
+                tokens_saved=current['tokens_saved'] + max(0, saved),
+                unsynced=current['unsynced']
+            )
+            await self.save_session(session_key)
+        return True
+
+    async def clear_session(self, session_key: str) -> bool:
         """
         Clear chat session for a user.
 
         Args:
-            user_id: User ID
+            session_key: Session key
 
         Returns:
             True if session was cleared, False if no session existed
         """
-        if user_id in self.sessions:
-            del self.sessions[user_id]
-            print(f"[INFO] Cleared session for user: {user_id}")
+        existed = self.sessions.pop(session_key) is not None
+        if self.backend is not None:
+            try:
+                existed = await self._load_from_backend(session_key) is not None or existed
+            except Exception as e:
+                logger.error("Failed to load session %s: %s", session_key, e)
+            try:
+                await self.backend.delete(self._backend_key(session_key))
+            except Exception as e:
+                logger.error("Failed to clear session %s: %s", session_key, e)
+
+        if existed:
+            logger.info("Cleared session: %s", session_key)
             return True
-        print(f"[INFO] No session to clear for user: {user_id}")
+        logger.info("No session to clear: %s", session_key)
         return False
 
-    def get_session_info(self, user_id: str) -> Optional[dict]:
+    def get_session_info(self, session_key: str) -> Optional[dict]:
         """
         Get session information for a user.
 
         Args:
-            user_id: User ID
+            session_key: Session key
 
         Returns:
             Session info dict or None if no session exists
         """
-        if user_id in self.sessions:
-            session_data = self.sessions[user_id]
+        session_data = self.sessions.peek(session_key)
+        if session_data is not None:
             return {
                 'exists': True,
-                'last_active': session_data['last_active'],
+                'created_at': session_data['created_at'],
                 'store_name': session_data['store_name'],
-                'age_seconds': (datetime.now() - session_data['last_active']).total_seconds()
+                'age_seconds': self.sessions.idle_seconds(session_key)
             }
         return None
 
-    def cleanup_expired_sessions(self):
+    def cleanup_expired_sessions(self) -> int:
         """
         Remove expired sessions from memory.
-        Should be called periodically.
+        Runs periodically once start_reaper() has been called.
+
+        Returns:
+            Number of sessions removed
         """
-        now = datetime.now()
-        expired_users = []
+        return self.sessions.reap()
 
-        for user_id, session_data in self.sessions.items():
-            if now - session_data['last_active'] >= self.session_timeout:
-                expired_users.append(user_id)
+    def start_reaper(self, interval: float = 60):
+        """
+        Start the background task that removes expired sessions.
+
+        Args:
+            interval: Seconds between cleanup runs
+        """
+        self.sessions.start_reaper(interval)
+
+    async def stop_reaper(self):
+        """Stop the background cleanup task."""
+        await self.sessions.stop_reaper()
 
-        for user_id in expired_users:
-            del self.sessions[user_id]
-            print(f"[INFO] Cleaned up expired session for user: {user_id}")
+    @staticmethod
+    def _history_bytes(chat) -> int:
+        total = 0
+        for content in chat.get_history(curated=False):
+            for part in content.parts or []:
+                total += len(part.text or '')
+        return total
 
-        if expired_users:
-            print(f"[INFO] Cleaned up {len(expired_users)} expired sessions")
+    def get_stats(self) -> dict:
+        """
+        Get session gauges.
+
+        Returns:
+            Dict with active sessions, capacity, occupancy, evicted/expired counts,
+            the approximate size of all chat histories in bytes of text, and
+            requests / tokens saved by history compaction
+        """
+        stats = self.sessions.get_stats()
+        try:
+            stats['history_bytes'] = sum(
+                self._history_bytes(session_data['chat']) for session_data in self.sessions.values()
+            )
+        except Exception as e:
+            logger.warning("Failed to measure chat histories: %s", e)
+        stats.update(self.metrics)
+        stats['tokens_saved_per_request'] = (
+            self.metrics['tokens_saved'] / self.metrics['requests'] if self.metrics['requests'] else 0.0
+        )
+        if self.compactor is not None:
+            stats['compaction'] = self.compactor.get_stats()
+        return stats
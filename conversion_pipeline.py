@@ -0,0 +1,233 @@
+"""
+Document conversion pipeline.
+
+Legacy formats are registered once with their target format; converted outputs
+are cached on local disk by the SHA-256 of the source bytes, so re-sending the
+same file (to the same or another chat) skips LibreOffice entirely.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from conversion_service import LibreOfficeConverter
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Return the hex SHA-256 of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionPipeline:
+    """
+    Conversion stage keyed by source file extension.
+
+    Features:
+    - Pluggable rules: register('.xls', 'xlsx') is all a new format needs
+    - Content-addressed output cache on local disk
+    - Size-bounded LRU eviction of cached outputs
+    - Outputs handed out by cached_output() are pinned until released, so a
+      concurrent conversion never evicts a file that is being uploaded
+    """
+
+    def __init__(
+        self,
+        converter: LibreOfficeConverter,
+        cache_dir: str = "conversion_cache",
+        max_cache_bytes: int = 500 * 1024 * 1024
+    ):
+        """
+        Initialize ConversionPipeline.
+
+        Args:
+            converter: LibreOffice worker pool that performs cache misses
+            cache_dir: Directory holding cached converted outputs
+            max_cache_bytes: Total cache size before least recently used outputs are evicted
+        """
+        self.converter = converter
+        self.rules: Dict[str, dict] = {}  # source_ext -> {target_ext, timeout, ...}
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # cache file name -> number of callers using it (never evicted while > 0)
+        self.pinned: Dict[str, int] = {}
+
+        # cache file name -> size, oldest first (rebuilt from mtimes on startup)
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        cached_files = sorted(
+            (p for p in self.cache_dir.iterdir() if p.is_file()),
+            key=lambda p: p.stat().st_mtime
+        )
+        for path in cached_files:
+            self.entries[path.name] = path.stat().st_size
+        self.cache_bytes = sum(self.entries.values())
+
+    def register(self, source_ext: str, target_ext: str, timeout: float = 60, **metadata):
+        """
+        Register a conversion rule.
+
+        Args:
+            source_ext: Source extension with dot (e.g. ".doc")
+            target_ext: Target format without dot (e.g. "docx")
+            timeout: Seconds before a conversion is killed
+            **metadata: Extra fields returned by get_rule() (e.g. user-facing labels)
+        """
+        self.rules[source_ext.lower()] = {
+            'source_ext': source_ext.lower(),
+            'target_ext': target_ext,
+            'timeout': timeout,
+            **metadata
+        }
+
+    def get_rule(self, source_ext: str) -> Optional[dict]:
+        """Get the rule for a source extension, or None if no conversion is needed."""
+        return self.rules.get(source_ext.lower())
+
+    async def hash_file(self, path: Path) -> str:
+        """SHA-256 of a file, computed in a worker thread."""
+        return await asyncio.to_thread(sha256_file, path)
+
+    def _cache_key(self, digest: str, rule: dict) -> str:
+        return f"{digest}.{rule['target_ext']}"
+
+    def cached_output(self, digest: str, source_ext: str) -> Optional[Path]:
+        """
+        Get the cached converted output for these source bytes, counting a hit.
+        The returned file belongs to the cache; read it but do not delete it.
+        It stays pinned (not evicted) until release() is called with it.
+
+        Args:
+            digest: SHA-256 of the source bytes
+            source_ext: Source extension with dot (e.g. ".ppt")
+
+        Returns:
+            Path of the cached output, or None on a miss
+        """
+        rule = self.get_rule(source_ext)
+        if rule is None:
+            return None
+        key = self._cache_key(digest, rule)
+        if key not in self.entries or not (self.cache_dir / key).exists():
+            return None
+        self.cache_hits += 1
+        self._touch(key)
+        self.pinned[key] = self.pinned.get(key, 0) + 1
+        logger.info("Conversion cache hit (%s)", digest[:12])
+        return self.cache_dir / key
+
+    def release(self, path: Path):
+        """
+        Unpin an output returned by cached_output(); evictions deferred while
+        it was in use happen now.
+
+        Args:
+            path: Path returned by cached_output()
+        """
+        key = path.name
+        count = self.pinned.get(key, 0) - 1
+        if count > 0:
+            self.pinned[key] = count
+        else:
+            self.pinned.pop(key, None)
+            self._evict()
+
+    def _touch(self, key: str):
+        self.entries.move_to_end(key)
+        os.utime(self.cache_dir / key)
+
+    def _copy_into_cache(self, key: str, converted_path: Path) -> int:
+        shutil.copyfile(converted_path, self.cache_dir / key)
+        return (self.cache_dir / key).stat().st_size
+
+    def _record(self, key: str, size: int):
+        self.cache_bytes += size - self.entries.pop(key, 0)
+        self.entries[key] = size
+        self._evict()
+
+    def _evict(self):
+        # Oldest first, skipping outputs in use; the newest entry is always kept
+        for key in list(self.entries)[:-1]:
+            if self.cache_bytes <= self.max_cache_bytes:
+                break
+            if key in self.pinned:
+                continue
+            size = self.entries.pop(key)
+            self.cache_bytes -= size
+            try:
+                (self.cache_dir / key).unlink()
+            except FileNotFoundError:
+                pass
+            logger.info("Evicted cached conversion: %s", key)
+
+    async def convert(
+        self,
+        input_path: Path,
+        source_ext: str,
+        digest: Optional[str] = None
+    ) -> tuple[bool, Path | None, str]:
+        """
+        Convert a file according to its registered rule, using the cache when possible.
+        The converted file is written next to input_path; the caller owns it.
+
+        Args:
+            input_path: Source file
+            source_ext: Source extension with dot (e.g. ".ppt")
+            digest: SHA-256 of the source bytes, if already known
+
+        Returns:
+            (success, converted_path, message), as LibreOfficeConverter.convert
+        """
+        rule = self.get_rule(source_ext)
+        if rule is None:
+            return False, None, f"不支援的轉換格式：{source_ext}"
+
+        if digest is None:
+            digest = await self.hash_file(input_path)
+        key = self._cache_key(digest, rule)
+        output_path = input_path.parent / f"{input_path.stem}.{rule['target_ext']}"
+
+        if key in self.entries and (self.cache_dir / key).exists():
+            self.cache_hits += 1
+            self._touch(key)
+            await asyncio.to_thread(shutil.copyfile, self.cache_dir / key, output_path)
+            logger.info("Conversion cache hit for %s (%s)", input_path.name, digest[:12])
+            return True, output_path, "轉換成功（快取）"
+
+        self.cache_misses += 1
+        success, converted_path, message = await self.converter.convert(
+            input_path, rule['target_ext'], timeout=rule['timeout']
+        )
+        if success and converted_path:
+            try:
+                size = await asyncio.to_thread(self._copy_into_cache, key, converted_path)
+                self._record(key, size)
+            except Exception as e:
+                logger.warning("Failed to cache converted file: %s", e)
+        return success, converted_path, message
+
+    def get_stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with hits, misses, entries and total cached bytes
+        """
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'entries': len(self.entries),
+            'bytes': self.cache_bytes,
+        }
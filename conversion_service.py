@@ -0,0 +1,181 @@
+"""
+LibreOffice conversion service.
+
+Runs legacy Office conversions (.doc -> .docx, .ppt -> .pptx) as async
+subprocesses on a small pool of pre-warmed LibreOffice profiles, so a slow
+conversion never blocks the event loop and several can run in parallel.
+"""
+
+import asyncio
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LibreOfficeConverter:
+    """
+    Pool of LibreOffice worker slots with a concurrency cap.
+
+    Features:
+    - LibreOffice binary is discovered once, at construction
+    - Each slot has its own user profile, so slots can convert in parallel
+      (LibreOffice refuses to share a profile between running instances)
+    - Profiles are initialized up front by warm_up(), removing the first-run
+      profile creation cost from user requests
+    - A temp profile directory created by the converter is removed by close()
+    - Async API; conversions run as subprocesses outside the event loop
+    """
+
+    def __init__(self, num_workers: int = 2, profile_root: Optional[str] = None):
+        """
+        Initialize LibreOfficeConverter.
+
+        Args:
+            num_workers: Maximum concurrent conversions (one profile per worker)
+            profile_root: Directory for worker profiles (defaults to a temp dir,
+                          removed by close())
+        """
+        self.num_workers = max(1, num_workers)
+        self.binary = self._find_binary()
+        # Only a directory created here is deleted on close()
+        self.owns_profile_root = profile_root is None
+        self.profile_root = Path(profile_root or tempfile.mkdtemp(prefix="lo_profiles_"))
+        self.profiles: List[Path] = [
+            self.profile_root / f"worker_{i}" for i in range(self.num_workers)
+        ]
+        self._free_slots: Optional[asyncio.Queue] = None
+        self.warmed_up = False
+
+        if self.binary:
+            logger.info("LibreOffice found: %s (%s workers)", self.binary, self.num_workers)
+        else:
+            logger.warning("LibreOffice not found, .doc/.ppt conversion disabled")
+
+    @staticmethod
+    def _find_binary() -> Optional[str]:
+        for cmd in ('soffice', 'libreoffice'):
+            path = shutil.which(cmd)
+            if path:
+                return path
+        return None
+
+    @property
+    def available(self) -> bool:
+        """Whether LibreOffice is installed."""
+        return self.binary is not None
+
+    def _slots(self) -> asyncio.Queue:
+        if self._free_slots is None:
+            self._free_slots = asyncio.Queue()
+            for i in range(self.num_workers):
+                self._free_slots.put_nowait(i)
+        return self._free_slots
+
+    def _base_command(self, slot: int) -> List[str]:
+        return [
+            self.binary,
+            f"-env:UserInstallation={self.profiles[slot].as_uri()}",
+            '--headless',
+            '--norestore',
+            '--nolockcheck',
+        ]
+
+    async def _run(self, command: List[str], timeout: float) -> tuple[int, str]:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, (stderr or stdout or b"").decode(errors='replace')
+
+    async def warm_up(self):
+        """
+        Create every worker profile ahead of the first conversion.
+        Safe to run in the background at startup.
+        """
+        if not self.available or self.warmed_up:
+            return
+
+        async def init_profile(slot: int):
+            try:
+                await self._run(self._base_command(slot) + ['--terminate_after_init'], timeout=120)
+            except Exception as e:
+                logger.warning("LibreOffice worker %s warm-up failed: %s", slot, e)
+
+        await asyncio.gather(*(init_profile(i) for i in range(self.num_workers)))
+        self.warmed_up = True
+        logger.info("LibreOffice workers warmed up: %s", self.num_workers)
+
+    async def close(self):
+        """
+        Remove the worker profiles if they live in a temp dir created by this converter.
+        Call on shutdown, after conversions have finished.
+        """
+        if self.owns_profile_root:
+            await asyncio.to_thread(shutil.rmtree, self.profile_root, ignore_errors=True)
+            self.warmed_up = False
+
+    async def convert(self, input_path: Path, target_ext: str, timeout: float = 60) -> tuple[bool, Path | None, str]:
+        """
+        Convert a file with LibreOffice.
+
+        Args:
+            input_path: Source file
+            target_ext: Target format without dot (e.g. "docx", "pptx")
+            timeout: Seconds before the conversion is killed
+
+        Returns:
+            (success, converted_path, message):
+                - success: True if conversion succeeded
+                - converted_path: Path to the converted file (or None if failed)
+                - message: Status or error message
+        """
+        if not self.available:
+            return False, None, "LibreOffice 未安裝"
+
+        # Prepare output directory and expected output file path
+        output_dir = input_path.parent
+        expected_output = output_dir / f"{input_path.stem}.{target_ext}"
+
+        # Remove existing output file if it exists
+        if expected_output.exists():
+            expected_output.unlink()
+
+        slots = self._slots()
+        slot = await slots.get()
+        try:
+            logger.info("Converting %s to .%s using LibreOffice worker %s...", input_path.name, target_ext, slot)
+            returncode, output = await self._run(
+                self._base_command(slot) + [
+                    '--convert-to', target_ext,
+                    '--outdir', str(output_dir),
+                    str(input_path)
+                ],
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return False, None, "轉換超時（檔案可能太大或內容複雜）"
+        except Exception as e:
+            logger.error("Exception during conversion: %s", e)
+            return False, None, f"轉換錯誤：{str(e)}"
+        finally:
+            slots.put_nowait(slot)
+
+        # Check if conversion succeeded
+        if returncode == 0 and expected_output.exists():
+            logger.info("Converted to: %s", expected_output.name)
+            return True, expected_output, "轉換成功"
+
+        error_msg = output or "未知錯誤"
+        logger.error("Conversion failed: %s", error_msg)
+        return False, None, f"轉換失敗：{error_msg}"
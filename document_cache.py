@@ -0,0 +1,153 @@
+"""
+Per-store document manifest cache.
+
+Keeps complete document lists (or, for the "no documents" check before every
+question, just the fact that a store has documents) in memory so that neither
+the check nor the file carousel needs a REST round trip each time.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+
+class DocumentCache:
+    """
+    TTL cache of document lists keyed by store display name.
+
+    Features:
+    - Entries expire after a configurable TTL
+    - Empty lists expire sooner: in a multi-worker deployment another worker may
+      receive the upload, and "no documents" must not stick for the full TTL
+    - "Has documents" flags for stores whose full list was never fetched,
+      with the same TTL as lists; uploads set them, deletes and invalidation clear them
+    - Explicit invalidation per store
+    - In-place updates after successful uploads and deletes
+    """
+
+    def __init__(self, ttl_seconds: float = 300, empty_ttl_seconds: float = 10):
+        """
+        Initialize DocumentCache.
+
+        Args:
+            ttl_seconds: How long a fetched document list stays valid
+            empty_ttl_seconds: How long an empty document list stays valid
+        """
+        self.ttl_seconds = ttl_seconds
+        self.empty_ttl_seconds = min(empty_ttl_seconds, ttl_seconds)
+        self.entries: Dict[str, dict] = {}  # store_name -> {documents, fetched_at}
+        self.nonempty: Dict[str, float] = {}  # store_name -> when a document was last seen
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, store_name: str) -> Optional[List[dict]]:
+        """
+        Get the cached document list for a store.
+
+        Args:
+            store_name: Store display name (e.g. "user_xxx")
+
+        Returns:
+            Copy of the document list, or None if missing or expired
+        """
+        entry = self.entries.get(store_name)
+        if entry is None:
+            self.misses += 1
+            return None
+        ttl_seconds = self.ttl_seconds if entry['documents'] else self.empty_ttl_seconds
+        if time.monotonic() - entry['fetched_at'] >= ttl_seconds:
+            del self.entries[store_name]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(entry['documents'])
+
+    def has_documents(self, store_name: str) -> Optional[bool]:
+        """
+        Whether a store has documents, from its cached list or "has documents" flag.
+
+        Args:
+            store_name: Store display name
+
+        Returns:
+            True/False, or None if unknown (missing or expired)
+        """
+        if store_name in self.entries:
+            documents = self.get(store_name)
+            if documents is not None:
+                return len(documents) > 0
+        seen_at = self.nonempty.get(store_name)
+        if seen_at is not None and time.monotonic() - seen_at < self.ttl_seconds:
+            self.hits += 1
+            return True
+        self.nonempty.pop(store_name, None)
+        self.misses += 1
+        return None
+
+    def mark_has_documents(self, store_name: str):
+        """
+        Record that a store has at least one document, without its full list.
+
+        Args:
+            store_name: Store display name
+        """
+        self.nonempty[store_name] = time.monotonic()
+
+    def set(self, store_name: str, documents: List[dict]):
+        """
+        Store a freshly fetched document list.
+
+        Args:
+            store_name: Store display name
+            documents: Document info dicts from DocumentLister
+        """
+        self.entries[store_name] = {
+            'documents': list(documents),
+            'fetched_at': time.monotonic()
+        }
+        self.nonempty.pop(store_name, None)
+
+    def add_document(self, store_name: str, document: dict):
+        """
+        Add an uploaded document to a cached store list.
+        If the list isn't cached (the next list fetches it), only flags the store
+        as having documents.
+
+        Args:
+            store_name: Store display name
+            document: Document info dict
+        """
+        entry = self.entries.get(store_name)
+        if entry is None:
+            self.mark_has_documents(store_name)
+            return
+        entry['documents'] = [d for d in entry['documents'] if d['name'] != document['name']]
+        entry['documents'].append(document)
+
+    def remove_document(self, document_name: str) -> bool:
+        """
+        Remove a deleted document from whichever cached store holds it.
+        "Has documents" flags are all dropped: the document may have been the last one.
+
+        Args:
+            document_name: Full document name (fileSearchStores/.../documents/...)
+
+        Returns:
+            True if a cached entry was updated
+        """
+        self.nonempty.clear()
+        for entry in self.entries.values():
+            remaining = [d for d in entry['documents'] if d['name'] != document_name]
+            if len(remaining) != len(entry['documents']):
+                entry['documents'] = remaining
+                return True
+        return False
+
+    def invalidate(self, store_name: str):
+        """
+        Drop the cached list and "has documents" flag for a store.
+
+        Args:
+            store_name: Store display name
+        """
+        self.entries.pop(store_name, None)
+        self.nonempty.pop(store_name, None)
@@ -0,0 +1,199 @@
+"""
+Precomputed per-document insights.
+
+After a document finishes indexing, its summary and key points are generated
+off the request path and stored here, so the "生成檔案摘要" / "重點整理"
+Quick Reply buttons and "what is this file about" questions are answered
+with a lookup instead of a File Search query.
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from answer_cache import normalize_prompt
+from sqlite_db import SQLiteDatabase
+
+# What is left of a "what is this file about" question once the file name and
+# filler words are removed (spaces and apostrophes removed too). Anything else,
+# e.g. "合約第三條在說什麼", is a real question and goes to the model.
+SUMMARY_QUESTIONS = {
+    '在講什麼', '在說什麼', '講什麼', '說什麼', '是在講什麼', '主要在講什麼', '主要在說什麼',
+    '內容是什麼', '是什麼內容', '關於什麼', '是關於什麼', '摘要', '大意',
+    'summary', 'summarize', 'summarise', 'whatisabout', 'whatsabout', 'tellabout',
+}
+
+# Words around the file name that do not change what is asked
+_FILLER = re.compile(
+    r"請問|請|幫我|可以|告訴我|生成|一下|這個|這份|檔案|文件|的"
+    r"|\b(?:please|can|could|you|me|the|this|file|document|of|a)\b"
+    r"|[\s「」『』《》〈〉\"“”'`:：,，?!]"
+)
+
+# Shorter file name stems ("ai" of "ai.pdf") only match with their extension
+MIN_ASCII_STEM = 3
+MIN_STEM = 2
+
+
+def _remove_name(text: str, name: str) -> Optional[str]:
+    """
+    Remove the first occurrence of a file name from text.
+    ASCII names must stand alone ("ai" does not match inside "training").
+
+    Returns:
+        Text without the name, or None if the name does not occur
+    """
+    if name.isascii():
+        match = re.search(rf"(?<![a-z0-9_]){re.escape(name)}(?![a-z0-9_])", text)
+    else:
+        match = re.search(re.escape(name), text)
+    if match is None:
+        return None
+    return f"{text[:match.start()]} {text[match.end():]}"
+
+
+def is_summary_question(question: str, display_name: str) -> bool:
+    """
+    Whether a question only asks what a file is about, naming it by its
+    file name or (if long enough) its stem.
+
+    Args:
+        question: Normalized question (see normalize_prompt)
+        display_name: File name shown to users, e.g. "季報.pdf"
+    """
+    stem = Path(display_name).stem.lower()
+    names = [display_name.lower()]
+    if len(stem) >= (MIN_ASCII_STEM if stem.isascii() else MIN_STEM):
+        names.append(stem)
+    for name in names:
+        rest = _remove_name(question, name)
+        if rest is not None and _FILLER.sub('', rest) in SUMMARY_QUESTIONS:
+            return True
+    return False
+
+
+class DocumentInsights:
+    """
+    SQLite-backed store of precomputed answers per document.
+
+    Features:
+    - Lookup by the exact prompt a Quick Reply button sends
+    - Lookup of a document's summary from a free-text question naming the file
+    - Persists across restarts (can share the store registry's database file)
+    - Queries run off the event loop
+    - Entries are removed when their document is deleted
+    """
+
+    def __init__(self, db_path: str = "store_registry.db"):
+        """
+        Initialize DocumentInsights.
+
+        Args:
+            db_path: SQLite file holding the insights
+        """
+        self.db = SQLiteDatabase(db_path, schema=[
+            "CREATE TABLE IF NOT EXISTS document_insights ("
+            "store_name TEXT NOT NULL, prompt_key TEXT NOT NULL, "
+            "document_name TEXT NOT NULL, display_name TEXT NOT NULL, kind TEXT NOT NULL, "
+            "text TEXT NOT NULL, citations TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (store_name, prompt_key))",
+            "CREATE INDEX IF NOT EXISTS document_insights_document ON document_insights (document_name, kind)"
+        ])
+        self.hits = 0
+
+    async def save(
+        self,
+        store_name: str,
+        document_name: str,
+        display_name: str,
+        kind: str,
+        prompt: str,
+        text: str,
+        citations: List[dict]
+    ):
+        """
+        Store a precomputed answer.
+
+        Args:
+            store_name: Store display name (e.g. "group_xxx")
+            document_name: Full document name (fileSearchStores/.../documents/...)
+            display_name: File name shown to users
+            kind: Insight type (e.g. "summary", "key_points")
+            prompt: Prompt the answer was generated for
+            text: Answer text
+            citations: Citations shown with the answer
+        """
+        await self.db.execute(
+            "INSERT OR REPLACE INTO document_insights "
+            "(store_name, prompt_key, document_name, display_name, kind, text, citations, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (store_name, normalize_prompt(prompt), document_name, display_name, kind,
+             text, json.dumps(citations, ensure_ascii=False), time.time())
+        )
+
+    async def has(self, document_name: str, kind: str) -> bool:
+        """Whether an insight of this kind exists for a document."""
+        row = await self.db.fetchone(
+            "SELECT 1 FROM document_insights WHERE document_name = ? AND kind = ?",
+            (document_name, kind)
+        )
+        return row is not None
+
+    async def lookup(self, store_name: str, prompt: str) -> Optional[Tuple[str, List[dict]]]:
+        """
+        Find the precomputed answer for a prompt.
+
+        Args:
+            store_name: Store display name
+            prompt: Prompt sent by the user or a Quick Reply button
+
+        Returns:
+            (text, citations), or None
+        """
+        row = await self.db.fetchone(
+            "SELECT text, citations FROM document_insights WHERE store_name = ? AND prompt_key = ?",
+            (store_name, normalize_prompt(prompt))
+        )
+        if row is None:
+            return None
+        self.hits += 1
+        return row[0], json.loads(row[1])
+
+    async def find_summary_for_question(self, store_name: str, question: str) -> Optional[Tuple[str, List[dict]]]:
+        """
+        Answer "what is this file about" questions that name a file in the store.
+        Questions asking anything more specific about the file return None.
+
+        Args:
+            store_name: Store display name
+            question: Free-text question
+
+        Returns:
+            (summary text, citations) of the named document, or None
+        """
+        normalized = normalize_prompt(question)
+        rows = await self.db.fetchall(
+            "SELECT display_name, text, citations FROM document_insights WHERE store_name = ? AND kind = 'summary'",
+            (store_name,)
+        )
+        # Prefer the longest matching name ("report_v2.pdf" over "report")
+        for display_name, text, citations in sorted(rows, key=lambda row: -len(row[0])):
+            if is_summary_question(normalized, display_name):
+                self.hits += 1
+                return text, json.loads(citations)
+        return None
+
+    async def forget_document(self, document_name: str):
+        """
+        Drop insights of a deleted document.
+
+        Args:
+            document_name: Full document name
+        """
+        await self.db.execute("DELETE FROM document_insights WHERE document_name = ?", (document_name,))
+
+    async def close(self):
+        """Close the SQLite connection."""
+        await self.db.close()
@@ -0,0 +1,177 @@
+"""
+Document listing for file search stores.
+
+Walks the Gemini REST API page by page (following nextPageToken) and only
+fetches as many pages as the caller needs: one document to know whether a
+store is empty, up to the requested page for the files carousel.
+"""
+
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import aiohttp
+
+from document_cache import DocumentCache
+from http_pool import HttpClientPool
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentLister:
+    """
+    Lists the documents of file search stores over the REST API.
+
+    Features:
+    - Async iteration over every document, one REST page at a time
+    - Emptiness check that stops after the first document; both answers are cached
+    - Carousel pages that fetch one document past the page to know if a next page exists
+    - Complete lists are kept in the DocumentCache and served from it
+    - Identical concurrent listings share one in-flight call
+    - A store deleted on the server (404) is forgotten
+    """
+
+    def __init__(
+        self,
+        http_pool: HttpClientPool,
+        base_url: str,
+        api_key: str,
+        resolve_store: Callable[[str], Awaitable[Optional[str]]],
+        forget_store: Callable[[str], Awaitable[None]],
+        document_cache: DocumentCache,
+        flights: SingleFlight,
+        page_size: int = 20
+    ):
+        """
+        Initialize DocumentLister.
+
+        Args:
+            http_pool: Shared keep-alive HTTP pool
+            base_url: Gemini REST base URL (e.g. https://generativelanguage.googleapis.com/v1beta)
+            api_key: Gemini API key
+            resolve_store: Resolves a store display name to its API name (None if missing)
+            forget_store: Drops the registry mapping of a store that no longer exists
+            document_cache: Cache of complete document lists per store
+            flights: Coalesces identical concurrent listings
+            page_size: Documents requested per REST call
+        """
+        self.http_pool = http_pool
+        self.base_url = base_url
+        self.api_key = api_key
+        self.resolve_store = resolve_store
+        self.forget_store = forget_store
+        self.document_cache = document_cache
+        self.flights = flights
+        self.page_size = page_size
+
+    async def iter_documents(self, store_name: str, page_size: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Async generator over every document in a file search store.
+        Callers that stop early only pay for the pages they consumed.
+
+        Args:
+            store_name: File search store name (display_name format like "user_xxx")
+            page_size: Documents requested per REST call (default: self.page_size)
+
+        Yields:
+            Document info dicts with 'name', 'display_name', 'create_time', 'update_time'
+        """
+        actual_store_name = await self.resolve_store(store_name)
+        if not actual_store_name:
+            logger.debug("Store '%s' not found - no documents", store_name)
+            return
+
+        # Use REST API to list documents (more stable than SDK)
+        url = f"{self.base_url}/{actual_store_name}/documents"
+        headers = {'Content-Type': 'application/json'}
+        params = {'key': self.api_key, 'pageSize': page_size or self.page_size}
+
+        while True:
+            logger.debug("REST API URL: %s (pageToken: %s)", url, params.get('pageToken', ''))
+            async with self.http_pool.session.get(
+                url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 404:
+                    # Store was deleted on the server; drop the stale mapping
+                    logger.debug("Store '%s' no longer exists", actual_store_name)
+                    await self.forget_store(store_name)
+                    return
+                response.raise_for_status()
+                data = await response.json()
+
+            logger.debug("REST API returned %s documents", len(data.get('documents', [])))
+
+            for doc in data.get('documents', []):
+                yield {
+                    'name': doc.get('name', 'N/A'),
+                    'display_name': doc.get('displayName', 'Unknown'),
+                    'create_time': doc.get('createTime', ''),
+                    'update_time': doc.get('updateTime', '')
+                }
+
+            next_page_token = data.get('nextPageToken')
+            if not next_page_token:
+                return
+            params['pageToken'] = next_page_token
+
+    async def has_documents(self, store_name: str) -> bool:
+        """
+        Check whether a store has at least one document.
+        Uses the document cache, otherwise stops after the first REST page and
+        caches the answer.
+
+        Raises:
+            aiohttp.ClientError: If the REST call fails
+        """
+        cached = self.document_cache.has_documents(store_name)
+        if cached is not None:
+            return cached
+
+        async def check() -> bool:
+            async for _ in self.iter_documents(store_name, page_size=1):
+                self.document_cache.mark_has_documents(store_name)
+                return True
+            self.document_cache.set(store_name, [])
+            return False
+
+        return await self.flights.do(('has_documents', store_name), check)
+
+    async def get_page(self, store_name: str, page: int, page_size: int) -> tuple[list, bool, Optional[int]]:
+        """
+        Get one page of documents for the files carousel.
+        Only fetches REST pages up to the requested page unless the full list is cached.
+
+        Args:
+            store_name: File search store name (display_name format)
+            page: Page number, starting at 1
+            page_size: Documents per carousel page
+
+        Returns:
+            (page_documents, has_next_page, total_documents or None if not fully listed)
+
+        Raises:
+            aiohttp.ClientError: If a REST call fails
+        """
+        start_idx = (page - 1) * page_size
+        end_idx = start_idx + page_size
+
+        documents = self.document_cache.get(store_name)
+        if documents is not None:
+            return documents[start_idx:end_idx], len(documents) > end_idx, len(documents)
+
+        async def fetch_page() -> tuple[list, bool, Optional[int]]:
+            documents = []
+            # Fetch one document past this page to know whether a next page exists
+            async for doc in self.iter_documents(store_name):
+                documents.append(doc)
+                if len(documents) > end_idx:
+                    return documents[start_idx:end_idx], True, None
+
+            # Reached the end, so this is the complete list
+            self.document_cache.set(store_name, documents)
+            return documents[start_idx:end_idx], False, len(documents)
+
+        page_documents, has_next, total = await self.flights.do(
+            ('documents_page', store_name, page, page_size), fetch_page
+        )
+        return list(page_documents), has_next, total
@@ -0,0 +1,170 @@
+"""
+In-process event dispatcher for LINE webhook events.
+
+The webhook acknowledges LINE right after signature verification and hands the
+parsed events to this dispatcher, which processes them on background workers.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher:
+    """
+    Bounded work queue drained by a shared pool of N workers.
+
+    Features:
+    - Per-chat ordering: jobs with the same key run one at a time, in order
+    - Parallelism across chats: any idle worker takes the next chat with work,
+      so one slow chat (e.g. a long conversion) never holds up unrelated chats
+    - Backpressure: submit waits briefly for space, then drops and counts the event
+    - Simple counters for monitoring
+    """
+
+    def __init__(
+        self,
+        handler: Callable[..., Awaitable[None]],
+        num_workers: int = 4,
+        queue_size: int = 400,
+        enqueue_timeout: float = 1.0
+    ):
+        """
+        Initialize EventDispatcher.
+
+        Args:
+            handler: Coroutine function called as handler(*args) for each job
+            num_workers: Number of worker tasks shared by all keys
+            queue_size: Maximum jobs waiting to start, over all keys
+            enqueue_timeout: Seconds submit() waits for space before dropping
+        """
+        self.handler = handler
+        self.num_workers = max(1, num_workers)
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        # Keys with jobs waiting and no job running; a key is in here at most once
+        self.ready: Optional[asyncio.Queue] = None
+        # key -> jobs not started yet (present while the key is queued or running)
+        self.jobs: Dict[str, Deque[tuple]] = {}
+        self.waiting = 0
+        self.space: Optional[asyncio.Condition] = None
+        self.workers: List[asyncio.Task] = []
+        self.metrics: Dict[str, int] = {
+            'enqueued': 0,
+            'processed': 0,
+            'failed': 0,
+            'dropped': 0,
+            'queue_high_water': 0,
+        }
+
+    def start(self):
+        """Create the queue and start the worker tasks."""
+        if self.workers:
+            return
+        self.ready = asyncio.Queue()
+        self.space = asyncio.Condition()
+        self.workers = [
+            asyncio.create_task(self._worker(i), name=f"event-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info("Event dispatcher started with %s workers (queue size %s)",
+                    self.num_workers, self.queue_size)
+
+    async def stop(self, drain_timeout: Optional[float] = 10.0):
+        """
+        Stop workers, letting queued jobs finish first.
+
+        Args:
+            drain_timeout: Seconds to wait for queued jobs to finish (None waits forever)
+        """
+        if not self.workers:
+            return
+        try:
+            await asyncio.wait_for(self.ready.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Event dispatcher stopped with %s pending events", self.pending())
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info("Event dispatcher stopped")
+
+    async def submit(self, key: str, *args) -> bool:
+        """
+        Queue a job for background processing.
+
+        Args:
+            key: Ordering key; jobs sharing a key run one at a time, in order
+            *args: Arguments passed to the handler
+
+        Returns:
+            True if queued, False if dropped because the queue stayed full
+        """
+        if self.waiting >= self.queue_size:
+            logger.warning("Event queue full for key %s, waiting up to %ss", key, self.enqueue_timeout)
+            try:
+                async with self.space:
+                    await asyncio.wait_for(
+                        self.space.wait_for(lambda: self.waiting < self.queue_size),
+                        timeout=self.enqueue_timeout
+                    )
+            except asyncio.TimeoutError:
+                self.metrics['dropped'] += 1
+                logger.error("Dropped event for key %s: queue still full", key)
+                return False
+
+        pending = self.jobs.get(key)
+        if pending is None:
+            # Idle key: hand it to the pool
+            self.jobs[key] = deque([args])
+            self.ready.put_nowait(key)
+        else:
+            # Queued or running: runs after the jobs before it
+            pending.append(args)
+        self.waiting += 1
+        self.metrics['enqueued'] += 1
+        self.metrics['queue_high_water'] = max(self.metrics['queue_high_water'], self.waiting)
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self.ready.get()
+            pending = self.jobs[key]
+            args = pending.popleft()
+            self.waiting -= 1
+            async with self.space:
+                self.space.notify()
+            try:
+                await self.handler(*args)
+                self.metrics['processed'] += 1
+            except Exception as e:
+                self.metrics['failed'] += 1
+                logger.exception("Event worker %s failed: %s", index, e)
+            finally:
+                if pending:
+                    # Back of the line, so a busy chat takes turns with the others
+                    self.ready.put_nowait(key)
+                else:
+                    del self.jobs[key]
+                self.ready.task_done()
+
+    def pending(self) -> int:
+        """Number of jobs waiting to start."""
+        return self.waiting
+
+    def get_stats(self) -> dict:
+        """
+        Get dispatcher counters.
+
+        Returns:
+            Dict with enqueued/processed/failed/dropped counts, pending jobs and workers
+        """
+        return {
+            **self.metrics,
+            'pending': self.pending(),
+            'workers': len(self.workers),
+            'active_chats': len(self.jobs),
+        }
@@ -0,0 +1,149 @@
+"""
+Async Gemini access layer.
+
+Every Gemini call made by the webhook handlers goes through this module so that
+slow model answers, uploads and indexing polls never block the event loop.
+"""
+
+from google import genai
+from google.genai import types
+from typing import BinaryIO, Optional, Union
+
+
+class AsyncGeminiClient:
+    """
+    Thin async wrapper around the GenAI SDK's ``client.aio`` surface.
+
+    Features:
+    - Non-blocking generate_content / chat sessions
+    - File Search store lookup, creation and upload
+    - Long-running operation polling
+    - Document deletion
+    """
+
+    def __init__(self, client: genai.Client):
+        """
+        Initialize AsyncGeminiClient.
+
+        Args:
+            client: Google GenAI client
+        """
+        self.client = client
+        self.aio = client.aio
+
+    async def generate_content(
+        self,
+        model: str,
+        contents,
+        config: Optional[types.GenerateContentConfig] = None
+    ) -> types.GenerateContentResponse:
+        """
+        Generate content without blocking the event loop.
+
+        Args:
+            model: Model name
+            contents: Prompt text or list of parts
+            config: Optional generation config
+
+        Returns:
+            GenerateContentResponse
+        """
+        return await self.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config
+        )
+
+    def create_chat(
+        self,
+        model: str,
+        config: Optional[types.GenerateContentConfig] = None,
+        history: Optional[list] = None
+    ):
+        """
+        Create an async chat session (``await chat.send_message(...)``).
+
+        Args:
+            model: Model name
+            config: Optional generation config
+            history: Optional list of Content to seed the chat with
+
+        Returns:
+            AsyncChat session object
+        """
+        return self.aio.chats.create(model=model, config=config, history=history)
+
+    async def list_stores(self) -> list:
+        """
+        List every file search store in the project (all pages).
+
+        Returns:
+            List of FileSearchStore objects
+        """
+        stores = []
+        async for store in await self.aio.file_search_stores.list():
+            stores.append(store)
+        return stores
+
+    async def create_store(self, display_name: str) -> str:
+        """
+        Create a file search store.
+
+        Args:
+            display_name: Store display name
+
+        Returns:
+            Actual store name generated by the API
+        """
+        store = await self.aio.file_search_stores.create(
+            config={'display_name': display_name}
+        )
+        return store.name
+
+    async def upload_to_file_search_store(
+        self,
+        store_name: str,
+        file: Union[str, BinaryIO],
+        config: Optional[dict] = None
+    ):
+        """
+        Start uploading a file into a file search store.
+
+        Args:
+            store_name: Actual store name (fileSearchStores/...)
+            file: Local file path, or a seekable binary stream (config must then set mime_type)
+            config: Optional upload config (e.g. display_name, mime_type)
+
+        Returns:
+            Long-running upload operation
+        """
+        return await self.aio.file_search_stores.upload_to_file_search_store(
+            file_search_store_name=store_name,
+            file=file,
+            config=config
+        )
+
+    async def get_operation(self, operation):
+        """
+        Refresh a long-running operation.
+
+        Args:
+            operation: Operation returned by an earlier call
+
+        Returns:
+            Updated operation
+        """
+        return await self.aio.operations.get(operation)
+
+    async def delete_document(self, document_name: str) -> None:
+        """
+        Permanently delete a document from its file search store.
+
+        Args:
+            document_name: Full document name (fileSearchStores/.../documents/...)
+        """
+        # Force delete is required for File Search Store documents
+        await self.aio.file_search_stores.documents.delete(
+            name=document_name,
+            config={'force': True}
+        )
@@ -0,0 +1,174 @@
+"""
+Token-budgeted chat history compaction.
+
+Every chat.send_message replays the whole session history, so long
+conversations get slower and more expensive each turn. HistoryCompactor keeps
+the last few turns verbatim and folds older turns into a rolling summary once
+the history exceeds a token budget.
+"""
+
+import asyncio
+import logging
+import re
+from typing import Awaitable, Callable, List, Optional
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Marks the synthetic user message that carries the rolling summary
+SUMMARY_PREFIX = "（先前對話摘要）"
+SUMMARY_ACK = "好的，我會參考這份摘要繼續對話。"
+
+SUMMARY_PROMPT = """請將以下對話整理成精簡的摘要（繁體中文，條列式，300 字以內），
+保留用戶提到的名字、偏好、已討論的文件與結論，供之後的對話參考：
+
+{conversation}"""
+
+_CJK = re.compile(r'[\u3000-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+class HistoryCompactor:
+    """
+    Folds old turns of a chat history into a summary when over budget.
+
+    Features:
+    - Token counting with tiktoken (character-based estimate if the
+      encoding cannot be loaded, e.g. offline)
+    - Last keep_turns turns are always kept verbatim
+    - Older turns, including a previous summary, become one rolling summary
+    - Counters for compactions and tokens saved
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str], Awaitable[str]],
+        token_budget: int = 4000,
+        keep_turns: int = 4,
+        encoding_name: str = "cl100k_base"
+    ):
+        """
+        Initialize HistoryCompactor.
+
+        Args:
+            summarize: Coroutine function turning a prompt into summary text
+            token_budget: History size (tokens) that triggers compaction
+            keep_turns: Most recent user/model turns kept verbatim
+            encoding_name: tiktoken encoding used for counting
+        """
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = max(1, keep_turns)
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._encoding_failed = False
+        self.metrics = {
+            'compactions': 0,
+            'failures': 0,
+            'tokens_before': 0,
+            'tokens_after': 0,
+        }
+
+    def _get_encoding(self):
+        if self._encoding is None and not self._encoding_failed:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                self._encoding_failed = True
+                logger.warning("tiktoken encoding unavailable, estimating tokens: %s", e)
+        return self._encoding
+
+    async def warm_up(self):
+        """Load the tiktoken encoding (downloaded on first use) outside the event loop."""
+        await asyncio.to_thread(self._get_encoding)
+
+    def count_text_tokens(self, text: str) -> int:
+        """Count tokens in a string."""
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        # Rough estimate: one token per CJK character, four characters per token otherwise
+        cjk = len(_CJK.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+    def count_tokens(self, contents: List[types.Content]) -> int:
+        """Count the text tokens of a list of Content."""
+        return sum(
+            self.count_text_tokens(part.text or '')
+            for content in contents
+            for part in (content.parts or [])
+        )
+
+    @staticmethod
+    def split_turns(history: List[types.Content]) -> List[List[types.Content]]:
+        """Group a history into turns, each starting with a user message."""
+        turns: List[List[types.Content]] = []
+        for content in history:
+            if content.role == 'user' and (not turns or turns[-1][-1].role != 'user'):
+                turns.append([content])
+            elif turns:
+                turns[-1].append(content)
+            else:
+                turns.append([content])
+        return turns
+
+    @staticmethod
+    def _render(turns: List[List[types.Content]]) -> str:
+        lines = []
+        for turn in turns:
+            for content in turn:
+                text = "".join(part.text or '' for part in (content.parts or [])).strip()
+                if text:
+                    speaker = "用戶" if content.role == 'user' else "助手"
+                    lines.append(f"{speaker}：{text}")
+        return "\n".join(lines)
+
+    async def compact(self, history: List[types.Content]) -> Optional[List[types.Content]]:
+        """
+        Compact a history if it is over budget.
+
+        Args:
+            history: Comprehensive chat history
+
+        Returns:
+            The compacted history, or None if no compaction was needed (or it failed)
+        """
+        tokens_before = self.count_tokens(history)
+        turns = self.split_turns(history)
+        if tokens_before <= self.token_budget or len(turns) <= self.keep_turns:
+            return None
+
+        older, recent = turns[:-self.keep_turns], turns[-self.keep_turns:]
+        try:
+            summary = (await self.summarize(SUMMARY_PROMPT.format(conversation=self._render(older)))).strip()
+        except Exception as e:
+            self.metrics['failures'] += 1
+            logger.error("History summarization failed: %s", e)
+            return None
+        if not summary:
+            self.metrics['failures'] += 1
+            return None
+
+        compacted = [
+            types.Content(role='user', parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}")]),
+            types.Content(role='model', parts=[types.Part(text=SUMMARY_ACK)]),
+        ] + [content for turn in recent for content in turn]
+
+        tokens_after = self.count_tokens(compacted)
+        self.metrics['compactions'] += 1
+        self.metrics['tokens_before'] += tokens_before
+        self.metrics['tokens_after'] += tokens_after
+        logger.info("Compacted chat history: %s -> %s tokens (%s turns summarized)", tokens_before, tokens_after, len(older))
+        return compacted
+
+    def get_stats(self) -> dict:
+        """
+        Get compaction counters.
+
+        Returns:
+            Dict with compactions, failures and tokens before/after compaction
+        """
+        return dict(self.metrics)
@@ -0,0 +1,119 @@
+"""
+Shared keep-alive HTTP connection pool.
+
+One aiohttp session serves the LINE Messaging API (both the SDK and our direct
+REST calls) and the Generative Language REST API, so repeated calls reuse
+TCP+TLS connections instead of opening a new one per request.
+"""
+
+import time
+
+import aiohttp
+from typing import Callable, Optional
+
+from linebot import AsyncHttpClient
+from linebot.aiohttp_async_http_client import AiohttpAsyncHttpClient
+
+
+class HttpClientPool:
+    """
+    Lazily created aiohttp session with a bounded keep-alive connector.
+
+    Features:
+    - Session is created on first use inside the running event loop
+    - Connection reuse across LINE and Gemini REST calls
+    - Counters for new connections vs. requests sent
+    - Optional per-request latency callback (time to response headers)
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 60.0,
+        on_request_done: Optional[Callable[[str, str, float, Optional[int]], None]] = None
+    ):
+        """
+        Initialize HttpClientPool.
+
+        Args:
+            limit: Maximum open connections in total
+            limit_per_host: Maximum open connections per host
+            keepalive_timeout: Seconds an idle connection is kept for reuse
+            on_request_done: Called as on_request_done(method, url, seconds, status) when a
+                             response arrives, or with status None when the request fails
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.on_request_done = on_request_done
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.connections_created = 0
+        self.requests_sent = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session (created on first access)."""
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_request_start.append(self._on_request_start)
+            trace_config.on_request_end.append(self._on_request_end)
+            trace_config.on_request_exception.append(self._on_request_end)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        return self._session
+
+    async def _on_connection_created(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_request_start(self, session, context, params):
+        self.requests_sent += 1
+        context.started = time.monotonic()
+
+    async def _on_request_end(self, session, context, params):
+        if self.on_request_done is not None:
+            response = getattr(params, 'response', None)  # Absent on exceptions
+            status = response.status if response is not None else None
+            self.on_request_done(params.method, str(params.url), time.monotonic() - context.started, status)
+
+    async def close(self):
+        """Close the shared session and all pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> dict:
+        """
+        Get connection reuse counters.
+
+        Returns:
+            Dict with connections_created and requests_sent
+        """
+        return {
+            'connections_created': self.connections_created,
+            'requests_sent': self.requests_sent,
+        }
+
+
+class PooledAiohttpAsyncHttpClient(AiohttpAsyncHttpClient):
+    """LINE SDK HTTP client that always uses the pool's current session."""
+
+    def __init__(self, pool: HttpClientPool, timeout=AsyncHttpClient.DEFAULT_TIMEOUT):
+        """
+        Initialize PooledAiohttpAsyncHttpClient.
+
+        Args:
+            pool: Shared HttpClientPool
+            timeout: Default request timeout in seconds
+        """
+        AsyncHttpClient.__init__(self, timeout)
+        self.pool = pool
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self.pool.session
@@ -0,0 +1,137 @@
+"""
+Image pre-processing for Gemini vision.
+
+Phone photos are often 4-12 MB at resolutions far above what the model looks
+at. Images are decoded with Pillow, rotated according to their EXIF
+orientation, downscaled to a maximum dimension and re-encoded without
+metadata before being sent.
+"""
+
+import asyncio
+import io
+import logging
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes -> MIME type
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+]
+
+# Formats Gemini accepts as inline image data
+GEMINI_IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/heic', 'image/heif'}
+
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """
+    Detect the image format from its first bytes.
+
+    Returns:
+        MIME type, or None if unknown
+    """
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'heic', b'heix', b'mif1', b'msf1', b'heim', b'heis'):
+        return 'image/heic'
+    return None
+
+
+class ImagePreprocessor:
+    """
+    Downscales and re-encodes images before vision requests.
+
+    Features:
+    - Real format sniffed from the bytes, not the file name
+    - EXIF orientation applied, then all metadata (EXIF, GPS, ...) dropped
+    - Longest side limited to max_dimension
+    - JPEG output (WebP when the image has transparency)
+    - Runs in a worker thread; falls back to the original bytes if decoding fails
+    """
+
+    def __init__(self, max_dimension: int = 1536, quality: int = 85):
+        """
+        Initialize ImagePreprocessor.
+
+        Args:
+            max_dimension: Maximum width/height in pixels after downscaling
+            quality: JPEG/WebP encoder quality (1-95)
+        """
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.metrics = {
+            'images': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'failures': 0,
+        }
+
+    def _encode(self, data: bytes) -> Tuple[bytes, str, bool]:
+        with Image.open(io.BytesIO(data)) as image:
+            has_metadata = bool(image.info.get('exif') or image.getexif())
+            image.seek(0)  # First frame of animated images
+            # JPEG: let the decoder scale down by 1/2..1/8 while decoding
+            image.draft('RGB', (self.max_dimension, self.max_dimension))
+            image = ImageOps.exif_transpose(image)
+            resized = max(image.size) > self.max_dimension
+            if resized:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            output = io.BytesIO()
+            if has_alpha:
+                image.convert('RGBA').save(output, format='WEBP', quality=self.quality)
+                mime_type = 'image/webp'
+            else:
+                image.convert('RGB').save(output, format='JPEG', quality=self.quality, optimize=True)
+                mime_type = 'image/jpeg'
+        return output.getvalue(), mime_type, resized or has_metadata
+
+    def prepare(self, data: bytes) -> Tuple[bytes, str]:
+        """
+        Prepare image bytes for Gemini (blocking; see prepare_async).
+
+        Args:
+            data: Original image bytes
+
+        Returns:
+            (image bytes, MIME type)
+        """
+        self.metrics['images'] += 1
+        self.metrics['bytes_in'] += len(data)
+        original_type = sniff_image_type(data)
+        try:
+            encoded, mime_type, must_replace = self._encode(data)
+            # Keep a small, clean original if re-encoding would only make it bigger
+            if not must_replace and original_type in GEMINI_IMAGE_TYPES and len(encoded) >= len(data):
+                encoded, mime_type = data, original_type
+        except Exception as e:
+            self.metrics['failures'] += 1
+            logger.warning("Image preprocessing failed, sending original: %s", e)
+            encoded, mime_type = data, original_type or 'image/jpeg'
+
+        self.metrics['bytes_out'] += len(encoded)
+        logger.info("Image prepared: %s %s bytes -> %s %s bytes", original_type, len(data), mime_type, len(encoded))
+        return encoded, mime_type
+
+    async def prepare_async(self, data: bytes) -> Tuple[bytes, str]:
+        """Prepare image bytes in a worker thread. Returns (image bytes, MIME type)."""
+        return await asyncio.to_thread(self.prepare, data)
+
+    def get_stats(self) -> dict:
+        """
+        Get preprocessing counters.
+
+        Returns:
+            Dict with images processed, bytes in/out and failures
+        """
+        return dict(self.metrics)
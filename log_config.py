@@ -0,0 +1,123 @@
+"""
+Logging setup.
+
+Records are formatted as one JSON object per line (or plain text for local
+runs) and written by a background thread, so a burst of log lines from a busy
+group chat never blocks the event loop on stdout.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+# Chatty third-party loggers (one line per HTTP request) kept quiet unless overridden
+DEFAULT_MODULE_LEVELS = {'httpx': 'WARNING', 'httpcore': 'WARNING'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps extra fields and the traceback separate from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON.
+
+    Features:
+    - time (UTC, ISO 8601), level, logger and message fields
+    - Fields passed with extra={...} are added as top-level keys
+    - Exceptions are included as a formatted traceback
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """
+    Parse per-module levels, e.g. "main=DEBUG,chat_session_manager=WARNING".
+
+    Returns:
+        Dict of logger name -> level name
+    """
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = "INFO", json_output: bool = True, module_levels: str = ""):
+    """
+    Configure the root logger. Calling it again replaces the previous setup.
+
+    Args:
+        level: Default level (DEBUG, INFO, WARNING, ERROR)
+        json_output: JSON lines when True, human-readable text otherwise
+        module_levels: Per-logger overrides (see parse_module_levels)
+    """
+    global _listener
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_output:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    # Callers only build the message; JSON formatting and writing happen on the listener thread
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, module_level in {**DEFAULT_MODULE_LEVELS, **parse_module_levels(module_levels)}.items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,13 +1,18 @@
 from fastapi import Request, FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 import os
 import sys
+import json
 import asyncio
+import logging
+import hashlib
+import time
 import aiohttp
-import aiofiles
+import mimetypes
 import urllib.parse
-import subprocess
 from pathlib import Path
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional, Union
 
 from linebot.models import (
     MessageEvent, TextSendMessage, FileMessage, ImageMessage,
@@ -16,9 +21,7 @@ from linebot.models import (
     FlexSendMessage, BubbleContainer, BoxComponent, TextComponent,
     ButtonComponent, SeparatorComponent, CarouselContainer
 )
-from linebot.exceptions import InvalidSignatureError
-from linebot.aiohttp_async_http_client import AiohttpAsyncHttpClient
-from linebot import AsyncLineBotApi, WebhookParser
+from linebot import AsyncLineBotApi
 
 # Google GenAI imports
 from google import genai
@@ -26,10 +29,90 @@ from google.genai import types
 
 # Chat Session Manager
 from chat_session_manager import ChatSessionManager
+from session_backend import create_session_backend
+from history_compactor import HistoryCompactor
+
+# Async Gemini access layer
+from gemini_client import AsyncGeminiClient
+
+# Background event processing
+from event_dispatcher import EventDispatcher
+
+# Shared keep-alive HTTP pool for LINE and Gemini REST calls
+from http_pool import HttpClientPool, PooledAiohttpAsyncHttpClient
+
+# Per-store document list cache and paged REST listing
+from document_cache import DocumentCache
+from document_lister import DocumentLister
+
+# Persistent display_name -> fileSearchStores/... index
+from store_registry import StoreRegistry
+
+# Warm LibreOffice worker pool for .doc/.ppt conversion
+from conversion_service import LibreOfficeConverter
+from conversion_pipeline import ConversionPipeline
+
+# Content hash -> already indexed document, per store
+from upload_index import UploadIndex
+
+# Backoff polling for long-running indexing operations
+from operation_tracker import OperationTracker
+
+# Incremental delivery of streamed answers
+from streaming_reply import StreamingReply
+
+# Answers to repeated Quick Reply prompts
+from answer_cache import AnswerCache, normalize_prompt
+
+# Coalesces identical concurrent requests
+from single_flight import SingleFlight
+
+# Summaries and key points generated after ingest
+from document_insights import DocumentInsights
+
+# Downscaling/re-encoding of images before vision requests
+from image_preprocessor import ImagePreprocessor
+
+# In-memory download buffers that spill to disk only when needed
+from spooled_content import SpooledContent
+
+# JSON (or text) logging through a background writer thread
+from log_config import setup_logging
+
+# Webhook decoding and raw-JSON pre-filter
+from webhook_filter import WebhookFilter
+from webhook_decoder import WebhookDecoder
+
+# Latency histograms, counters and component gauges for /metrics
+from metrics import MetricsRegistry
+
+# Spans around outbound calls (OpenTelemetry API or console)
+from tracing import Tracer
 
 # Configuration
+
+# Expose Prometheus metrics on GET /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Tracing spans: otel (OpenTelemetry API, exported by the configured SDK) | console | none
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+
+# Logging: default level, json | text, and per-module overrides (e.g. "main=DEBUG,chat_session_manager=WARNING")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+setup_logging(LOG_LEVEL, json_output=LOG_FORMAT.lower() == "json", module_levels=LOG_LEVELS)
+logger = logging.getLogger(__name__)
+
+# Created after logging is set up, console spans are log records
+tracer = Tracer(TRACING_EXPORTER)
+
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or ""
 
+# REST API endpoints
+LINE_API_BASE_URL = "https://api.line.me/v2/bot"
+GEMINI_REST_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
 # Supported file formats for Google AI File Search API
 # Reference: https://ai.google.dev/gemini-api/docs/file-upload
 SUPPORTED_FILE_EXTENSIONS = {
@@ -66,10 +149,10 @@ channel_access_token = os.getenv("ChannelAccessToken", None)
 
 # Validate environment variables
 if channel_secret is None:
-    print("Specify ChannelSecret as environment variable.")
+    logger.error("Specify ChannelSecret as environment variable.")
     sys.exit(1)
 if channel_access_token is None:
-    print("Specify ChannelAccessToken as environment variable.")
+    logger.error("Specify ChannelAccessToken as environment variable.")
     sys.exit(1)
 if not GOOGLE_API_KEY:
     raise ValueError("Please set GOOGLE_API_KEY via env var or code.")
@@ -77,25 +160,208 @@ if not GOOGLE_API_KEY:
 # Model configuration
 MODEL_NAME = "gemini-2.5-flash"
 
+# Webhook event workers (events from the same chat are processed in order) and the
+# limit on events waiting to start, over all chats and workers
+EVENT_WORKERS = int(os.getenv("EVENT_WORKERS", "4"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "400"))
+
+# How long a store's document list is served from memory (seconds);
+# "no documents" is kept shorter since another worker may receive the upload
+DOCUMENT_CACHE_TTL = int(os.getenv("DOCUMENT_CACHE_TTL", "300"))
+DOCUMENT_CACHE_EMPTY_TTL = int(os.getenv("DOCUMENT_CACHE_EMPTY_TTL", "10"))
+
+# Documents requested per REST call when listing a store
+DOCUMENT_PAGE_SIZE = int(os.getenv("DOCUMENT_PAGE_SIZE", "20"))
+
+# Files shown per carousel page (the 12th bubble is reserved for pagination)
+CAROUSEL_PAGE_SIZE = 11
+
+# How long answers to identical prompts on an unchanged document set are reused (seconds)
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "1800"))
+
+# SQLite file that persists the store name index across restarts
+STORE_REGISTRY_DB = os.getenv("STORE_REGISTRY_DB", "store_registry.db")
+
+# Upload indexing: how long the handler waits, and how long we keep watching overall (seconds)
+UPLOAD_WAIT_SECONDS = int(os.getenv("UPLOAD_WAIT_SECONDS", "20"))
+UPLOAD_DEADLINE_SECONDS = int(os.getenv("UPLOAD_DEADLINE_SECONDS", "600"))
+
+# Chat sessions kept in memory: LRU cap, idle timeout and reaper interval (seconds)
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_REAP_INTERVAL = int(os.getenv("SESSION_REAP_INTERVAL", "60"))
+
+# Stream long answers: first segment within STREAM_FIRST_CHUNK_SECONDS, then pushes of ~STREAM_SEGMENT_CHARS
+# (opt-in: push messages count against the channel's monthly message quota)
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "false").lower() in ("1", "true", "yes")
+STREAM_FIRST_CHUNK_SECONDS = float(os.getenv("STREAM_FIRST_CHUNK_SECONDS", "1.5"))
+STREAM_SEGMENT_CHARS = int(os.getenv("STREAM_SEGMENT_CHARS", "1000"))
+
+# Chat history compaction: token budget before old turns are summarized (0 disables)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+
+# One conversation per group/room instead of one per member
+SHARED_GROUP_SESSIONS = os.getenv("SHARED_GROUP_SESSIONS", "false").lower() in ("1", "true", "yes")
+
+# Shared session storage for multiple workers/containers: memory | sqlite | redis
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Post-ingest summary/key point generation: concurrent workers (0 disables) and the
+# limit on documents waiting to start, over all workers
+INSIGHT_WORKERS = int(os.getenv("INSIGHT_WORKERS", "2"))
+INSIGHT_QUEUE_SIZE = int(os.getenv("INSIGHT_QUEUE_SIZE", "50"))
+
+# Images are downscaled to IMAGE_MAX_DIMENSION px (longest side) and re-encoded before vision requests
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1536"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# Downloads stay in memory up to SPOOL_MAX_MEMORY_MB; larger files (and LibreOffice input) go to UPLOAD_DIR
+SPOOL_MAX_MEMORY_MB = int(os.getenv("SPOOL_MAX_MEMORY_MB", "16"))
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+
+# Concurrent LibreOffice conversions (each worker has its own profile)
+CONVERTER_WORKERS = int(os.getenv("CONVERTER_WORKERS", "2"))
+
+# Content-addressed cache of converted files
+CONVERSION_CACHE_DIR = os.getenv("CONVERSION_CACHE_DIR", "conversion_cache")
+CONVERSION_CACHE_MAX_MB = int(os.getenv("CONVERSION_CACHE_MAX_MB", "500"))
+
 # Initialize GenAI client (Note: File Search API only supports Gemini API, not VertexAI)
 client = genai.Client(api_key=GOOGLE_API_KEY)
 
-print("GenAI client initialized successfully.")
+logger.info("GenAI client initialized successfully.")
+
+# All handlers talk to Gemini through the async layer so the event loop never blocks
+gemini = AsyncGeminiClient(client)
+
+# Resolves store display names without listing every store per request
+store_registry = StoreRegistry(gemini, db_path=STORE_REGISTRY_DB)
+
+# Skips re-uploading identical files to the same store (shares the registry database)
+upload_index = UploadIndex(db_path=STORE_REGISTRY_DB)
+
+# Precomputed summaries and key points per document (shares the registry database)
+document_insights = DocumentInsights(db_path=STORE_REGISTRY_DB)
+
+# Polls indexing operations and keeps watching them after the reply
+operation_tracker = OperationTracker(gemini)
+
+# Conversation history and citations shared across workers (None = this process only)
+session_backend = create_session_backend(SESSION_BACKEND, sqlite_path=SESSION_SQLITE_PATH, redis_url=REDIS_URL)
+
+async def summarize_history(prompt: str) -> str:
+    """
+    Summarize old chat turns for HistoryCompactor.
+    """
+    with stage_seconds.time("history_summary"), tracer.span(
+        "gemini.generate_content", **{'gen_ai.request.model': MODEL_NAME, 'linebot.purpose': 'history_summary'}
+    ) as span:
+        response = await gemini.generate_content(model=MODEL_NAME, contents=prompt)
+        span.set_attributes(usage_attributes(response))
+    return response.text or ""
+
+
+# Folds old turns of long conversations into a summary
+history_compactor = HistoryCompactor(
+    summarize_history,
+    token_budget=HISTORY_TOKEN_BUDGET,
+    keep_turns=HISTORY_KEEP_TURNS
+) if HISTORY_TOKEN_BUDGET > 0 else None
 
 # Initialize Chat Session Manager
-session_manager = ChatSessionManager(client=client, model_name=MODEL_NAME)
-print("Chat Session Manager initialized successfully.")
+session_manager = ChatSessionManager(
+    gemini=gemini,
+    model_name=MODEL_NAME,
+    max_sessions=SESSION_MAX_ENTRIES,
+    session_timeout_seconds=SESSION_TTL_SECONDS,
+    backend=session_backend,
+    compactor=history_compactor
+)
+logger.info("Chat Session Manager initialized successfully.")
 
 # Initialize the FastAPI app for LINEBot
 app = FastAPI()
-client_session = aiohttp.ClientSession()
-async_http_client = AiohttpAsyncHttpClient(client_session)
+
+# Per-stage latency (download, conversion, upload, indexing, model calls, ...)
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "stage_duration_seconds", "Duration of pipeline stages in seconds", "stage"
+)
+http_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time to response headers of outgoing HTTP requests", "target"
+)
+citation_lookups = metrics.counter(
+    "citation_lookups_total", "Citation lookups for Quick Reply buttons by result", "result"
+)
+
+
+def http_request_target(url: str) -> str:
+    """
+    Name the API an outgoing request goes to (a bounded label, no IDs).
+    """
+    if url.startswith(LINE_API_BASE_URL):
+        path = url[len(LINE_API_BASE_URL):].split('?', 1)[0]
+        if path.startswith('/message/'):
+            return f"line_{path.split('/')[2]}"  # line_reply, line_push, ...
+        if path.startswith('/chat/loading'):
+            return "line_loading"
+        return "line_other"
+    if 'api-data.line.me' in url:
+        return "line_content"
+    if url.startswith(GEMINI_REST_BASE_URL):
+        return "gemini_rest"
+    return "other"
+
+
+def on_http_request_done(method: str, url: str, seconds: float, status: Optional[int]):
+    """
+    Record an outgoing HTTP request (LINE API, Gemini REST) in the metrics and as a span.
+    """
+    target = http_request_target(url)
+    http_seconds.observe(target, seconds)
+    if tracer.enabled:
+        error = None if status is not None and status < 400 else f"HTTP {status or 'request failed'}"
+        tracer.record(
+            f"http {target}", seconds, error=error,
+            **{'http.request.method': method, 'http.response.status_code': status, 'linebot.target': target}
+        )
+
+
+# One keep-alive pool shared by the LINE SDK and our own REST calls
+http_pool = HttpClientPool(on_request_done=on_http_request_done)
+async_http_client = PooledAiohttpAsyncHttpClient(http_pool)
 line_bot_api = AsyncLineBotApi(channel_access_token, async_http_client)
-parser = WebhookParser(channel_secret)
 
-# Create uploads directory if not exists
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+background_tasks = set()
+
+# Verifies and decodes webhook bodies from raw bytes (orjson when installed)
+webhook_decoder = WebhookDecoder(channel_secret)
+
+# Drops ignored webhook events (unmentioned group text, unhandled types) before SDK objects are built
+webhook_filter = WebhookFilter()
+
+# LibreOffice is located once here instead of on every conversion
+converter = LibreOfficeConverter(num_workers=CONVERTER_WORKERS)
+
+# Legacy formats converted before upload; adding a format is one register() call
+conversion_pipeline = ConversionPipeline(
+    converter,
+    cache_dir=CONVERSION_CACHE_DIR,
+    max_cache_bytes=CONVERSION_CACHE_MAX_MB * 1024 * 1024
+)
+conversion_pipeline.register(
+    '.doc', 'docx', timeout=60,
+    icon='📝', app_name='Microsoft Word', wait_hint=''
+)
+conversion_pipeline.register(
+    '.ppt', 'pptx', timeout=120,  # PPT files may be larger, give 120 seconds
+    icon='📊', app_name='Microsoft PowerPoint',
+    wait_hint='\n\n⏳ PPT 檔案較大，轉換可能需要 10-30 秒，請稍候...'
+)
 
 def get_store_name(event) -> str:
     """
@@ -103,14 +369,55 @@ def get_store_name(event) -> str:
     Returns user_id for 1-on-1 chat, group_id for group chat.
     Works with both MessageEvent and PostbackEvent.
     """
-    if event.source.type == "user":
-        return f"user_{event.source.user_id}"
-    elif event.source.type == "group":
-        return f"group_{event.source.group_id}"
-    elif event.source.type == "room":
-        return f"room_{event.source.room_id}"
+    source = event.source
+    return store_name_for_source(
+        source.type,
+        getattr(source, 'user_id', None),
+        getattr(source, 'group_id', None),
+        getattr(source, 'room_id', None)
+    )
+
+
+def store_name_for_source(
+    source_type: str,
+    user_id: Optional[str] = None,
+    group_id: Optional[str] = None,
+    room_id: Optional[str] = None
+) -> str:
+    """
+    Get the file search store name from the fields of an event source
+    (also used on raw webhook JSON, before SDK objects exist).
+    """
+    if source_type == "user":
+        return f"user_{user_id}"
+    elif source_type == "group":
+        return f"group_{group_id}"
+    elif source_type == "room":
+        return f"room_{room_id}"
     else:
-        return f"unknown_{event.source.user_id}"
+        return f"unknown_{user_id}"
+
+
+def get_session_key(event) -> str:
+    """
+    Get the chat session key: per (store, user), or per group/room when
+    SHARED_GROUP_SESSIONS is enabled.
+    """
+    store_name = get_store_name(event)
+    if SHARED_GROUP_SESSIONS and event.source.type in ("group", "room"):
+        return ChatSessionManager.make_session_key(store_name)
+    return ChatSessionManager.make_session_key(store_name, event.source.user_id)
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """
+    Schedule a coroutine without awaiting it.
+    Keeps a reference until the task finishes.
+    """
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
 async def show_loading_animation(chat_id: str, loading_seconds: int = 20):
@@ -122,15 +429,14 @@ async def show_loading_animation(chat_id: str, loading_seconds: int = 20):
         chat_id: User ID or Group ID (reply target)
         loading_seconds: Duration in seconds (5-60, default 20)
 
-    Note: This is a fire-and-forget operation. If it fails, it won't affect the main operation.
+    Note: Schedule this with run_in_background(); if it fails, it won't affect the main operation.
     """
     try:
         # Ensure loading_seconds is within valid range (5-60 seconds)
         loading_seconds = max(5, min(60, loading_seconds))
 
         # Use REST API directly
-        import requests
-        url = "https://api.line.me/v2/bot/chat/loading/start"
+        url = f"{LINE_API_BASE_URL}/chat/loading/start"
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {channel_access_token}'
@@ -140,16 +446,16 @@ async def show_loading_animation(chat_id: str, loading_seconds: int = 20):
             'loadingSeconds': loading_seconds
         }
 
-        # Fire-and-forget: don't wait for response
-        response = requests.post(url, headers=headers, json=payload, timeout=5)
-
-        if response.status_code == 200:
-            print(f"[INFO] Loading animation started for chat: {chat_id} ({loading_seconds}s)")
-        else:
-            print(f"[WARNING] Loading animation failed: {response.status_code} - {response.text}")
+        async with http_pool.session.post(
+            url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=5)
+        ) as response:
+            if response.status == 200:
+                logger.info("Loading animation started for chat: %s (%ss)", chat_id, loading_seconds)
+            else:
+                logger.warning("Loading animation failed: %s - %s", response.status, await response.text())
 
     except Exception as e:
-        print(f"[WARNING] Failed to show loading animation: {e}")
+        logger.warning("Failed to show loading animation: %s", e)
         # Don't fail the main operation if animation fails
 
 
@@ -175,67 +481,54 @@ def is_bot_mentioned(event: MessageEvent, bot_user_id: str) -> bool:
         event: MessageEvent from LINE webhook
         bot_user_id: Bot's user ID (from webhook body's 'destination' field)
     """
-    print(f"[DEBUG] is_bot_mentioned called, bot_user_id: {bot_user_id}")
-    print(f"[DEBUG] event.source.type: {event.source.type}")
-
     # In 1-on-1 chat, always respond
     if event.source.type == "user":
-        print(f"[DEBUG] 1-on-1 chat detected, returning True")
         return True
 
     # In group/room, check if bot is mentioned
-    print(f"[DEBUG] Group/room chat detected")
-    print(f"[DEBUG] hasattr(event.message, 'mention'): {hasattr(event.message, 'mention')}")
-
-    if hasattr(event.message, 'mention'):
-        print(f"[DEBUG] event.message.mention: {event.message.mention}")
-        if event.message.mention:
-            mentionees = event.message.mention.mentionees
-            print(f"[DEBUG] Number of mentionees: {len(mentionees) if mentionees else 0}")
-
-            if mentionees:
-                for i, mentionee in enumerate(mentionees):
-                    print(f"[DEBUG] Mentionee {i}:")
-                    print(f"[DEBUG]   type: {type(mentionee)}")
-                    print(f"[DEBUG]   hasattr user_id: {hasattr(mentionee, 'user_id')}")
-                    if hasattr(mentionee, 'user_id'):
-                        print(f"[DEBUG]   user_id value: {mentionee.user_id}")
-                        print(f"[DEBUG]   Comparing with bot_user_id: {bot_user_id}")
-
-                    # Check if this mention is for the bot by comparing user_id
-                    # LINE SDK's Mentionee doesn't have isSelf attribute, so we compare user_id directly
-                    if hasattr(mentionee, 'user_id') and mentionee.user_id == bot_user_id:
-                        print(f"[DEBUG] Bot mentioned! (user_id matches)")
-                        return True
-
-    print(f"[DEBUG] Bot not mentioned, returning False")
-    return False
+    mention = getattr(event.message, 'mention', None)
+    mentionees = (mention.mentionees if mention else None) or []
+    # Check if this mention is for the bot by comparing user_id
+    # LINE SDK's Mentionee doesn't have isSelf attribute, so we compare user_id directly
+    mentioned = any(getattr(mentionee, 'user_id', None) == bot_user_id for mentionee in mentionees)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Mention check in %s: bot_user_id=%s, mentionees=%s, mentioned=%s",
+            event.source.type, bot_user_id,
+            [getattr(mentionee, 'user_id', None) for mentionee in mentionees], mentioned
+        )
+    return mentioned
 
 
-async def download_line_content(message_id: str, file_name: str) -> Optional[Path]:
+async def download_line_content(message_id: str, file_name: str) -> tuple[Optional[SpooledContent], Optional[str]]:
     """
-    Download file content from LINE and save to local uploads directory.
-    Returns the local file path if successful, None otherwise.
+    Download file content from LINE into a spooled buffer (in memory up to
+    SPOOL_MAX_MEMORY_MB, then a temporary file in UPLOAD_DIR).
+    The SHA-256 of the content is computed while streaming.
+    Returns (content, content hash) if successful, (None, None) otherwise.
+    The caller must close() the content.
     """
+    _, ext = os.path.splitext(file_name)
+    content = SpooledContent(SPOOL_MAX_MEMORY_MB * 1024 * 1024, UPLOAD_DIR, suffix=ext)
     try:
-        # Get message content from LINE
-        message_content = await line_bot_api.get_message_content(message_id)
-
-        # Extract file extension from original file name
-        _, ext = os.path.splitext(file_name)
-        # Use safe file name (ASCII only) to avoid encoding issues
-        safe_file_name = f"{message_id}{ext}"
-        file_path = UPLOAD_DIR / safe_file_name
+        with stage_seconds.time("download"), tracer.span("line.download", **{'linebot.file_ext': ext}) as span:
+            # Get message content from LINE
+            message_content = await line_bot_api.get_message_content(message_id)
 
-        async with aiofiles.open(file_path, 'wb') as f:
+            content_hash = hashlib.sha256()
             async for chunk in message_content.iter_content():
-                await f.write(chunk)
+                content_hash.update(chunk)
+                await content.write(chunk)
+            span.set_attributes({'linebot.bytes': content.size, 'linebot.in_memory': content.in_memory})
 
-        print(f"Downloaded file: {file_path} (original: {file_name})")
-        return file_path
+        location = "memory" if content.in_memory else content.path
+        logger.info("Downloaded file: %s (%s bytes, %s)", file_name, content.size, location)
+        return content, content_hash.hexdigest()
     except Exception as e:
-        print(f"Error downloading file: {e}")
-        return None
+        logger.error("Error downloading file: %s", e)
+        content.close()
+        return None, None
 
 
 def is_supported_file_format(file_name: str) -> tuple[bool, str]:
@@ -247,128 +540,15 @@ def is_supported_file_format(file_name: str) -> tuple[bool, str]:
     return (ext in SUPPORTED_FILE_EXTENSIONS, ext)
 
 
-def convert_doc_to_docx(input_path: Path) -> tuple[bool, Path | None, str]:
-    """
-    Convert .doc file to .docx using LibreOffice.
-
-    Args:
-        input_path: Path to the .doc file
-
-    Returns:
-        (success, converted_path, message):
-            - success: True if conversion succeeded
-            - converted_path: Path to the converted .docx file (or None if failed)
-            - message: Status or error message
-    """
-    try:
-        # Check if LibreOffice is installed
-        libreoffice_commands = ['soffice', 'libreoffice']
-        libreoffice_path = None
-
-        for cmd in libreoffice_commands:
-            result = subprocess.run(['which', cmd], capture_output=True, text=True)
-            if result.returncode == 0:
-                libreoffice_path = cmd
-                break
-
-        if not libreoffice_path:
-            return False, None, "LibreOffice 未安裝"
-
-        # Prepare output directory and expected output file path
-        output_dir = input_path.parent
-        base_name = input_path.stem  # filename without extension
-        expected_output = output_dir / f"{base_name}.docx"
-
-        # Remove existing output file if it exists
-        if expected_output.exists():
-            expected_output.unlink()
-
-        # Run LibreOffice conversion
-        print(f"[INFO] Converting {input_path.name} to .docx using LibreOffice...")
-        result = subprocess.run([
-            libreoffice_path,
-            '--headless',
-            '--convert-to', 'docx',
-            '--outdir', str(output_dir),
-            str(input_path)
-        ], capture_output=True, text=True, timeout=60)
-
-        # Check if conversion succeeded
-        if result.returncode == 0 and expected_output.exists():
-            print(f"[SUCCESS] Converted to: {expected_output.name}")
-            return True, expected_output, "轉換成功"
-        else:
-            error_msg = result.stderr or result.stdout or "未知錯誤"
-            print(f"[ERROR] Conversion failed: {error_msg}")
-            return False, None, f"轉換失敗：{error_msg}"
-
-    except subprocess.TimeoutExpired:
-        return False, None, "轉換超時（檔案可能太大）"
-    except Exception as e:
-        print(f"[ERROR] Exception during conversion: {e}")
-        return False, None, f"轉換錯誤：{str(e)}"
-
-
-def convert_ppt_to_pptx(input_path: Path) -> tuple[bool, Path | None, str]:
+async def resolve_store(store_name: str) -> Optional[str]:
     """
-    Convert .ppt file to .pptx using LibreOffice.
-
-    Args:
-        input_path: Path to the .ppt file
-
-    Returns:
-        (success, converted_path, message):
-            - success: True if conversion succeeded
-            - converted_path: Path to the converted .pptx file (or None if failed)
-            - message: Status or error message
+    Resolve a store display name to its API name through the store registry.
+    Returns None if the store does not exist.
     """
-    try:
-        # Check if LibreOffice is installed
-        libreoffice_commands = ['soffice', 'libreoffice']
-        libreoffice_path = None
-
-        for cmd in libreoffice_commands:
-            result = subprocess.run(['which', cmd], capture_output=True, text=True)
-            if result.returncode == 0:
-                libreoffice_path = cmd
-                break
-
-        if not libreoffice_path:
-            return False, None, "LibreOffice 未安裝"
-
-        # Prepare output directory and expected output file path
-        output_dir = input_path.parent
-        base_name = input_path.stem  # filename without extension
-        expected_output = output_dir / f"{base_name}.pptx"
-
-        # Remove existing output file if it exists
-        if expected_output.exists():
-            expected_output.unlink()
-
-        # Run LibreOffice conversion
-        print(f"[INFO] Converting {input_path.name} to .pptx using LibreOffice...")
-        result = subprocess.run([
-            libreoffice_path,
-            '--headless',
-            '--convert-to', 'pptx',
-            '--outdir', str(output_dir),
-            str(input_path)
-        ], capture_output=True, text=True, timeout=120)  # PPT files may be larger, give 120 seconds
-
-        # Check if conversion succeeded
-        if result.returncode == 0 and expected_output.exists():
-            print(f"[SUCCESS] Converted to: {expected_output.name}")
-            return True, expected_output, "轉換成功"
-        else:
-            error_msg = result.stderr or result.stdout or "未知錯誤"
-            print(f"[ERROR] Conversion failed: {error_msg}")
-            return False, None, f"轉換失敗：{error_msg}"
-
-    except subprocess.TimeoutExpired:
-        return False, None, "轉換超時（檔案可能太大或內容複雜）"
-    except Exception as e:
-        print(f"[ERROR] Exception during conversion: {e}")
-        return False, None, f"轉換錯誤：{str(e)}"
+    with tracer.span("store.resolve", **{'linebot.store': store_name}) as span:
+        actual_store_name = await store_registry.resolve(store_name)
+        span.set_attribute('linebot.store.found', bool(actual_store_name))
+    return actual_store_name
 
 
 async def ensure_file_search_store_exists(store_name: str) -> tuple[bool, str]:
@@ -378,102 +558,133 @@ async def ensure_file_search_store_exists(store_name: str) -> tuple[bool, str]:
     Note: store_name is used as display_name, but actual name is auto-generated by API.
     """
     try:
-        # List all stores and check if one with our display_name exists
-        stores = client.file_search_stores.list()
-        for store in stores:
-            if hasattr(store, 'display_name') and store.display_name == store_name:
-                print(f"File search store '{store_name}' already exists: {store.name}")
-                return True, store.name
-
-        # Store doesn't exist, create it
-        print(f"Creating file search store with display_name '{store_name}'...")
-        store = client.file_search_stores.create(
-            config={'display_name': store_name}
-        )
-        print(f"File search store created: {store.name} (display_name: {store_name})")
-        return True, store.name
+        # Resolve from the store registry, creating the store if it doesn't exist
+        with tracer.span("store.ensure", **{'linebot.store': store_name}):
+            actual_store_name = await store_registry.ensure(store_name)
+        logger.info("File search store '%s': %s", store_name, actual_store_name)
+        return True, actual_store_name
 
     except Exception as e:
-        print(f"Error ensuring file search store exists: {e}")
+        logger.error("Error ensuring file search store exists: %s", e)
         return False, ""
 
 
-# Cache to store display_name -> actual_name mapping
-store_name_cache = {}
-
 # Cache to store citations/grounding metadata for each user/group
 # Key: store_name, Value: list of grounding chunks
+# (kept in session_backend instead when one is configured)
 citations_cache = {}
 
 
-async def list_documents_in_store(store_name: str) -> list:
+async def save_citations(store_name: str, citations: list):
     """
-    List all documents in a file search store.
-    Returns list of document info dicts.
+    Remember the citations behind the Quick Reply "引用" buttons.
     """
-    try:
-        print(f"[DEBUG] list_documents_in_store called with store_name: {store_name}")
+    if session_backend is None:
+        citations_cache[store_name] = citations
+    else:
+        try:
+            await session_backend.set(
+                f"citations:{store_name}",
+                json.dumps(citations, ensure_ascii=False),
+                SESSION_TTL_SECONDS
+            )
+        except Exception as e:
+            logger.error("Failed to save citations for %s: %s", store_name, e)
+    logger.info("Stored %s citations for %s", len(citations), store_name)
 
-        # Get actual store name
-        actual_store_name = None
-        if store_name in store_name_cache:
-            actual_store_name = store_name_cache[store_name]
-            print(f"[DEBUG] Found in cache: {actual_store_name}")
-        else:
-            # Find store by display_name
-            print(f"[DEBUG] Not in cache, searching for store with display_name: {store_name}")
-            stores = client.file_search_stores.list()
-            print(f"[DEBUG] Total stores found: {len(list(stores))}")
-
-            stores = client.file_search_stores.list()  # Re-list because iterator consumed
-            for store in stores:
-                store_display_name = getattr(store, 'display_name', None)
-                print(f"[DEBUG] Checking store: {store.name}, display_name: {store_display_name}")
-                if hasattr(store, 'display_name') and store.display_name == store_name:
-                    actual_store_name = store.name
-                    store_name_cache[store_name] = actual_store_name
-                    print(f"[DEBUG] Found matching store: {actual_store_name}")
-                    break
 
-        if not actual_store_name:
-            print(f"[DEBUG] Store '{store_name}' not found - returning empty list")
+async def load_citations(store_name: str) -> list:
+    """
+    Get the citations saved by save_citations (empty list if none).
+    """
+    if session_backend is None:
+        citations = citations_cache.get(store_name, [])
+    else:
+        try:
+            raw = await session_backend.get(f"citations:{store_name}")
+        except Exception as e:
+            logger.error("Failed to load citations for %s: %s", store_name, e)
+            citation_lookups.inc("error")
             return []
+        citations = json.loads(raw) if raw else []
+    citation_lookups.inc("hit" if citations else "miss")
+    return citations
 
-        print(f"[DEBUG] Using store: {actual_store_name}")
+# Cache of document lists per store (display_name), updated on upload/delete
+document_cache = DocumentCache(ttl_seconds=DOCUMENT_CACHE_TTL, empty_ttl_seconds=DOCUMENT_CACHE_EMPTY_TTL)
 
-        documents = []
+# Cache of stateless answers per store (actual name), invalidated on upload/delete
+# on any worker (document set versions live in session_backend when configured)
+answer_cache = AnswerCache(ttl_seconds=ANSWER_CACHE_TTL, backend=session_backend)
+
+# Identical concurrent queries and document listings share one in-flight call
+flights = SingleFlight()
+
+# Shrinks photos (and strips their EXIF/GPS data) before they are sent to Gemini
+image_preprocessor = ImagePreprocessor(max_dimension=IMAGE_MAX_DIMENSION, quality=IMAGE_QUALITY)
 
-        # Use REST API to list documents (more stable than SDK)
-        print(f"[DEBUG] Using REST API to list documents")
-        import requests
-        url = f"https://generativelanguage.googleapis.com/v1beta/{actual_store_name}/documents"
-        headers = {'Content-Type': 'application/json'}
-        params = {'key': GOOGLE_API_KEY}
 
-        print(f"[DEBUG] REST API URL: {url}")
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+def store_of_document(document_name: str) -> str:
+    """
+    Get the store name (fileSearchStores/xxx) a document belongs to.
+    """
+    return document_name.split('/documents/')[0]
+
+
+# Lists store documents page by page over the REST API
+document_lister = DocumentLister(
+    http_pool,
+    GEMINI_REST_BASE_URL,
+    GOOGLE_API_KEY,
+    resolve_store=resolve_store,
+    forget_store=store_registry.forget,
+    document_cache=document_cache,
+    flights=flights,
+    page_size=DOCUMENT_PAGE_SIZE
+)
 
-        print(f"[DEBUG] REST API returned {len(data.get('documents', []))} documents")
 
-        for doc in data.get('documents', []):
-            documents.append({
-                'name': doc.get('name', 'N/A'),
-                'display_name': doc.get('displayName', 'Unknown'),
-                'create_time': doc.get('createTime', ''),
-                'update_time': doc.get('updateTime', '')
-            })
-            print(f"[DEBUG] File found in store '{store_name}': {doc.get('displayName', 'Unknown')}")
+async def has_documents(store_name: str) -> bool:
+    """
+    Check whether a store has at least one document.
+    Returns False if the check fails.
+    """
+    try:
+        with stage_seconds.time("list_documents"), tracer.span("documents.list", **{'linebot.store': store_name}) as span:
+            found = await document_lister.has_documents(store_name)
+            span.set_attribute('linebot.documents.found', found)
+            return found
+    except Exception as e:
+        logger.error("Error checking documents in store: %s", e)
+        return False
+
 
-        print(f"[DEBUG] Returning {len(documents)} documents")
-        return documents
+async def get_documents_page(store_name: str, page: int, page_size: int) -> tuple[list, bool, Optional[int]]:
+    """
+    Get one page of documents for the files carousel.
 
+    Returns:
+        (page_documents, has_next_page, total_documents or None if not fully listed);
+        ([], False, 0) if listing fails
+    """
+    try:
+        with stage_seconds.time("list_documents"), tracer.span("documents.list", **{'linebot.store': store_name}) as span:
+            page_documents, has_next, total = await document_lister.get_page(store_name, page, page_size)
+            span.set_attribute('linebot.documents.count', len(page_documents))
+            return page_documents, has_next, total
     except Exception as e:
-        print(f"[ERROR] Error listing documents in store: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
+        logger.exception("Error listing documents in store: %s", e)
+        return [], False, 0
+
+
+async def forget_deleted_document(document_name: str):
+    """
+    Drop a deleted document from the caches and indexes that refer to it.
+    """
+    document_cache.remove_document(document_name)
+    await answer_cache.bump(store_of_document(document_name))
+    await upload_index.forget_document(document_name)
+    await document_insights.forget_document(document_name)
 
 
 async def delete_document(document_name: str) -> bool:
@@ -485,94 +696,158 @@ async def delete_document(document_name: str) -> bool:
     try:
         # Try to use SDK method first with force=True
         try:
-            if hasattr(client.file_search_stores, 'documents'):
-                # Force delete is required for File Search Store documents
-                client.file_search_stores.documents.delete(
-                    name=document_name,
-                    config={'force': True}
-                )
-                print(f"Document deleted successfully with force=True: {document_name}")
-                return True
+            # Force delete is required for File Search Store documents
+            with tracer.span("gemini.delete_document", **{'linebot.store': store_of_document(document_name)}):
+                await gemini.delete_document(document_name)
+            logger.info("Document deleted successfully with force=True: %s", document_name)
+            await forget_deleted_document(document_name)
+            return True
         except Exception as sdk_error:
-            print(f"SDK delete failed, trying REST API: {sdk_error}")
+            logger.warning("SDK delete failed, trying REST API: %s", sdk_error)
 
         # Fallback to REST API with force parameter
-        import requests
-        url = f"https://generativelanguage.googleapis.com/v1beta/{document_name}"
+        url = f"{GEMINI_REST_BASE_URL}/{document_name}"
         headers = {'Content-Type': 'application/json'}
         params = {
             'key': GOOGLE_API_KEY,
             'force': 'true'  # Required for File Search Store documents
         }
 
-        response = requests.delete(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
+        async with http_pool.session.delete(
+            url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            response.raise_for_status()
 
-        print(f"Document deleted successfully via REST API with force=true: {document_name}")
+        logger.info("Document deleted successfully via REST API with force=true: %s", document_name)
+        await forget_deleted_document(document_name)
         return True
 
     except Exception as e:
-        print(f"Error deleting document: {e}")
+        logger.error("Error deleting document: %s", e)
         return False
 
 
-async def upload_to_file_search_store(file_path: Path, store_name: str, display_name: Optional[str] = None) -> bool:
+# Results of upload_to_file_search_store
+UPLOAD_DONE = "done"        # indexed before the wait window elapsed
+UPLOAD_PENDING = "pending"  # still indexing; on_background_done will be called later
+UPLOAD_FAILED = "failed"
+
+
+async def record_uploaded_document(
+    operation,
+    store_name: str,
+    actual_store_name: str,
+    display_name: str,
+    content_hash: Optional[str] = None
+):
+    """
+    Update the document cache, answer cache and upload index after indexing finished,
+    and queue the document for summary/key point precomputation.
+    """
+    await answer_cache.bump(actual_store_name)
+    document_name = getattr(operation.response, 'document_name', None) if operation.response else None
+    if document_name:
+        if insight_dispatcher is not None:
+            run_in_background(insight_dispatcher.submit(document_name, store_name, document_name, display_name))
+        now = datetime.now(timezone.utc).isoformat()
+        document_cache.add_document(store_name, {
+            'name': document_name,
+            'display_name': display_name,
+            'create_time': now,
+            'update_time': now
+        })
+        if content_hash:
+            await upload_index.record(content_hash, store_name, document_name, display_name)
+    else:
+        document_cache.invalidate(store_name)
+
+
+async def upload_to_file_search_store(
+    file: Union[Path, SpooledContent],
+    store_name: str,
+    display_name: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    on_background_done: Optional[Callable[[bool], Awaitable[None]]] = None
+) -> str:
     """
     Upload a file to Gemini file search store.
-    Returns True if successful, False otherwise.
+    Waits up to UPLOAD_WAIT_SECONDS for indexing. If indexing takes longer and
+    on_background_done is given, the operation keeps being watched (until
+    UPLOAD_DEADLINE_SECONDS) and on_background_done(success) is called when it ends.
+
+    file is a local file or downloaded content (uploaded straight from memory).
+    Returns UPLOAD_DONE, UPLOAD_PENDING or UPLOAD_FAILED.
+    When content_hash is given, the resulting document is recorded in upload_index.
     """
+    display_name = display_name or (file.name if isinstance(file, Path) else "unknown_file")
     try:
-        # Check cache first
-        if store_name in store_name_cache:
-            actual_store_name = store_name_cache[store_name]
-            print(f"Using cached store name: {actual_store_name}")
-        else:
-            # Ensure the store exists before uploading
-            success, actual_store_name = await ensure_file_search_store_exists(store_name)
-            if not success:
-                print(f"Failed to ensure store '{store_name}' exists")
-                return False
-            # Cache the mapping
-            store_name_cache[store_name] = actual_store_name
+        # Ensure the store exists before uploading
+        success, actual_store_name = await ensure_file_search_store_exists(store_name)
+        if not success:
+            logger.warning("Failed to ensure store '%s' exists", store_name)
+            return UPLOAD_FAILED
 
         # Upload to file search store
         # actual_store_name is the API-generated name (e.g., fileSearchStores/xxx)
         # display_name is the custom display name for the file (used in citations)
-        config_dict = {}
-        if display_name:
-            config_dict['display_name'] = display_name
-
-        operation = client.file_search_stores.upload_to_file_search_store(
-            file_search_store_name=actual_store_name,
-            file=str(file_path),
-            config=config_dict if config_dict else None
-        )
-
-        # Wait for operation to complete (with timeout)
-        max_wait = 60  # seconds
-        elapsed = 0
-        while not operation.done and elapsed < max_wait:
-            await asyncio.sleep(2)
-            operation = client.operations.get(operation)
-            elapsed += 2
+        if isinstance(file, SpooledContent):
+            # Streams have no name to guess the MIME type from
+            mime_type = mimetypes.guess_type(display_name)[0] or 'application/octet-stream'
+            source, config = file.open(), {'display_name': display_name, 'mime_type': mime_type}
+        else:
+            source, config = str(file), {'display_name': display_name}
+        with stage_seconds.time("upload"), tracer.span(
+            "gemini.upload_to_file_search_store",
+            **{'linebot.store': store_name, 'linebot.mime_type': config.get('mime_type')}
+        ):
+            operation = await gemini.upload_to_file_search_store(actual_store_name, source, config=config)
+
+        # Wait for indexing with exponential backoff
+        with stage_seconds.time("indexing_wait"), tracer.span("gemini.indexing_wait", **{'linebot.store': store_name}) as span:
+            operation = await operation_tracker.wait(operation, timeout=UPLOAD_WAIT_SECONDS)
+            span.set_attribute('linebot.indexing.done', bool(operation.done))
 
         if operation.done:
-            print(f"File uploaded to store '{store_name}': {operation}")
-            return True
-        else:
-            print(f"Upload operation timeout for store '{store_name}'")
-            return False
+            if operation.error:
+                logger.warning("Upload operation failed for store '%s': %s", store_name, operation.error)
+                return UPLOAD_FAILED
+            logger.info("File uploaded to store '%s': %s", store_name, operation)
+            await record_uploaded_document(operation, store_name, actual_store_name, display_name, content_hash)
+            return UPLOAD_DONE
+
+        if on_background_done is None:
+            logger.warning("Upload operation timeout for store '%s'", store_name)
+            return UPLOAD_FAILED
+
+        # Still indexing: keep watching after the handler returns
+        logger.info("Upload still indexing for store '%s', watching in background", store_name)
+
+        async def on_done(final_operation):
+            success = bool(final_operation.done and not final_operation.error)
+            if success:
+                logger.info("File uploaded to store '%s' (background): %s", store_name, final_operation)
+                await record_uploaded_document(final_operation, store_name, actual_store_name, display_name, content_hash)
+            else:
+                logger.warning("Upload operation did not complete for store '%s'", store_name)
+            await on_background_done(success)
+
+        operation_tracker.watch(
+            operation,
+            on_done,
+            timeout=max(0, UPLOAD_DEADLINE_SECONDS - UPLOAD_WAIT_SECONDS)
+        )
+        return UPLOAD_PENDING
 
     except Exception as e:
         error_msg = str(e)
-        print(f"Error uploading to file search store: {error_msg}")
+        logger.error("Error uploading to file search store: %s", error_msg)
 
         # Check if it's a file format related error
         if '500' in error_msg or 'INTERNAL' in error_msg:
-            print(f"[WARNING] Possible unsupported file format or corrupted file: {file_path}")
-            print(f"[INFO] File extension: {file_path.suffix}")
+            logger.warning("Possible unsupported file format or corrupted file: %s", display_name)
+            logger.debug("File extension: %s", Path(display_name).suffix)
 
-        return False
+        return UPLOAD_FAILED
 
 
 async def query_file_search(query: str, store_name: str) -> tuple[str, list]:
@@ -582,32 +857,89 @@ async def query_file_search(query: str, store_name: str) -> tuple[str, list]:
 
     Note: This is the legacy stateless query method.
     For conversation memory, use query_file_search_with_session() instead.
+
+    Concurrent identical queries (same store, normalized prompt and model) share
+    one request, and answers are cached per (store, document set version,
+    normalized prompt).
+    """
+    text, citations = await flights.do(
+        ('query', store_name, normalize_prompt(query), MODEL_NAME),
+        lambda: _query_file_search(query, store_name)
+    )
+    return text, list(citations)
+
+
+def extract_citations(response) -> list:
     """
+    Build the citation list (web and file search sources) from the grounding
+    metadata of a Gemini response.
+    """
+    citations = []
     try:
-        # Get actual store name from cache or by searching
-        actual_store_name = None
+        if hasattr(response, 'candidates') and response.candidates:
+            candidate = response.candidates[0]
+            if hasattr(candidate, 'grounding_metadata') and candidate.grounding_metadata:
+                grounding_chunks = candidate.grounding_metadata.grounding_chunks or []
+                for chunk in grounding_chunks:
+                    if hasattr(chunk, 'web') and chunk.web:
+                        # Web source
+                        citations.append({
+                            'type': 'web',
+                            'title': getattr(chunk.web, 'title', 'Unknown'),
+                            'uri': getattr(chunk.web, 'uri', ''),
+                        })
+                    elif hasattr(chunk, 'retrieved_context') and chunk.retrieved_context:
+                        # File search source
+                        citations.append({
+                            'type': 'file',
+                            'title': getattr(chunk.retrieved_context, 'title', 'Unknown'),
+                            'text': getattr(chunk.retrieved_context, 'text', '')[:500],  # Limit to 500 chars
+                        })
+        logger.debug("Found %s citations", len(citations))
+    except Exception as citation_error:
+        logger.error("Error extracting citations: %s", citation_error)
+    return citations
+
+
+def usage_attributes(response) -> dict:
+    """
+    Token usage of a Gemini response as span attributes (empty if unknown).
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return {}
+    return {
+        'gen_ai.usage.input_tokens': usage.prompt_token_count,
+        'gen_ai.usage.output_tokens': usage.candidates_token_count,
+        'gen_ai.usage.total_tokens': usage.total_token_count,
+    }
 
-        if store_name in store_name_cache:
-            actual_store_name = store_name_cache[store_name]
-            print(f"Using cached store name for query: {actual_store_name}")
-        else:
-            # Try to find the store by display_name
-            try:
-                stores = client.file_search_stores.list()
-                for store in stores:
-                    if hasattr(store, 'display_name') and store.display_name == store_name:
-                        actual_store_name = store.name
-                        store_name_cache[store_name] = actual_store_name
-                        print(f"Found store for query: {actual_store_name}")
-                        break
-            except Exception as list_error:
-                print(f"Error listing stores: {list_error}")
+
+async def _query_file_search(query: str, store_name: str) -> tuple[str, list]:
+    """
+    Uncoalesced implementation of query_file_search().
+    """
+    try:
+        # Get actual store name from the store registry
+        actual_store_name = None
+        try:
+            actual_store_name = await resolve_store(store_name)
+            logger.debug("Using store for query: %s", actual_store_name)
+        except Exception as list_error:
+            logger.error("Error listing stores: %s", list_error)
 
         if not actual_store_name:
             # Store doesn't exist - guide user to upload files
-            print(f"File search store '{store_name}' not found")
+            logger.warning("File search store '%s' not found", store_name)
             return ("📁 您還沒有上傳任何檔案。\n\n請先傳送文件檔案（PDF、DOCX、TXT 等）給我，上傳完成後就可以開始提問了！\n\n💡 提示：如果您想分析圖片，請直接傳送圖片給我，我會立即為您分析。", [])
 
+        # Same prompt on the same documents (e.g. a Quick Reply tapped again)
+        document_set_version = await answer_cache.version(actual_store_name)
+        cached_answer = answer_cache.get(actual_store_name, query, document_set_version)
+        if cached_answer:
+            logger.info("Answer cache hit for %s", actual_store_name)
+            return cached_answer
+
         # Create FileSearch tool with actual store name
         tool = types.Tool(
             file_search=types.FileSearch(
@@ -616,56 +948,43 @@ async def query_file_search(query: str, store_name: str) -> tuple[str, list]:
         )
 
         # Generate content with file search
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=query,
-            config=types.GenerateContentConfig(
-                tools=[tool],
-                temperature=0.7,
+        with stage_seconds.time("query"), tracer.span(
+            "gemini.generate_content", **{'gen_ai.request.model': MODEL_NAME, 'linebot.store': store_name}
+        ) as span:
+            response = await gemini.generate_content(
+                model=MODEL_NAME,
+                contents=query,
+                config=types.GenerateContentConfig(
+                    tools=[tool],
+                    temperature=0.7,
+                )
             )
-        )
-
-        # Extract grounding metadata (citations)
-        citations = []
-        try:
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'grounding_metadata') and candidate.grounding_metadata:
-                    grounding_chunks = candidate.grounding_metadata.grounding_chunks
-                    for chunk in grounding_chunks:
-                        if hasattr(chunk, 'web') and chunk.web:
-                            # Web source
-                            citations.append({
-                                'type': 'web',
-                                'title': getattr(chunk.web, 'title', 'Unknown'),
-                                'uri': getattr(chunk.web, 'uri', ''),
-                            })
-                        elif hasattr(chunk, 'retrieved_context') and chunk.retrieved_context:
-                            # File search source
-                            citations.append({
-                                'type': 'file',
-                                'title': getattr(chunk.retrieved_context, 'title', 'Unknown'),
-                                'text': getattr(chunk.retrieved_context, 'text', '')[:500],  # Limit to 500 chars
-                            })
-            print(f"Found {len(citations)} citations")
-        except Exception as citation_error:
-            print(f"Error extracting citations: {citation_error}")
+            # Extract grounding metadata (citations)
+            citations = extract_citations(response)
+            span.set_attributes({**usage_attributes(response), 'linebot.citations.count': len(citations)})
 
         # Extract text from response
         if response.text:
+            answer_cache.set(actual_store_name, query, response.text, citations, document_set_version)
             return (response.text, citations)
         else:
             return ("抱歉，我無法從文件中找到相關資訊。", [])
 
     except Exception as e:
-        print(f"Error querying file search: {e}")
+        logger.error("Error querying file search: %s", e)
         # Check if error is related to missing store
         if "not found" in str(e).lower() or "does not exist" in str(e).lower():
+            await store_registry.forget(store_name)
             return ("📁 您還沒有上傳任何檔案。\n\n請先傳送文件檔案（PDF、DOCX、TXT 等）給我，上傳完成後就可以開始提問了！\n\n💡 提示：如果您想分析圖片，請直接傳送圖片給我，我會立即為您分析。", [])
         return (f"查詢時發生錯誤：{str(e)}", [])
 
 
-async def query_file_search_with_session(query: str, user_id: str, store_name: str) -> tuple[str, list]:
+async def query_file_search_with_session(
+    query: str,
+    session_key: str,
+    store_name: str,
+    on_text: Optional[Callable[[str], Awaitable[None]]] = None
+) -> tuple[str, list]:
     """
     Query using ADK Chat Session with conversation memory.
     Implements Option A: Check if documents exist before enabling File Search.
@@ -674,111 +993,102 @@ async def query_file_search_with_session(query: str, user_id: str, store_name: s
 
     Args:
         query: User's question
-        user_id: User ID for session management
+        session_key: Session key from get_session_key()
         store_name: File search store name (display_name format like "user_xxx")
+        on_text: If given, the answer is streamed and on_text is awaited with
+                 each text chunk as it arrives
     """
     try:
-        print(f"[INFO] query_file_search_with_session called")
-        print(f"[INFO] user_id: {user_id}, store_name: {store_name}")
+        logger.debug("query_file_search_with_session: session_key=%s, store_name=%s", session_key, store_name)
 
         # Step 1: Check if user has uploaded any documents
-        documents = await list_documents_in_store(store_name)
-        print(f"[INFO] Found {len(documents)} documents in store")
-
-        if len(documents) == 0:
+        if not await has_documents(store_name):
             # No documents - prompt user to upload
-            print(f"[INFO] No documents found, prompting user to upload")
+            logger.info("No documents found, prompting user to upload")
             return ("📁 您還沒有上傳任何檔案。\n\n請先傳送文件檔案（PDF、DOCX、TXT 等）給我，上傳完成後就可以開始提問了！\n\n💡 提示：如果您想分析圖片，請直接傳送圖片給我，我會立即為您分析。", [])
 
         # Step 2: Get actual store name (API name, not display name)
-        actual_store_name = None
-        if store_name in store_name_cache:
-            actual_store_name = store_name_cache[store_name]
-            print(f"[INFO] Using cached actual store name: {actual_store_name}")
-        else:
-            # Find store by display_name
-            stores = client.file_search_stores.list()
-            for store in stores:
-                if hasattr(store, 'display_name') and store.display_name == store_name:
-                    actual_store_name = store.name
-                    store_name_cache[store_name] = actual_store_name
-                    print(f"[INFO] Found actual store name: {actual_store_name}")
-                    break
+        actual_store_name = await resolve_store(store_name)
+        logger.debug("Using actual store name: %s", actual_store_name)
 
         if not actual_store_name:
-            print(f"[ERROR] Could not find actual store name for: {store_name}")
+            logger.error("Could not find actual store name for: %s", store_name)
             return ("系統錯誤：無法找到文件庫。", [])
 
-        # Step 3: Get or create chat session with File Search enabled
-        print(f"[INFO] Getting or creating session with File Search enabled")
-        chat = session_manager.get_or_create_session(
-            user_id=user_id,
-            store_name=actual_store_name,
-            enable_file_search=True
-        )
-
-        # Step 4: Send message through chat session
-        print(f"[INFO] Sending message to chat session")
-        response = chat.send_message(query)
+        # Lock the session for the turn so a background compaction cannot drop it
+        async with session_manager.session_lock(session_key):
+            # Step 3: Get or create chat session with File Search enabled
+            logger.debug("Getting or creating session with File Search enabled")
+            chat = await session_manager.get_or_create_session(
+                session_key=session_key,
+                store_name=actual_store_name,
+                enable_file_search=True
+            )
 
-        # Step 5: Extract citations (similar to stateless method)
-        citations = []
-        try:
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'grounding_metadata') and candidate.grounding_metadata:
-                    grounding_chunks = candidate.grounding_metadata.grounding_chunks
-                    for chunk in grounding_chunks:
-                        if hasattr(chunk, 'web') and chunk.web:
-                            citations.append({
-                                'type': 'web',
-                                'title': getattr(chunk.web, 'title', 'Unknown'),
-                                'uri': getattr(chunk.web, 'uri', ''),
-                            })
-                        elif hasattr(chunk, 'retrieved_context') and chunk.retrieved_context:
-                            citations.append({
-                                'type': 'file',
-                                'title': getattr(chunk.retrieved_context, 'title', 'Unknown'),
-                                'text': getattr(chunk.retrieved_context, 'text', '')[:500],
-                            })
-            print(f"[INFO] Found {len(citations)} citations")
-        except Exception as citation_error:
-            print(f"[ERROR] Error extracting citations: {citation_error}")
+            # Step 4: Send message through chat session
+            span_attributes = {
+                'gen_ai.request.model': MODEL_NAME,
+                'linebot.store': store_name,
+                'linebot.streaming': on_text is not None,
+            }
+            with tracer.span("gemini.chat.send_message", **span_attributes) as span:
+                if on_text is None:
+                    logger.debug("Sending message to chat session")
+                    with stage_seconds.time("chat_send"):
+                        response = await chat.send_message(query)
+                    response_text = response.text
+                    usage_response = response
+                else:
+                    logger.debug("Streaming message to chat session")
+                    text_parts = []
+                    response = usage_response = None
+                    started = time.monotonic()
+                    with stage_seconds.time("chat_send"):
+                        async for chunk in await chat.send_message_stream(query):
+                            if chunk.text:
+                                if not text_parts:
+                                    stage_seconds.observe("chat_first_chunk", time.monotonic() - started)
+                                    span.set_attribute('linebot.first_chunk_ms', round((time.monotonic() - started) * 1000))
+                                text_parts.append(chunk.text)
+                                await on_text(chunk.text)
+                            # Grounding metadata arrives with the final chunks
+                            if response is None or (chunk.candidates and chunk.candidates[0].grounding_metadata):
+                                response = chunk
+                            # Token usage comes with the last chunk
+                            if chunk.usage_metadata:
+                                usage_response = chunk
+                    response_text = "".join(text_parts)
+
+                # Step 5: Extract citations (similar to stateless method)
+                citations = extract_citations(response)
+                span.set_attributes({**usage_attributes(usage_response), 'linebot.citations.count': len(citations)})
+            await session_manager.end_turn(session_key)
+
+        # Summarizing old turns costs a model call, so it runs after the reply
+        run_in_background(session_manager.compact_session(session_key))
 
         # Step 6: Return response
-        if response.text:
-            print(f"[INFO] Successfully generated response with session")
-            return (response.text, citations)
+        if response_text:
+            logger.info("Successfully generated response with session")
+            return (response_text, citations)
         else:
             return ("抱歉，我無法從文件中找到相關資訊。", [])
 
     except Exception as e:
-        print(f"[ERROR] Error in query_file_search_with_session: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in query_file_search_with_session: %s", e)
         return (f"查詢時發生錯誤：{str(e)}", [])
 
 
-async def analyze_image_with_gemini(image_path: Path) -> str:
+async def analyze_image_with_gemini(image_bytes: bytes) -> str:
     """
     Analyze image using Gemini's vision capability.
     Returns the analysis result text.
     """
     try:
-        # Read image bytes
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-
-        # Determine MIME type based on file extension
-        ext = image_path.suffix.lower()
-        mime_type_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }
-        mime_type = mime_type_map.get(ext, 'image/jpeg')
+        # Downscale and re-encode off the event loop; the MIME type is
+        # sniffed from the bytes (LINE does not say which format it sends)
+        with stage_seconds.time("image_preprocess"):
+            image_bytes, mime_type = await image_preprocessor.prepare_async(image_bytes)
 
         # Create image part
         image = types.Part.from_bytes(
@@ -787,10 +1097,15 @@ async def analyze_image_with_gemini(image_path: Path) -> str:
         )
 
         # Generate content with image
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=["請詳細描述這張圖片的內容，包括主要物品、場景、文字等資訊。", image],
-        )
+        with stage_seconds.time("image_analysis"), tracer.span(
+            "gemini.generate_content",
+            **{'gen_ai.request.model': MODEL_NAME, 'linebot.purpose': 'image_analysis', 'linebot.bytes': len(image_bytes)}
+        ) as span:
+            response = await gemini.generate_content(
+                model=MODEL_NAME,
+                contents=["請詳細描述這張圖片的內容，包括主要物品、場景、文字等資訊。", image],
+            )
+            span.set_attributes(usage_attributes(response))
 
         if response.text:
             return response.text
@@ -798,7 +1113,7 @@ async def analyze_image_with_gemini(image_path: Path) -> str:
             return "抱歉，我無法分析這張圖片。"
 
     except Exception as e:
-        print(f"Error analyzing image with Gemini: {e}")
+        logger.error("Error analyzing image with Gemini: %s", e)
         return f"圖片分析時發生錯誤：{str(e)}"
 
 
@@ -810,33 +1125,100 @@ async def handle_image_message(event: MessageEvent, message: ImageMessage):
     file_name = f"image_{message.id}.jpg"
 
     # Show loading animation (15 seconds for image analysis)
-    await show_loading_animation(reply_target, loading_seconds=15)
+    run_in_background(show_loading_animation(reply_target, loading_seconds=15))
 
     # Download image
     reply_msg = TextSendMessage(text="正在分析您的圖片，請稍候...")
     await line_bot_api.reply_message(event.reply_token, reply_msg)
 
-    file_path = await download_line_content(message.id, file_name)
+    content, _ = await download_line_content(message.id, file_name)
 
-    if file_path is None:
+    if content is None:
         error_msg = TextSendMessage(text="圖片下載失敗，請重試。")
         await line_bot_api.push_message(reply_target, error_msg)
         return
 
-    # Analyze image with Gemini
-    analysis_result = await analyze_image_with_gemini(file_path)
-
-    # Clean up local file
-    try:
-        file_path.unlink()
-    except Exception as e:
-        print(f"Error deleting file: {e}")
+    # Analyze image with Gemini (straight from the download buffer)
+    with content:
+        image_bytes = await content.read_bytes()
+    analysis_result = await analyze_image_with_gemini(image_bytes)
 
     # Send analysis result
     result_msg = TextSendMessage(text=f"📸 圖片分析結果：\n\n{analysis_result}")
     await line_bot_api.push_message(reply_target, result_msg)
 
 
+# Prompts sent by the file Quick Reply buttons; also precomputed after ingest
+INSIGHT_PROMPTS = {
+    'summary': '請幫我生成「{file_name}」這個檔案的摘要',
+    'key_points': '請幫我整理「{file_name}」的重點',
+}
+
+
+def build_citation_quick_reply(citations: list) -> Optional[QuickReply]:
+    """
+    Create Quick Reply buttons for citations (limited to 3).
+    Uses Postback instead of MessageAction for better Group chat support.
+    """
+    if not citations:
+        return None
+    quick_reply_items = []
+    for i, citation in enumerate(citations[:3], 1):  # Limit to 3 citations
+        quick_reply_items.append(
+            QuickReplyButton(action=PostbackAction(
+                label=f"📖 引用{i}",
+                data=f"action=view_citation&num={i}"
+            ))
+        )
+    return QuickReply(items=quick_reply_items)
+
+
+def build_file_quick_reply(file_name: str) -> QuickReply:
+    """
+    Create Quick Reply buttons for common actions with specific file name.
+    Using Postback instead of MessageAction for better Group chat support.
+    """
+    return QuickReply(items=[
+        QuickReplyButton(action=PostbackAction(
+            label="📝 生成檔案摘要",
+            data=f"action=query&prompt={urllib.parse.quote(INSIGHT_PROMPTS['summary'].format(file_name=file_name))}"
+        )),
+        QuickReplyButton(action=PostbackAction(
+            label="📌 重點整理",
+            data=f"action=query&prompt={urllib.parse.quote(INSIGHT_PROMPTS['key_points'].format(file_name=file_name))}"
+        )),
+        QuickReplyButton(action=PostbackAction(
+            label="📋 列出檔案",
+            data="action=list_files"
+        )),
+    ])
+
+
+async def find_existing_upload(content_hash: Optional[str], store_name: str) -> Optional[dict]:
+    """
+    Look up an earlier upload of the same content to this store.
+    An entry whose document is missing from the cached document list is checked
+    against a fresh listing before it is dropped, since the cached list may
+    predate an upload made by another worker.
+    """
+    if not content_hash:
+        return None
+    existing = await upload_index.lookup(content_hash, store_name)
+    if existing is None:
+        return None
+    cached_documents = document_cache.get(store_name)
+    if cached_documents is None or any(doc['name'] == existing['document_name'] for doc in cached_documents):
+        return existing
+
+    try:
+        documents = [doc async for doc in document_lister.iter_documents(store_name)]
+    except Exception as e:
+        logger.warning("Could not verify indexed document %s: %s", existing['document_name'], e)
+        return existing
+    document_cache.set(store_name, documents)
+    return await upload_index.find(content_hash, store_name, documents)
+
+
 async def handle_document_message(event: MessageEvent, message: FileMessage):
     """
     Handle file messages - download and upload to file search store.
@@ -851,127 +1233,154 @@ async def handle_document_message(event: MessageEvent, message: FileMessage):
         # Send unsupported format message
         error_msg = TextSendMessage(text=UNSUPPORTED_FORMAT_MESSAGE.format(extension=file_ext))
         await line_bot_api.reply_message(event.reply_token, error_msg)
-        print(f"[WARNING] Unsupported file format: {file_name} ({file_ext})")
+        logger.warning("Unsupported file format: %s (%s)", file_name, file_ext)
         return
 
     # Show loading animation based on file type
     # .ppt files need more time (60s), others need 30s
     loading_duration = 60 if file_ext == '.ppt' else 30
-    await show_loading_animation(reply_target, loading_seconds=loading_duration)
+    run_in_background(show_loading_animation(reply_target, loading_seconds=loading_duration))
 
     # Download file
     reply_msg = TextSendMessage(text="正在處理您的檔案，請稍候...")
     await line_bot_api.reply_message(event.reply_token, reply_msg)
 
-    file_path = await download_line_content(message.id, file_name)
+    content, content_hash = await download_line_content(message.id, file_name)
 
-    if file_path is None:
+    if content is None:
         error_msg = TextSendMessage(text="檔案下載失敗，請重試。")
         await line_bot_api.push_message(reply_target, error_msg)
         return
 
-    # Check if file is .doc and convert to .docx
-    converted_file_path = None
-    conversion_notice = ""
-    if file_ext == '.doc':
-        print(f"[INFO] Detected .doc file, attempting conversion: {file_name}")
-
-        # Notify user about conversion
-        converting_msg = TextSendMessage(text="🔄 偵測到 .doc 格式，正在自動轉換為 .docx...")
-        await line_bot_api.push_message(reply_target, converting_msg)
+    with content:
+        status, file_name, conversion_notice = await ingest_downloaded_file(
+            content, content_hash, file_name, file_ext, store_name, reply_target
+        )
 
-        success_convert, converted_path, message_convert = convert_doc_to_docx(file_path)
+    if status is None:
+        return
+    if status == UPLOAD_PENDING:
+        pending_msg = TextSendMessage(
+            text=f"⏳ 檔案已上傳，仍在建立索引中，完成後會通知您。\n檔案名稱：{file_name}"
+        )
+        await line_bot_api.push_message(reply_target, pending_msg)
+    else:
+        await line_bot_api.push_message(
+            reply_target,
+            build_upload_result_message(file_name, status == UPLOAD_DONE, conversion_notice)
+        )
 
-        if success_convert and converted_path:
-            print(f"[SUCCESS] Conversion completed: {converted_path.name}")
-            converted_file_path = converted_path
-            # Update file_name to use .docx extension
-            file_name = file_name.rsplit('.', 1)[0] + '.docx'
-            conversion_notice = "\n\n📝 註：檔案已自動從 .doc 轉換為 .docx 格式"
-        else:
-            # Conversion failed
-            error_msg = TextSendMessage(
-                text=f"❌ .doc 檔案轉換失敗\n\n{message_convert}\n\n建議：請使用 Microsoft Word 將檔案另存為 .docx 格式後重新上傳。"
-            )
-            await line_bot_api.push_message(reply_target, error_msg)
 
-            # Clean up downloaded file
-            try:
-                file_path.unlink()
-            except Exception as e:
-                print(f"Error deleting file: {e}")
-            return
+async def ingest_downloaded_file(
+    content: SpooledContent,
+    content_hash: str,
+    file_name: str,
+    file_ext: str,
+    store_name: str,
+    reply_target: str
+) -> tuple[Optional[str], str, str]:
+    """
+    Deduplicate, convert (if needed) and upload downloaded content.
+    Content is uploaded from memory; it is only written to disk when
+    LibreOffice has to convert it.
 
-    # Check if file is .ppt and convert to .pptx
-    elif file_ext == '.ppt':
-        print(f"[INFO] Detected .ppt file, attempting conversion: {file_name}")
+    Returns (upload status, or None if the user was already answered,
+    final file name, conversion notice).
+    """
+    # Same bytes already indexed in this store: skip conversion, upload and indexing
+    existing_upload = await find_existing_upload(content_hash, store_name)
+    if existing_upload:
+        logger.info("Duplicate upload of %s to %s: %s", file_name, store_name, existing_upload['document_name'])
+        existing_name = existing_upload['display_name'] or file_name
+        duplicate_msg = TextSendMessage(
+            text=f"✅ 這個檔案已經上傳過了！\n檔案名稱：{existing_name}\n\n不需要重新上傳，您可以直接詢問我關於這個檔案的任何問題。",
+            quick_reply=build_file_quick_reply(existing_name)
+        )
+        await line_bot_api.push_message(reply_target, duplicate_msg)
+        return None, file_name, ""
 
-        # Notify user about conversion
-        converting_msg = TextSendMessage(text="🔄 偵測到 .ppt 格式，正在自動轉換為 .pptx...\n\n⏳ PPT 檔案較大，轉換可能需要 10-30 秒，請稍候...")
-        await line_bot_api.push_message(reply_target, converting_msg)
+    # Convert legacy formats (.doc, .ppt, ...) according to the registered rule
+    upload_source: Union[Path, SpooledContent] = content
+    converted_file_path = None  # LibreOffice output owned by this upload
+    cached_path = None  # Cached output pinned for this upload
+    conversion_notice = ""
+    conversion_rule = conversion_pipeline.get_rule(file_ext)
+    if conversion_rule:
+        target_ext = conversion_rule['target_ext']
+        logger.info("Detected %s file, attempting conversion: %s", file_ext, file_name)
+
+        # Cached output is uploaded as-is, without writing the source to disk;
+        # it is pinned in the cache until the upload is done
+        cached_path = conversion_pipeline.cached_output(content_hash, file_ext)
+        if cached_path:
+            success_convert, converted_path, message_convert = True, cached_path, "轉換成功（快取）"
+        else:
+            # Notify user about conversion
+            converting_msg = TextSendMessage(
+                text=f"🔄 偵測到 {file_ext} 格式，正在自動轉換為 .{target_ext}...{conversion_rule['wait_hint']}"
+            )
+            await line_bot_api.push_message(reply_target, converting_msg)
 
-        success_convert, converted_path, message_convert = convert_ppt_to_pptx(file_path)
+            # LibreOffice needs a real file
+            input_path = await content.to_path()
+            with stage_seconds.time("conversion"):
+                success_convert, converted_path, message_convert = await conversion_pipeline.convert(
+                    input_path, file_ext, digest=content_hash
+                )
+            converted_file_path = converted_path
 
         if success_convert and converted_path:
-            print(f"[SUCCESS] Conversion completed: {converted_path.name}")
-            converted_file_path = converted_path
-            # Update file_name to use .pptx extension
-            file_name = file_name.rsplit('.', 1)[0] + '.pptx'
-            conversion_notice = "\n\n📊 註：檔案已自動從 .ppt 轉換為 .pptx 格式"
+            logger.info("Conversion completed: %s", converted_path.name)
+            upload_source = converted_path
+            # Update file_name to use the converted extension
+            file_name = file_name.rsplit('.', 1)[0] + f'.{target_ext}'
+            conversion_notice = f"\n\n{conversion_rule['icon']} 註：檔案已自動從 {file_ext} 轉換為 .{target_ext} 格式"
         else:
             # Conversion failed
             error_msg = TextSendMessage(
-                text=f"❌ .ppt 檔案轉換失敗\n\n{message_convert}\n\n建議：請使用 Microsoft PowerPoint 將檔案另存為 .pptx 格式後重新上傳。"
+                text=f"❌ {file_ext} 檔案轉換失敗\n\n{message_convert}\n\n建議：請使用 {conversion_rule['app_name']} 將檔案另存為 .{target_ext} 格式後重新上傳。"
             )
             await line_bot_api.push_message(reply_target, error_msg)
+            return None, file_name, ""
 
-            # Clean up downloaded file
+    # Upload to file search store; long indexing finishes in the background
+    async def notify_when_indexed(success: bool):
+        await line_bot_api.push_message(
+            reply_target,
+            build_upload_result_message(file_name, success, conversion_notice)
+        )
+
+    try:
+        status = await upload_to_file_search_store(
+            upload_source, store_name, file_name,
+            content_hash=content_hash,
+            on_background_done=notify_when_indexed
+        )
+    finally:
+        # Let the cache evict its output again
+        if cached_path:
+            conversion_pipeline.release(cached_path)
+        # Clean up the converted file (the downloaded content is closed by the caller)
+        if converted_file_path:
             try:
-                file_path.unlink()
+                converted_file_path.unlink()
             except Exception as e:
-                print(f"Error deleting file: {e}")
-            return
-
-    # Use converted file if available, otherwise use original
-    upload_file_path = converted_file_path if converted_file_path else file_path
-
-    # Upload to file search store
-    success = await upload_to_file_search_store(upload_file_path, store_name, file_name)
+                logger.error("Error deleting file: %s", e)
+    return status, file_name, conversion_notice
 
-    # Clean up local files
-    try:
-        file_path.unlink()
-        if converted_file_path and converted_file_path != file_path:
-            converted_file_path.unlink()
-    except Exception as e:
-        print(f"Error deleting file: {e}")
 
+def build_upload_result_message(file_name: str, success: bool, conversion_notice: str = "") -> TextSendMessage:
+    """
+    Build the message sent when a file upload finished indexing (or failed).
+    """
     if success:
-        # Create Quick Reply buttons for common actions with specific file name
-        # Using Postback instead of MessageAction for better Group chat support
-        quick_reply = QuickReply(items=[
-            QuickReplyButton(action=PostbackAction(
-                label="📝 生成檔案摘要",
-                data=f"action=query&prompt={urllib.parse.quote(f'請幫我生成「{file_name}」這個檔案的摘要')}"
-            )),
-            QuickReplyButton(action=PostbackAction(
-                label="📌 重點整理",
-                data=f"action=query&prompt={urllib.parse.quote(f'請幫我整理「{file_name}」的重點')}"
-            )),
-            QuickReplyButton(action=PostbackAction(
-                label="📋 列出檔案",
-                data="action=list_files"
-            )),
-        ])
-
-        success_msg = TextSendMessage(
+        return TextSendMessage(
             text=f"✅ 檔案已成功上傳！\n檔案名稱：{file_name}{conversion_notice}\n\n現在您可以詢問我關於這個檔案的任何問題。",
-            quick_reply=quick_reply
+            quick_reply=build_file_quick_reply(file_name)
         )
-        await line_bot_api.push_message(reply_target, success_msg)
-    else:
-        # Provide more helpful error message
-        error_text = f"""❌ 檔案上傳失敗
+
+    # Provide more helpful error message
+    error_text = f"""❌ 檔案上傳失敗
 
 檔案名稱：{file_name}
 
@@ -984,8 +1393,7 @@ async def handle_document_message(event: MessageEvent, message: FileMessage):
 • 確認檔案可以正常開啟
 • 稍後重試
 """
-        error_msg = TextSendMessage(text=error_text)
-        await line_bot_api.push_message(reply_target, error_msg)
+    return TextSendMessage(text=error_text)
 
 
 def is_list_files_intent(text: str) -> bool:
@@ -1002,34 +1410,31 @@ def is_list_files_intent(text: str) -> bool:
     return any(keyword in text_lower for keyword in list_keywords)
 
 
-async def send_files_carousel(event, documents: list, page: int = 1, store_name: str = ""):
+async def send_files_carousel(event, page: int = 1, store_name: str = ""):
     """
     Send files as LINE Flex Message Carousel with pagination.
     Works with both MessageEvent and PostbackEvent.
+    Only the document pages needed for the requested page are fetched.
 
     Args:
         event: MessageEvent or PostbackEvent with reply_token
-        documents: List of document dicts with 'name', 'display_name', 'create_time'
         page: Current page number (1-indexed)
-        store_name: Store name for pagination postback actions
+        store_name: Store name to list (also used for pagination postback actions)
     """
-    if not documents:
+    # 分頁設定：每頁最多 11 個檔案，第 12 個位置留給分頁控制
+    page_size = CAROUSEL_PAGE_SIZE
+    current_page_docs, has_next_page, total_docs = await get_documents_page(store_name, page, page_size)
+
+    if not current_page_docs and page == 1:
         no_files_msg = TextSendMessage(text="📁 目前沒有任何文件。\n\n請先上傳文件檔案，就可以查詢囉！")
         await line_bot_api.reply_message(event.reply_token, no_files_msg)
         return
 
-    # 分頁設定：每頁最多 11 個檔案，第 12 個位置留給分頁控制
-    page_size = 11
-    total_docs = len(documents)
-    total_pages = (total_docs + page_size - 1) // page_size  # 向上取整
-
-    # 計算當前頁的檔案範圍
-    start_idx = (page - 1) * page_size
-    end_idx = min(start_idx + page_size, total_docs)
-    current_page_docs = documents[start_idx:end_idx]
+    # total_docs is None when later pages haven't been fetched yet
+    total_pages = (total_docs + page_size - 1) // page_size if total_docs is not None else None  # 向上取整
 
-    print(f"[DEBUG] Pagination: page={page}, total_docs={total_docs}, total_pages={total_pages}")
-    print(f"[DEBUG] Showing documents {start_idx+1} to {end_idx}")
+    logger.debug("Pagination: page=%s, total_docs=%s, total_pages=%s", page, total_docs, total_pages)
+    logger.debug("Showing %s documents, has_next_page=%s", len(current_page_docs), has_next_page)
 
     bubbles = []
     for doc in current_page_docs:
@@ -1101,7 +1506,7 @@ async def send_files_carousel(event, documents: list, page: int = 1, store_name:
         bubbles.append(bubble)
 
     # 加入分頁控制 bubble (如果有多頁)
-    if total_pages > 1:
+    if page > 1 or has_next_page:
         # 建立分頁按鈕
         pagination_buttons = []
 
@@ -1120,7 +1525,7 @@ async def send_files_carousel(event, documents: list, page: int = 1, store_name:
             )
 
         # 下一頁按鈕 (如果不是最後一頁)
-        if page < total_pages:
+        if has_next_page:
             pagination_buttons.append(
                 ButtonComponent(
                     action=PostbackAction(
@@ -1153,14 +1558,14 @@ async def send_files_carousel(event, documents: list, page: int = 1, store_name:
                     ),
                     SeparatorComponent(margin='md'),
                     TextComponent(
-                        text=f'第 {page} / {total_pages} 頁',
+                        text=f'第 {page} / {total_pages} 頁' if total_pages else f'第 {page} 頁',
                         size='sm',
                         color='#999999',
                         align='center',
                         margin='md'
                     ),
                     TextComponent(
-                        text=f'共 {total_docs} 個檔案',
+                        text=f'共 {total_docs} 個檔案' if total_docs is not None else '還有更多檔案',
                         size='xs',
                         color='#999999',
                         align='center',
@@ -1183,7 +1588,7 @@ async def send_files_carousel(event, documents: list, page: int = 1, store_name:
 
     # 建立 Flex Message
     flex_message = FlexSendMessage(
-        alt_text=f'📁 找到 {total_docs} 個文件 (第 {page}/{total_pages} 頁)',
+        alt_text=f'📁 找到 {total_docs} 個文件 (第 {page}/{total_pages} 頁)' if total_docs is not None else f'📁 文件列表 (第 {page} 頁)',
         contents=carousel_container
     )
 
@@ -1201,7 +1606,7 @@ async def handle_postback(event: PostbackEvent):
         params = dict(param.split('=', 1) for param in data.split('&'))
 
         action = params.get('action')
-        print(f"[DEBUG] Postback action: {action}")
+        logger.debug("Postback action: %s", action)
 
         # Get store name for operations
         store_name = get_store_name(event)
@@ -1224,32 +1629,23 @@ async def handle_postback(event: PostbackEvent):
         elif action == 'query':
             # Handle file query from Quick Reply
             prompt = urllib.parse.unquote(params.get('prompt', ''))
-            print(f"[DEBUG] Query prompt: {prompt}")
+            logger.debug("Query prompt: %s", prompt)
 
             if prompt:
-                # Query file search
-                response_text, citations = await query_file_search(prompt, store_name)
+                # Precomputed summary/key points, otherwise query file search
+                insight = await document_insights.lookup(store_name, prompt)
+                if insight:
+                    logger.info("Answered from precomputed insights: %s", prompt)
+                    response_text, citations = insight
+                else:
+                    response_text, citations = await query_file_search(prompt, store_name)
 
                 # Store citations in cache
                 if citations:
-                    citations_cache[store_name] = citations[:3]
-                    print(f"Stored {len(citations_cache[store_name])} citations for {store_name}")
+                    await save_citations(store_name, citations[:3])
 
-                # Create Quick Reply buttons for citations
-                quick_reply = None
-                if citations:
-                    quick_reply_items = []
-                    for i, citation in enumerate(citations[:3], 1):
-                        quick_reply_items.append(
-                            QuickReplyButton(action=PostbackAction(
-                                label=f"📖 引用{i}",
-                                data=f"action=view_citation&num={i}"
-                            ))
-                        )
-                    quick_reply = QuickReply(items=quick_reply_items)
-
-                # Reply to user
-                reply_msg = TextSendMessage(text=response_text, quick_reply=quick_reply)
+                # Reply to user with Quick Reply buttons for citations
+                reply_msg = TextSendMessage(text=response_text, quick_reply=build_citation_quick_reply(citations))
                 await line_bot_api.reply_message(event.reply_token, reply_msg)
             else:
                 reply_msg = TextSendMessage(text="查詢內容不能為空。")
@@ -1261,18 +1657,17 @@ async def handle_postback(event: PostbackEvent):
             page = int(params.get('page', 1))
             store = urllib.parse.unquote(params.get('store', store_name))
 
-            print(f"[DEBUG] Postback list_files action for store: {store}, page: {page}")
-            documents = await list_documents_in_store(store)
-            print(f"[DEBUG] Postback list_documents_in_store returned {len(documents)} documents")
-            await send_files_carousel(event, documents, page=page, store_name=store)
+            logger.debug("Postback list_files action for store: %s, page: %s", store, page)
+            await send_files_carousel(event, page=page, store_name=store)
 
         elif action == 'view_citation':
             # Handle view citation request
             citation_num = int(params.get('num', 0))
-            print(f"[DEBUG] View citation {citation_num} for store: {store_name}")
+            logger.debug("View citation %s for store: %s", citation_num, store_name)
 
-            if store_name in citations_cache and 0 < citation_num <= len(citations_cache[store_name]):
-                citation = citations_cache[store_name][citation_num - 1]
+            stored_citations = await load_citations(store_name)
+            if 0 < citation_num <= len(stored_citations):
+                citation = stored_citations[citation_num - 1]
 
                 # Format citation text
                 if citation['type'] == 'file':
@@ -1295,14 +1690,12 @@ async def handle_postback(event: PostbackEvent):
                 await line_bot_api.reply_message(event.reply_token, reply_msg)
 
         else:
-            print(f"Unknown postback action: {action}")
+            logger.warning("Unknown postback action: %s", action)
             reply_msg = TextSendMessage(text="未知的操作。")
             await line_bot_api.reply_message(event.reply_token, reply_msg)
 
     except Exception as e:
-        print(f"Error handling postback: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error handling postback: %s", e)
         error_msg = TextSendMessage(text="處理操作時發生錯誤。")
         await line_bot_api.reply_message(event.reply_token, error_msg)
 
@@ -1320,20 +1713,21 @@ async def handle_text_message(event: MessageEvent, message, bot_user_id: str = '
     """
     # In group/room, only respond if bot is mentioned
     if not is_bot_mentioned(event, bot_user_id):
-        print(f"Bot not mentioned in group/room, skipping response")
+        logger.debug("Bot not mentioned in group/room, skipping response")
         return
 
     store_name = get_store_name(event)
     query = message.text
     user_id = event.source.user_id
+    session_key = get_session_key(event)
 
-    print(f"Received query: {query} for store: {store_name}, user: {user_id}")
+    logger.info("Received query: %s for store: %s, user: %s", query, store_name, user_id)
 
     # Check if user wants to clear conversation
     clear_keywords = ['清除對話', '清除对话', 'reset', 'clear', '重置對話', '重置对话', '清空對話', '清空对话']
     if any(keyword in query.lower() for keyword in clear_keywords):
-        print(f"[INFO] Clear session command detected")
-        success = session_manager.clear_session(user_id)
+        logger.info("Clear session command detected")
+        success = await session_manager.clear_session(session_key)
         if success:
             reply_msg = TextSendMessage(text="✅ 對話記憶已清除。\n\n我們可以重新開始對話了！")
         else:
@@ -1346,73 +1740,132 @@ async def handle_text_message(event: MessageEvent, message, bot_user_id: str = '
 
     # Check if user wants to list files
     if is_list_files_intent(query):
-        print(f"[DEBUG] List files intent detected for query: {query}")
-        print(f"[DEBUG] Store name: {store_name}")
+        logger.debug("List files intent detected for query: %s", query)
+        logger.debug("Store name: %s", store_name)
         # Show files carousel with delete buttons
-        documents = await list_documents_in_store(store_name)
-        print(f"[DEBUG] list_documents_in_store returned {len(documents)} documents")
-        await send_files_carousel(event, documents, page=1, store_name=store_name)
+        await send_files_carousel(event, page=1, store_name=store_name)
+        return
+
+    # "What is <file> about?" - answer with the precomputed summary
+    insight = await document_insights.find_summary_for_question(store_name, query)
+    if insight:
+        logger.info("Answered from precomputed summary: %s", query)
+        response_text, citations = insight
+        if citations:
+            await save_citations(store_name, citations[:3])
+        reply_msg = TextSendMessage(text=response_text, quick_reply=build_citation_quick_reply(citations))
+        await line_bot_api.reply_message(event.reply_token, reply_msg)
         return
 
     # Query file search with session (ADK Chat Session with conversation memory)
-    print(f"[INFO] Using query_file_search_with_session")
-    response_text, citations = await query_file_search_with_session(query, user_id, store_name)
+    logger.debug("Using query_file_search_with_session")
+    if not STREAM_RESPONSES:
+        response_text, citations = await query_file_search_with_session(query, session_key, store_name)
+        if citations:
+            await save_citations(store_name, citations[:3])
+        reply_msg = TextSendMessage(text=response_text, quick_reply=build_citation_quick_reply(citations))
+        await line_bot_api.reply_message(event.reply_token, reply_msg)
+        return
 
-    # Store citations in cache (limit to 3 for Quick Reply)
-    if citations:
-        citations_cache[store_name] = citations[:3]
-        print(f"Stored {len(citations_cache[store_name])} citations for {store_name}")
+    # Streaming: first segment via the reply token, the rest pushed as it is generated
+    reply_target = get_reply_target(event)
+    citations = []
+
+    async def send_segment(text: str, is_first: bool, is_last: bool):
+        text = text.strip()
+        quick_reply = build_citation_quick_reply(citations) if is_last else None
+        if not text:
+            if not (is_last and quick_reply):
+                return
+            # Everything was already sent; attach the citation buttons to a short note
+            text = "📖 點選下方按鈕查看引用來源"
+        message = TextSendMessage(text=text, quick_reply=quick_reply)
+        if is_first:
+            await line_bot_api.reply_message(event.reply_token, message)
+        else:
+            await line_bot_api.push_message(reply_target, message)
 
-    # Create Quick Reply buttons for citations
-    # Using Postback instead of MessageAction for better Group chat support
-    quick_reply = None
-    if citations:
-        quick_reply_items = []
-        for i, citation in enumerate(citations[:3], 1):  # Limit to 3 citations
-            quick_reply_items.append(
-                QuickReplyButton(action=PostbackAction(
-                    label=f"📖 引用{i}",
-                    data=f"action=view_citation&num={i}"
-                ))
-            )
-        quick_reply = QuickReply(items=quick_reply_items)
+    stream = StreamingReply(
+        send_segment,
+        first_chunk_seconds=STREAM_FIRST_CHUNK_SECONDS,
+        segment_chars=STREAM_SEGMENT_CHARS
+    )
+    response_text, citations = await query_file_search_with_session(
+        query, session_key, store_name, on_text=stream.feed
+    )
+    if response_text != stream.text:
+        # Not streamed (e.g. no documents yet) or failed mid-stream
+        await stream.feed(f"\n\n{response_text}" if stream.text else response_text)
 
-    # Reply to user
-    reply_msg = TextSendMessage(text=response_text, quick_reply=quick_reply)
-    await line_bot_api.reply_message(event.reply_token, reply_msg)
+    # Store citations in cache (limit to 3 for Quick Reply)
+    if citations:
+        await save_citations(store_name, citations[:3])
+    await stream.finish()
+    if stream.stopped:
+        # No reply token left to deliver the rest with; the turn itself is saved
+        logger.warning(
+            "Streaming stopped for %s after %s of %s characters: %s",
+            store_name, stream.delivered_chars, len(stream.text), stream.error
+        )
 
 
 @app.post("/")
 async def handle_callback(request: Request):
+    started = time.monotonic()
     signature = request.headers["X-Line-Signature"]
 
-    # Get request body as text
+    # Verified and decoded from the raw bytes, once
     body = await request.body()
-    body = body.decode()
+    logger.debug("Webhook request: %s bytes", len(body))
+    if not webhook_decoder.verify(body, signature):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    try:
+        payload = webhook_decoder.decode(body)
+    except ValueError:
+        logger.error("Failed to parse webhook body JSON")
+        raise HTTPException(status_code=400, detail="Invalid body")
+    bot_user_id = payload.get('destination', '')
+
+    # Drop events the bot would ignore (e.g. unmentioned group chatter);
+    # SDK objects for the rest are built by the workers
+    raw_events = webhook_filter.filter(payload)
+    logger.debug("Webhook for %s: %s events to handle", bot_user_id, len(raw_events))
+
+    # Acknowledge LINE immediately; events are processed by background workers.
+    # Keying by store name keeps events from the same chat in order.
+    for raw_event in raw_events:
+        source = raw_event.get('source') or {}
+        store_name = store_name_for_source(
+            source.get('type'), source.get('userId'), source.get('groupId'), source.get('roomId')
+        )
+        await event_dispatcher.submit(store_name, raw_event, bot_user_id)
 
-    # Log webhook body for debugging
-    print("[DEBUG] ===== Webhook Request =====")
-    print(f"[DEBUG] Body: {body}")
-    print("[DEBUG] ===========================")
+    stage_seconds.observe("webhook", time.monotonic() - started)
+    return "OK"
 
-    # Parse body to get bot user ID (destination)
-    import json
-    try:
-        body_json = json.loads(body)
-        bot_user_id = body_json.get('destination', '')
-        print(f"[DEBUG] Bot User ID (destination): {bot_user_id}")
-    except json.JSONDecodeError:
-        print("[ERROR] Failed to parse webhook body JSON")
-        bot_user_id = ''
 
-    try:
-        events = parser.parse(body, signature)
-    except InvalidSignatureError:
-        raise HTTPException(status_code=400, detail="Invalid signature")
+async def process_event(raw_event: dict, bot_user_id: str):
+    """
+    Route a single webhook event to its handler.
+    Runs on an event dispatcher worker, not in the webhook request.
 
-    for event in events:
-        print(f"[DEBUG] Event type: {type(event).__name__}")
-        print(f"[DEBUG] Event source type: {event.source.type if hasattr(event, 'source') else 'N/A'}")
+    Args:
+        raw_event: Webhook event as decoded JSON (kept by webhook_filter)
+        bot_user_id: Bot's user ID (from webhook body's 'destination' field)
+    """
+    source = raw_event.get('source') or {}
+    span_attributes = {
+        'linebot.event.type': raw_event.get('type'),
+        'linebot.message.type': (raw_event.get('message') or {}).get('type'),
+        'linebot.source.type': source.get('type'),
+        'linebot.store': store_name_for_source(
+            source.get('type'), source.get('userId'), source.get('groupId'), source.get('roomId')
+        ),
+    }
+    # Root span of the event: every outbound call below nests under it
+    with tracer.span("line.event", **span_attributes):
+        event = webhook_filter.build_event(raw_event)
+        logger.debug("Event type: %s, source type: %s", type(event).__name__, getattr(getattr(event, 'source', None), 'type', 'N/A'))
         # Handle PostbackEvent (e.g., delete file button clicks)
         if isinstance(event, PostbackEvent):
             await handle_postback(event)
@@ -1427,15 +1880,96 @@ async def handle_callback(request: Request):
             elif event.message.type == "image":
                 # Process image message (analyze with Gemini vision)
                 await handle_image_message(event, event.message)
-            else:
-                continue
-        else:
-            continue
 
-    return "OK"
+
+event_dispatcher = EventDispatcher(
+    process_event,
+    num_workers=EVENT_WORKERS,
+    queue_size=EVENT_QUEUE_SIZE
+)
+
+
+async def precompute_document_insights(store_name: str, document_name: str, display_name: str):
+    """
+    Generate and store the summary and key points of a newly indexed document.
+    Runs on the insight worker pool, off the request path.
+    """
+    for kind, template in INSIGHT_PROMPTS.items():
+        if await document_insights.has(document_name, kind):
+            continue
+        prompt = template.format(file_name=display_name)
+        response_text, citations = await query_file_search(prompt, store_name)
+        # Only grounded answers are kept; errors and "not found" replies have no citations
+        if not citations:
+            logger.warning("No grounded %s for %s, not stored", kind, display_name)
+            continue
+        await document_insights.save(store_name, document_name, display_name, kind, prompt, response_text, citations)
+        logger.info("Precomputed %s for %s", kind, display_name)
+
+
+# Bounded pool for insight generation, so bulk uploads don't flood the model quota
+insight_dispatcher = EventDispatcher(
+    precompute_document_insights,
+    num_workers=INSIGHT_WORKERS,
+    queue_size=INSIGHT_QUEUE_SIZE
+) if INSIGHT_WORKERS > 0 else None
+
+
+# Component stats read on every scrape (counters end in _total, the rest are gauges)
+DISPATCHER_COUNTERS = ('enqueued', 'processed', 'failed', 'dropped')
+CACHE_COUNTERS = ('hits', 'misses')
+metrics.add_stats("events", event_dispatcher.get_stats, counters=DISPATCHER_COUNTERS)
+if insight_dispatcher is not None:
+    metrics.add_stats("insights", insight_dispatcher.get_stats, counters=DISPATCHER_COUNTERS)
+metrics.add_stats("webhook", webhook_filter.get_stats, counters=('events', 'dropped'))
+metrics.add_stats("sessions", session_manager.get_stats, counters=(
+    'evicted', 'expired', 'requests', 'tokens_saved',
+    'compaction_compactions', 'compaction_failures', 'compaction_tokens_before', 'compaction_tokens_after'
+))
+metrics.add_stats("store_name_cache", lambda: {'hits': store_registry.hits, 'misses': store_registry.misses},
+                  counters=CACHE_COUNTERS)
+metrics.add_stats("document_cache", lambda: {'hits': document_cache.hits, 'misses': document_cache.misses},
+                  counters=CACHE_COUNTERS)
+metrics.add_stats("answer_cache", answer_cache.get_stats, counters=CACHE_COUNTERS)
+metrics.add_stats("conversion_cache", conversion_pipeline.get_stats, counters=CACHE_COUNTERS)
+metrics.add_stats("insight_lookups", lambda: {'hits': document_insights.hits}, counters=('hits',))
+metrics.add_stats("single_flight", flights.get_stats, counters=('calls', 'shared'))
+metrics.add_stats("indexing", operation_tracker.get_stats, counters=('polls', 'completed', 'timed_out', 'poll_errors'))
+metrics.add_stats("image_preprocessor", image_preprocessor.get_stats, counters=('images', 'bytes_in', 'bytes_out', 'failures'))
+metrics.add_stats("http_pool", http_pool.get_stats, counters=('connections_created', 'requests_sent'))
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus scrape endpoint."""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start background workers."""
+    event_dispatcher.start()
+    if insight_dispatcher is not None:
+        insight_dispatcher.start()
+    session_manager.start_reaper(SESSION_REAP_INTERVAL)
+    run_in_background(converter.warm_up())
+    if history_compactor is not None:
+        run_in_background(history_compactor.warm_up())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
-    await client_session.close()
+    await event_dispatcher.stop()
+    if insight_dispatcher is not None:
+        await insight_dispatcher.stop(drain_timeout=5)
+    await operation_tracker.stop()
+    await session_manager.stop_reaper()
+    await http_pool.close()
+    await converter.close()
+    await store_registry.close()
+    await upload_index.close()
+    await document_insights.close()
+    if session_backend is not None:
+        await session_backend.close()
@@ -0,0 +1,197 @@
+"""
+Prometheus-style metrics.
+
+A small in-process registry rendered in the Prometheus text exposition format
+on /metrics: latency histograms per pipeline stage, counters, and gauges
+collected from the get_stats() of existing components at scrape time.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; covers cache hits (ms) up to LibreOffice conversions and indexing (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Latency histogram with one label (e.g. stage="download").
+
+    Features:
+    - Cumulative buckets, _sum and _count per label value
+    - time() context manager measuring a block with a monotonic clock
+    """
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Initialize Histogram.
+
+        Args:
+            name: Full metric name (e.g. "linebot_stage_duration_seconds")
+            help_text: HELP line
+            label: Label name
+            buckets: Upper bounds in seconds, ascending
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        # label value -> [bucket counts..., sum, count]
+        self.series: Dict[str, List[float]] = {}
+
+    def observe(self, label_value: str, seconds: float):
+        """
+        Record one measurement.
+
+        Args:
+            label_value: Value of the label (e.g. "download")
+            seconds: Observed duration
+        """
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                series[i] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, label_value: str):
+        """Measure the duration of a with-block (exceptions are measured too)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(label_value, time.monotonic() - started)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self.series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label},le="{_format_value(float(bound))}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{label}}} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{{{label}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one label (e.g. result="hit")."""
+
+    def __init__(self, name: str, help_text: str, label: str):
+        """
+        Initialize Counter.
+
+        Args:
+            name: Full metric name, ending in _total
+            help_text: HELP line
+            label: Label name
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values: Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1):
+        """Add amount to the counter for a label value."""
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{self.label}="{_escape(label_value)}"}} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds metrics and renders them for a Prometheus scrape.
+
+    Features:
+    - Histograms and counters updated on the request path
+    - Component stats (get_stats() dicts) exported as gauges or counters when scraped
+    - Nested stats dicts are flattened (compaction.summaries -> ..._compaction_summaries)
+    """
+
+    def __init__(self, namespace: str = "linebot"):
+        """
+        Initialize MetricsRegistry.
+
+        Args:
+            namespace: Prefix of every metric name
+        """
+        self.namespace = namespace
+        self.metrics: list = []
+        self.collectors: List[Tuple[str, Callable[[], dict], set]] = []
+
+    def histogram(self, name: str, help_text: str, label: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram named <namespace>_<name>."""
+        histogram = Histogram(f"{self.namespace}_{name}", help_text, label, buckets)
+        self.metrics.append(histogram)
+        return histogram
+
+    def counter(self, name: str, help_text: str, label: str) -> Counter:
+        """Create and register a counter named <namespace>_<name>."""
+        counter = Counter(f"{self.namespace}_{name}", help_text, label)
+        self.metrics.append(counter)
+        return counter
+
+    def add_stats(self, subsystem: str, get_stats: Callable[[], dict], counters: Iterable[str] = ()):
+        """
+        Export a component's stats on every scrape.
+
+        Args:
+            subsystem: Name part after the namespace (e.g. "answer_cache")
+            get_stats: Function returning a dict of numbers (e.g. AnswerCache.get_stats)
+            counters: Keys that only ever increase; exported as <name>_total counters,
+                      everything else as gauges
+        """
+        self.collectors.append((subsystem, get_stats, set(counters)))
+
+    def _collect(self, subsystem: str, get_stats: Callable[[], dict], counters: set) -> List[str]:
+        lines = []
+        pending = [('', get_stats())]
+        while pending:
+            prefix, stats = pending.pop(0)
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    pending.append((f"{prefix}{key}_", value))
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.namespace}_{subsystem}_{prefix}{key}"
+                if f"{prefix}{key}" in counters:
+                    name, metric_type = f"{name}_total", "counter"
+                else:
+                    metric_type = "gauge"
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format (version 0.0.4).
+        A failing collector is skipped instead of failing the scrape.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for subsystem, get_stats, counters in self.collectors:
+            try:
+                lines.extend(self._collect(subsystem, get_stats, counters))
+            except Exception as e:
+                lines.append(f"# collector {subsystem} failed: {_escape(e)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+"""
+Long-running operation tracker.
+
+Polls Gemini operations (e.g. File Search indexing) with exponential backoff and
+jitter, and can keep watching an operation in the background after the webhook
+handler has moved on.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, Set
+
+from gemini_client import AsyncGeminiClient
+
+logger = logging.getLogger(__name__)
+
+
+class OperationTracker:
+    """
+    Adaptive poller for long-running operations.
+
+    Features:
+    - Exponential backoff with jitter between polls
+    - Per-call deadline
+    - Failed polls (e.g. a transient 5xx) are retried with the same backoff until
+      the deadline; only the deadline or an operation error ends in failure
+    - Background watching with a completion callback
+    - Poll and outcome counters
+    """
+
+    def __init__(
+        self,
+        gemini: AsyncGeminiClient,
+        initial_delay: float = 1.0,
+        max_delay: float = 15.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.25
+    ):
+        """
+        Initialize OperationTracker.
+
+        Args:
+            gemini: Async Gemini access layer
+            initial_delay: Seconds before the first poll
+            max_delay: Upper bound for the delay between polls
+            multiplier: Backoff factor applied after each poll
+            jitter: Random +/- fraction applied to each delay
+        """
+        self.gemini = gemini
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.tasks: Set[asyncio.Task] = set()
+        self.metrics = {
+            'polls': 0,
+            'completed': 0,
+            'timed_out': 0,
+            'poll_errors': 0,
+        }
+
+    def _next_delay(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def wait(self, operation, timeout: float, start_delay: Optional[float] = None):
+        """
+        Poll an operation until it is done or the timeout elapses.
+        A failed poll is logged and retried after the next backoff delay.
+
+        Args:
+            operation: Operation returned by the SDK
+            timeout: Seconds to keep polling
+            start_delay: Delay before the first poll (defaults to initial_delay)
+
+        Returns:
+            The latest operation (check operation.done)
+        """
+        deadline = time.monotonic() + timeout
+        delay = start_delay or self.initial_delay
+        while not operation.done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return operation
+            await asyncio.sleep(min(self._next_delay(delay), remaining))
+            self.metrics['polls'] += 1
+            try:
+                operation = await self.gemini.get_operation(operation)
+            except Exception as e:
+                self.metrics['poll_errors'] += 1
+                logger.warning("Failed to poll operation %s, retrying: %s", getattr(operation, 'name', operation), e)
+            delay = min(delay * self.multiplier, self.max_delay)
+        return operation
+
+    def watch(
+        self,
+        operation,
+        on_done: Callable[..., Awaitable[None]],
+        timeout: float
+    ) -> asyncio.Task:
+        """
+        Keep polling an operation in the background.
+
+        Args:
+            operation: Operation returned by the SDK
+            on_done: Coroutine function called with the final operation
+                     (operation.done is False if the timeout elapsed)
+            timeout: Seconds to keep watching
+
+        Returns:
+            The background task
+        """
+        async def run():
+            try:
+                final = await self.wait(operation, timeout, start_delay=self.max_delay)
+            except Exception as e:
+                logger.error("Failed to poll operation: %s", e)
+                final = operation
+            if final.done:
+                self.metrics['completed'] += 1
+            else:
+                self.metrics['timed_out'] += 1
+                logger.warning("Operation still running after %ss: %s", timeout, getattr(final, 'name', final))
+            try:
+                await on_done(final)
+            except Exception as e:
+                logger.error("Operation completion callback failed: %s", e)
+
+        task = asyncio.create_task(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def stop(self):
+        """Cancel all background watches."""
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """
+        Get tracker counters.
+
+        Returns:
+            Dict with polls, completed, timed_out, poll_errors and currently watched operations
+        """
+        return {**self.metrics, 'watching': len(self.tasks)}
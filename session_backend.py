@@ -0,0 +1,295 @@
+"""
+External session backends.
+
+Chat history and other per-chat state (e.g. the citations behind the
+"引用" buttons) are stored as JSON strings with an expiry, so any uvicorn
+worker or container can pick up a conversation where another one left off.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import ssl
+import threading
+import time
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend:
+    """
+    Interface for shared session storage: string keys, JSON string values, TTL.
+    """
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a value, or None if missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        """Store a value that expires ttl_seconds from now."""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        """Remove a value."""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connections."""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite-backed session storage.
+
+    Features:
+    - Shared by every worker process on the same host (WAL mode)
+    - Expired rows are ignored on read and purged on write
+    - Queries run in a thread: waiting on another worker's write lock
+      never blocks the event loop
+    """
+
+    def __init__(self, db_path: str = "sessions.db", purge_interval: float = 300):
+        """
+        Initialize SQLiteSessionBackend.
+
+        Args:
+            db_path: SQLite file holding the sessions
+            purge_interval: Minimum seconds between deletions of expired rows
+        """
+        self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.db.commit()
+        self.purge_interval = purge_interval
+        self.last_purge = 0.0
+        # One connection shared by the worker threads, used by one at a time
+        self.lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM sessions WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl_seconds: float):
+        with self.lock:
+            now = time.time()
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO sessions (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, now + ttl_seconds)
+                )
+                if now - self.last_purge >= self.purge_interval:
+                    self.db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+                    self.last_purge = now
+                self.db.commit()
+            except sqlite3.Error:
+                self.db.rollback()
+                raise
+
+    def _delete(self, key: str):
+        with self.lock:
+            try:
+                self.db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+                self.db.commit()
+            except sqlite3.Error:
+                self.db.rollback()
+                raise
+
+    def _close(self):
+        with self.lock:
+            self.db.close()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis server."""
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Redis-backed session storage over a minimal RESP client.
+
+    Features:
+    - Shared by workers on any host
+    - Expiry handled by Redis (SET ... EX)
+    - No extra dependency: speaks the Redis protocol over asyncio streams,
+      so it also works with Redis-compatible servers (Valkey, KeyDB, ...)
+    - TLS for rediss:// URLs, ACL username/password authentication
+    - The connection is dropped whenever a command does not complete (connection
+      error, timeout, cancellation), so a late reply can never be read as the
+      answer to the next command; the next command reconnects
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 5.0):
+        """
+        Initialize RedisSessionBackend.
+
+        Args:
+            url: redis[s]://[[username]:password@]host[:port][/db]
+            timeout: Seconds to wait for a reply
+
+        Raises:
+            ValueError: If the URL scheme is not redis or rediss
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ('redis', 'rediss'):
+            raise ValueError(f"Unsupported Redis URL scheme: {parsed.scheme!r}")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        # Certificates and the host name are verified like any TLS client
+        self.ssl = ssl.create_default_context() if parsed.scheme == 'rediss' else None
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        out = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(out)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), timeout=self.timeout
+        )
+        try:
+            if self.password:
+                if self.username:
+                    await self._send('AUTH', self.username, self.password)
+                else:
+                    await self._send('AUTH', self.password)
+            if self.db:
+                await self._send('SELECT', self.db)
+        except BaseException:
+            # Never keep an unauthenticated connection or one on the wrong database
+            self._drop_connection()
+            raise
+
+    async def _send(self, *args):
+        self._writer.write(self._encode(*args))
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_reply(), timeout=self.timeout)
+
+    async def execute(self, *args):
+        """
+        Run one Redis command and return its decoded reply.
+
+        Args:
+            *args: Command and arguments, e.g. ('GET', 'key')
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._send(*args)
+            except RedisError:
+                # Error reply: fully read, the connection is still in sync
+                raise
+            except BaseException:
+                # Connection error, timeout or cancellation (e.g. the caller's task
+                # was cancelled while waiting): the reply may still arrive on this
+                # socket, so it must not be reused; the next command reconnects
+                self._drop_connection()
+                raise
+
+    def _drop_connection(self) -> Optional[asyncio.StreamWriter]:
+        writer = self._writer
+        if writer is not None:
+            writer.close()
+        self._reader = self._writer = None
+        return writer
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.execute('GET', key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        await self.execute('SET', key, value.encode(), 'EX', max(1, int(ttl_seconds)))
+
+    async def delete(self, key: str):
+        await self.execute('DEL', key)
+
+    async def close(self):
+        writer = self._drop_connection()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+def create_session_backend(kind: str, sqlite_path: str = "sessions.db", redis_url: str = "") -> Optional[SessionBackend]:
+    """
+    Build the configured session backend.
+
+    Args:
+        kind: "memory" (no external backend), "sqlite" or "redis"
+        sqlite_path: Database file for the SQLite backend
+        redis_url: Connection URL for the Redis backend
+
+    Returns:
+        A SessionBackend, or None for in-process memory only
+    """
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        logger.info("Session backend: SQLite (%s)", sqlite_path)
+        return SQLiteSessionBackend(sqlite_path)
+    if kind == "redis":
+        backend = RedisSessionBackend(redis_url or "redis://localhost:6379/0")
+        logger.info("Session backend: Redis (%s://%s:%s/%s)", backend.scheme, backend.host, backend.port, backend.db)
+        return backend
+    raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
@@ -0,0 +1,218 @@
+"""
+Bounded in-memory session store.
+
+Keeps at most max_entries sessions, evicting the least recently used one when
+full, and expires idle sessions from a min-heap of deadlines so the periodic
+reaper only looks at sessions that are actually due.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    LRU + TTL key/value store for chat sessions.
+
+    Features:
+    - Max-entry cap with least-recently-used eviction
+    - Idle timeout measured from the last access
+    - Expiry via a min-heap of deadlines (one heap entry per session)
+    - Periodic asyncio reaper
+    - Occupancy, eviction and expiry counters
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        on_remove: Optional[Callable[[str, Any, str], None]] = None
+    ):
+        """
+        Initialize SessionStore.
+
+        Args:
+            max_entries: Maximum number of sessions kept in memory
+            ttl_seconds: Idle seconds before a session expires
+            on_remove: Optional callback(key, value, reason) with reason
+                       'evicted' or 'expired'
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.on_remove = on_remove
+        # key -> (value, last_active, seq), least recently used first
+        self.entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        # (deadline, seq, key); stale items are skipped or re-pushed when popped
+        self.heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._reaper: Optional[asyncio.Task] = None
+        self.metrics = {
+            'evicted': 0,
+            'expired': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+    def _is_expired(self, last_active: float, now: float) -> bool:
+        return now - last_active >= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a session and mark it as recently used.
+
+        Returns:
+            The stored value, or None if missing or expired
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, last_active, seq = entry
+        now = time.monotonic()
+        if self._is_expired(last_active, now):
+            self._remove(key, 'expired')
+            return None
+        self.entries[key] = (value, now, seq)
+        self.entries.move_to_end(key)
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Get a session without refreshing its last access time."""
+        entry = self.entries.get(key)
+        if entry is None or self._is_expired(entry[1], time.monotonic()):
+            return None
+        return entry[0]
+
+    def idle_seconds(self, key: str) -> Optional[float]:
+        """Seconds since a session was last used, or None if it does not exist."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[1]
+
+    def set(self, key: str, value: Any):
+        """
+        Store a session, evicting the least recently used one if full.
+
+        Args:
+            key: Session key
+            value: Session value
+        """
+        now = time.monotonic()
+        if key in self.entries:
+            _, _, seq = self.entries[key]
+            self.entries[key] = (value, now, seq)
+            self.entries.move_to_end(key)
+            return
+
+        while len(self.entries) >= self.max_entries:
+            oldest = next(iter(self.entries))
+            self._remove(oldest, 'evicted')
+
+        seq = next(self._seq)
+        self.entries[key] = (value, now, seq)
+        heapq.heappush(self.heap, (now + self.ttl_seconds, seq, key))
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Remove a session. Returns its value, or None if it did not exist."""
+        entry = self.entries.pop(key, None)
+        # The heap item becomes stale and is dropped when it surfaces
+        return entry[0] if entry else None
+
+    def _remove(self, key: str, reason: str):
+        value = self.pop(key)
+        self.metrics[reason] += 1
+        if self.on_remove:
+            try:
+                self.on_remove(key, value, reason)
+            except Exception as e:
+                logger.error("Session removal callback failed: %s", e)
+
+    def reap(self) -> int:
+        """
+        Remove expired sessions. Only heap items whose deadline passed are looked at.
+
+        Returns:
+            Number of sessions removed
+        """
+        now = time.monotonic()
+        removed = 0
+        while self.heap and self.heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self.heap)
+            entry = self.entries.get(key)
+            if entry is None or entry[2] != seq:
+                continue  # Removed or replaced since this item was pushed
+            last_active = entry[1]
+            if self._is_expired(last_active, now):
+                self._remove(key, 'expired')
+                removed += 1
+            else:
+                # Used since the item was pushed: move its deadline forward
+                heapq.heappush(self.heap, (last_active + self.ttl_seconds, seq, key))
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self._compact_heap()
+        return removed
+
+    def _compact_heap(self):
+        self.heap = [
+            (last_active + self.ttl_seconds, seq, key)
+            for key, (_, last_active, seq) in self.entries.items()
+        ]
+        heapq.heapify(self.heap)
+
+    async def _reap_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = self.reap()
+                if removed:
+                    logger.info("Reaped %s expired sessions (%s active)", removed, len(self))
+            except Exception as e:
+                logger.error("Session reaper failed: %s", e)
+
+    def start_reaper(self, interval: float = 60):
+        """
+        Start the periodic reaper on the running event loop.
+
+        Args:
+            interval: Seconds between reaper runs
+        """
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_forever(interval))
+
+    async def stop_reaper(self):
+        """Stop the periodic reaper."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+    def values(self):
+        """Iterate stored values (least recently used first)."""
+        return (value for value, _, _ in self.entries.values())
+
+    def get_stats(self) -> dict:
+        """
+        Get occupancy gauges and counters.
+
+        Returns:
+            Dict with active sessions, capacity, occupancy ratio, heap size,
+            evicted and expired counts
+        """
+        return {
+            'active': len(self.entries),
+            'capacity': self.max_entries,
+            'occupancy': len(self.entries) / self.max_entries,
+            'heap_size': len(self.heap),
+            **self.metrics,
+        }
@@ -0,0 +1,72 @@
+"""
+Request coalescing.
+
+Concurrent callers asking for the same thing (same key) share one in-flight
+call instead of each sending an identical request, e.g. when a group taps the
+same Quick Reply button right after a broadcast.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call per key among concurrent callers.
+
+    Features:
+    - The first caller starts the call; later callers await the same task
+    - A caller being cancelled does not cancel the shared call
+    - The key is released as soon as the call finishes (no result caching)
+    - Counters for calls made and calls saved
+    """
+
+    def __init__(self):
+        """Initialize SingleFlight."""
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+        self.metrics = {
+            'calls': 0,   # calls actually made
+            'shared': 0,  # callers served by another caller's call
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the request (e.g. ('query', store, prompt, model))
+            fn: Coroutine function making the call
+
+        Returns:
+            The result of the shared call (exceptions are raised to every caller)
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._release(key, done))
+            self.metrics['calls'] += 1
+        else:
+            self.metrics['shared'] += 1
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight."""
+        return len(self.calls)
+
+    def get_stats(self) -> dict:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dict with calls made, callers that shared a call, and calls in flight
+        """
+        return {**self.metrics, 'in_flight': len(self.calls)}
@@ -0,0 +1,118 @@
+"""
+Spooled buffer for downloaded message content.
+
+Files and images sent to the bot are kept in memory while they are small and
+only written to disk when they grow past a threshold or when a tool needs a
+real path (LibreOffice). Uploads read straight from the buffer, so a typical
+message never touches the filesystem.
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+class SpooledContent:
+    """
+    In-memory buffer that spills to a temporary file.
+
+    Features:
+    - Stays in memory up to spill_threshold bytes
+    - Disk writes after spilling run in a worker thread
+    - to_path() materializes the content for tools that need a file
+    - close() removes the temporary file, if any
+    """
+
+    def __init__(self, spill_threshold: int, spill_dir: Path, suffix: str = ""):
+        """
+        Initialize SpooledContent.
+
+        Args:
+            spill_threshold: Bytes kept in memory before spilling to disk
+            spill_dir: Directory for the temporary file (created on first spill)
+            suffix: File extension of the temporary file (e.g. ".ppt")
+        """
+        self.spill_threshold = spill_threshold
+        self.spill_dir = Path(spill_dir)
+        self.suffix = suffix
+        self.buffer: Optional[io.BytesIO] = io.BytesIO()
+        self.file: Optional[BinaryIO] = None
+        self.path: Optional[Path] = None
+        self.size = 0
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the content has not been written to disk."""
+        return self.file is None
+
+    def _spill(self):
+        if self.file is not None:
+            return
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(suffix=self.suffix, dir=self.spill_dir)
+        self.file = os.fdopen(fd, 'w+b')
+        self.path = Path(name)
+        self.file.write(self.buffer.getbuffer())
+        self.buffer = None
+
+    async def write(self, chunk: bytes):
+        """
+        Append a chunk, spilling to disk when the threshold is crossed.
+
+        Args:
+            chunk: Downloaded bytes
+        """
+        self.size += len(chunk)
+        if self.file is None and self.size > self.spill_threshold:
+            await asyncio.to_thread(self._spill)
+        if self.file is None:
+            self.buffer.write(chunk)
+        else:
+            await asyncio.to_thread(self.file.write, chunk)
+
+    async def to_path(self) -> Path:
+        """
+        Get a file holding the content, spilling to disk if needed.
+
+        Returns:
+            Path of the temporary file (removed by close())
+        """
+        await asyncio.to_thread(self._spill)
+        await asyncio.to_thread(self.file.flush)
+        return self.path
+
+    def open(self) -> BinaryIO:
+        """
+        Get a binary stream positioned at the start of the content.
+        The stream belongs to this object; do not close it.
+        """
+        stream = self.buffer if self.file is None else self.file
+        stream.flush()
+        stream.seek(0)
+        return stream
+
+    async def read_bytes(self) -> bytes:
+        """Return the whole content (read in a worker thread if spilled)."""
+        if self.file is None:
+            return self.buffer.getvalue()
+        return await asyncio.to_thread(lambda: self.open().read())
+
+    def close(self):
+        """Release the buffer and remove the temporary file."""
+        if self.file is not None:
+            self.file.close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        self.buffer = None
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
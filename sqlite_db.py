@@ -0,0 +1,85 @@
+"""
+SQLite access off the event loop.
+
+The store registry, upload index and document insights share one SQLite file
+with every worker process on the host. A query that waits on another process's
+write lock must not stall every chat on this worker, so queries run in a thread.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence
+
+
+class SQLiteDatabase:
+    """
+    SQLite connection whose queries run in a worker thread.
+
+    Features:
+    - WAL mode, shared by every worker process on the same host
+    - Queries run via asyncio.to_thread, so lock waits never block the event loop
+    - One connection used by one thread at a time
+    - Writes are committed, or rolled back if they fail
+    """
+
+    def __init__(self, db_path: str, schema: Sequence[str] = (), timeout: float = 10):
+        """
+        Initialize SQLiteDatabase and create its tables.
+
+        Args:
+            db_path: SQLite file
+            schema: CREATE ... IF NOT EXISTS statements run once at startup
+            timeout: Seconds to wait for another connection's write lock
+        """
+        self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=timeout)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def fetchall_now(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        """
+        Run a query on the calling thread.
+        Only for startup, before the event loop serves requests.
+        """
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    async def fetchone(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        """Run a query and return its first row, or None."""
+        return await asyncio.to_thread(self._fetchone, sql, params)
+
+    async def fetchall(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        """Run a query and return all rows."""
+        return await asyncio.to_thread(self.fetchall_now, sql, params)
+
+    async def execute(self, sql: str, params: Sequence = ()):
+        """Run a write statement and commit it."""
+        await asyncio.to_thread(self._write, sql, [params])
+
+    async def executemany(self, sql: str, rows: Iterable[Sequence]):
+        """Run a write statement for each row and commit them together."""
+        await asyncio.to_thread(self._write, sql, list(rows))
+
+    async def close(self):
+        """Close the connection."""
+        await asyncio.to_thread(self._close)
+
+    def _fetchone(self, sql: str, params: Sequence) -> Optional[tuple]:
+        with self.lock:
+            return self.db.execute(sql, params).fetchone()
+
+    def _write(self, sql: str, rows: List[Sequence]):
+        with self.lock:
+            try:
+                self.db.executemany(sql, rows)
+                self.db.commit()
+            except sqlite3.Error:
+                self.db.rollback()
+                raise
+
+    def _close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,172 @@
+"""
+File Search store registry.
+
+Resolves store display names (e.g. "user_xxx", "group_xxx") to API store names
+(fileSearchStores/...) from an in-memory index that is persisted in SQLite, so
+lookups survive restarts and are shared by every worker on the same host.
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from gemini_client import AsyncGeminiClient
+from single_flight import SingleFlight
+from sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class StoreRegistry:
+    """
+    Indexed display_name -> store name mapping.
+
+    Features:
+    - Bulk-loads every store page once into a dict index
+    - Persists the index in SQLite across restarts (queries run off the event loop)
+    - Single-flight refreshes and store creation
+    - Rate-limited refresh on misses, so unknown names never trigger a scan per user
+    """
+
+    def __init__(
+        self,
+        gemini: AsyncGeminiClient,
+        db_path: str = "store_registry.db",
+        refresh_interval: float = 60
+    ):
+        """
+        Initialize StoreRegistry.
+
+        Args:
+            gemini: Async Gemini access layer
+            db_path: SQLite file used to persist the index
+            refresh_interval: Minimum seconds between full store listings
+        """
+        self.gemini = gemini
+        self.refresh_interval = refresh_interval
+        self.index: Dict[str, str] = {}  # display_name -> fileSearchStores/...
+        self.last_refresh = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.flights = SingleFlight()  # coalesces refreshes and creations
+
+        self.db = SQLiteDatabase(db_path, schema=[
+            "CREATE TABLE IF NOT EXISTS stores ("
+            "display_name TEXT PRIMARY KEY, name TEXT NOT NULL, updated_at REAL NOT NULL)"
+        ])
+        self.index.update(self.db.fetchall_now("SELECT display_name, name FROM stores"))
+        logger.info("Store registry loaded %s stores from %s", len(self.index), db_path)
+
+    async def _lookup(self, display_name: str) -> Optional[str]:
+        name = self.index.get(display_name)
+        if name is None:
+            # Another worker may have registered it since we loaded
+            row = await self.db.fetchone(
+                "SELECT name FROM stores WHERE display_name = ?", (display_name,)
+            )
+            if row:
+                name = row[0]
+                self.index[display_name] = name
+        return name
+
+    async def register(self, display_name: str, name: str):
+        """
+        Add or update a mapping.
+
+        Args:
+            display_name: Store display name
+            name: API store name (fileSearchStores/...)
+        """
+        self.index[display_name] = name
+        await self.db.execute(
+            "INSERT OR REPLACE INTO stores (display_name, name, updated_at) VALUES (?, ?, ?)",
+            (display_name, name, time.time())
+        )
+
+    async def forget(self, display_name: str):
+        """
+        Remove a mapping (e.g. the store was deleted on the server).
+
+        Args:
+            display_name: Store display name
+        """
+        self.index.pop(display_name, None)
+        await self.db.execute("DELETE FROM stores WHERE display_name = ?", (display_name,))
+
+    async def refresh(self):
+        """
+        Reload the whole index from the API (all pages).
+        Concurrent callers share one listing.
+        """
+        await self.flights.do('refresh', self._bulk_load)
+
+    async def _bulk_load(self):
+        stores = await self.gemini.list_stores()
+        rows = [
+            (store.display_name, store.name, time.time())
+            for store in stores
+            if getattr(store, 'display_name', None)
+        ]
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO stores (display_name, name, updated_at) VALUES (?, ?, ?)",
+            rows
+        )
+        self.index.update((display_name, name) for display_name, name, _ in rows)
+        self.last_refresh = time.monotonic()
+        logger.info("Store registry refreshed: %s stores", len(rows))
+
+    async def resolve(self, display_name: str) -> Optional[str]:
+        """
+        Resolve a display name to the API store name.
+
+        Args:
+            display_name: Store display name (e.g. "user_xxx")
+
+        Returns:
+            API store name, or None if the store doesn't exist
+        """
+        name = await self._lookup(display_name)
+        if name:
+            self.hits += 1
+            return name
+
+        self.misses += 1
+        # Unknown name: at most one full listing per refresh_interval, shared by all callers
+        if time.monotonic() - self.last_refresh >= self.refresh_interval:
+            await self.refresh()
+            name = self.index.get(display_name)
+        return name
+
+    async def ensure(self, display_name: str) -> str:
+        """
+        Resolve a display name, creating the store if it doesn't exist.
+        Concurrent calls for the same name create at most one store.
+
+        Args:
+            display_name: Store display name
+
+        Returns:
+            API store name
+        """
+        name = await self.resolve(display_name)
+        if name:
+            return name
+
+        return await self.flights.do(('create', display_name), lambda: self._create(display_name))
+
+    async def _create(self, display_name: str) -> str:
+        # Creating a duplicate store is worse than one extra listing per new chat
+        await self.refresh()
+        name = self.index.get(display_name)
+        if name:
+            return name
+
+        logger.info("Creating file search store with display_name '%s'...", display_name)
+        name = await self.gemini.create_store(display_name)
+        await self.register(display_name, name)
+        logger.info("File search store created: %s (display_name: %s)", name, display_name)
+        return name
+
+    async def close(self):
+        """Close the SQLite connection."""
+        await self.db.close()
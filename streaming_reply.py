@@ -0,0 +1,139 @@
+"""
+Incremental delivery of streamed model output.
+
+Gemini streams an answer in small chunks. StreamingReply turns those chunks
+into a quick first message (sent with the reply token) followed by
+message-sized segments, cut at sentence or paragraph boundaries.
+"""
+
+import time
+from typing import Awaitable, Callable, Optional
+
+# Characters after which a segment may be cut
+BOUNDARIES = ("\n\n", "\n", "。", "！", "？", "!", "?", ". ")
+
+# LINE rejects text messages longer than this
+LINE_TEXT_LIMIT = 5000
+
+
+def find_cut(text: str, limit: int) -> int:
+    """
+    Find where to cut text so the first part is at most limit characters.
+
+    Returns:
+        Index just after the last boundary within limit, or limit if there is none
+    """
+    window = text[:limit]
+    best = 0
+    for boundary in BOUNDARIES:
+        index = window.rfind(boundary)
+        if index >= 0:
+            best = max(best, index + len(boundary))
+    return best or min(limit, len(text))
+
+
+class StreamingReply:
+    """
+    Buffers streamed text and sends it in segments.
+
+    Features:
+    - First segment goes out as soon as a sentence of min_first_chars is
+      complete, or after first_chunk_seconds with whatever text has arrived
+    - Later segments are sent when segment_chars have accumulated
+    - Segments end at sentence/paragraph boundaries where possible
+    - A failed send (e.g. push quota exhausted, 429) stops the delivery instead
+      of raising into the model stream, which keeps running to the end
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, bool, bool], Awaitable[None]],
+        first_chunk_seconds: float = 1.5,
+        min_first_chars: int = 40,
+        segment_chars: int = 1000
+    ):
+        """
+        Initialize StreamingReply.
+
+        Args:
+            send: Coroutine function send(text, is_first, is_last); the first
+                  segment should use the reply token, the others a push
+            first_chunk_seconds: Send the first segment after this long even
+                                 without a sentence boundary
+            min_first_chars: Minimum length of an early first segment
+            segment_chars: Target size of later segments
+        """
+        self.send = send
+        self.first_chunk_seconds = first_chunk_seconds
+        self.min_first_chars = min_first_chars
+        self.segment_chars = min(segment_chars, LINE_TEXT_LIMIT)
+        self.started = time.monotonic()
+        self.buffer = ""
+        self.text = ""  # Everything received so far
+        self.segments_sent = 0
+        self.delivered_chars = 0
+        self.error: Optional[Exception] = None  # Set when a send failed; nothing more is sent
+
+    @property
+    def stopped(self) -> bool:
+        """Whether delivery stopped because a send failed."""
+        return self.error is not None
+
+    async def _send(self, text: str, is_last: bool):
+        is_first = self.segments_sent == 0
+        self.segments_sent += 1
+        try:
+            await self.send(text, is_first, is_last)
+        except Exception as e:
+            # Later sends would fail the same way (quota, rate limit, expired token)
+            self.error = e
+            self.buffer = ""
+            return
+        self.delivered_chars += len(text)
+
+    async def feed(self, delta: str):
+        """
+        Add streamed text, sending any segment that is ready.
+
+        Args:
+            delta: Newly received text
+        """
+        if not delta:
+            return
+        self.text += delta
+        if self.stopped:
+            return
+        self.buffer += delta
+
+        if self.segments_sent == 0:
+            cut = find_cut(self.buffer, self.segment_chars)
+            at_boundary = cut < len(self.buffer) or self.buffer.endswith(BOUNDARIES)
+            waited = time.monotonic() - self.started >= self.first_chunk_seconds
+            if at_boundary and cut >= self.min_first_chars:
+                pass
+            elif waited and self.buffer.strip():
+                cut = len(self.buffer) if len(self.buffer) <= self.segment_chars else cut
+            else:
+                return
+            segment, self.buffer = self.buffer[:cut], self.buffer[cut:]
+            await self._send(segment, is_last=False)
+
+        while len(self.buffer) >= self.segment_chars and not self.stopped:
+            cut = find_cut(self.buffer, self.segment_chars)
+            segment, self.buffer = self.buffer[:cut], self.buffer[cut:]
+            await self._send(segment, is_last=False)
+
+    async def finish(self):
+        """
+        Send the remaining text as the last segment.
+        The last call to send has is_last=True, possibly with empty text when
+        everything was already sent. Does nothing after a failed send.
+        """
+        while len(self.buffer) > self.segment_chars and not self.stopped:
+            cut = find_cut(self.buffer, self.segment_chars)
+            segment, self.buffer = self.buffer[:cut], self.buffer[cut:]
+            await self._send(segment, is_last=False)
+        if self.stopped:
+            return
+        segment, self.buffer = self.buffer, ""
+        await self._send(segment, is_last=True)
@@ -0,0 +1,96 @@
+"""
+Test script for the answer cache used by Quick Reply prompts.
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from answer_cache import AnswerCache, normalize_prompt
+from session_backend import SessionBackend, SQLiteSessionBackend
+
+STORE = "fileSearchStores/abc"
+PROMPT = "請幫我生成「季報.pdf」這個檔案的摘要"
+CITATIONS = [{'type': 'file', 'title': '季報.pdf', 'text': '營收成長 12%'}]
+
+print("Testing answer cache...\n")
+
+# Test 1: Same prompt (modulo width/spacing/punctuation) hits with the same citations
+print("Test 1: Hit on repeated prompt")
+cache = AnswerCache(ttl_seconds=60)
+version = asyncio.run(cache.version(STORE))
+assert cache.get(STORE, PROMPT, version) is None, "Failed: Empty cache should miss"
+cache.set(STORE, PROMPT, "摘要內容", CITATIONS, version)
+start = time.perf_counter()
+hit = cache.get(STORE, "  請幫我生成「季報.pdf」這個檔案的摘要。 ", version)
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(f"  hit in {elapsed_ms:.3f}ms, stats: {cache.get_stats()}")
+assert hit == ("摘要內容", CITATIONS), "Failed: Should return the cached answer and citations"
+assert normalize_prompt("ＡＢＣ  d?") == "abc d", "Failed: Normalization"
+assert cache.get("fileSearchStores/other", PROMPT, version) is None, "Failed: Other stores should miss"
+print("  ✅ PASSED\n")
+
+# Test 2: Upload/delete invalidates, including answers computed during the change
+print("Test 2: Invalidation on document change")
+old_version = asyncio.run(cache.version(STORE))
+asyncio.run(cache.bump(STORE))
+new_version = asyncio.run(cache.version(STORE))
+assert new_version != old_version, "Failed: Bump should change the version"
+assert cache.get(STORE, PROMPT, new_version) is None, "Failed: Bump should invalidate the store"
+cache.set(STORE, PROMPT, "舊文件的答案", CITATIONS, old_version)
+assert cache.get(STORE, PROMPT, new_version) is None, "Failed: Answer from the old document set should not be served"
+print("  ✅ PASSED\n")
+
+# Test 3: TTL
+print("Test 3: TTL expiry")
+cache = AnswerCache(ttl_seconds=0.1)
+cache.set(STORE, PROMPT, "摘要內容", CITATIONS, "0")
+time.sleep(0.15)
+assert cache.get(STORE, PROMPT, "0") is None and not cache.entries, "Failed: Expired answer should be dropped"
+print("  ✅ PASSED\n")
+
+# Test 4: A bump on one worker invalidates the other workers' answers
+print("Test 4: Shared document set version")
+
+
+async def two_workers():
+    backend = SQLiteSessionBackend(str(Path(tempfile.mkdtemp()) / "sessions.db"))
+    worker_a = AnswerCache(ttl_seconds=60, backend=backend)
+    worker_b = AnswerCache(ttl_seconds=60, backend=backend)
+    version = await worker_b.version(STORE)
+    worker_b.set(STORE, PROMPT, "舊文件的答案", CITATIONS, version)
+    before = worker_b.get(STORE, PROMPT, await worker_b.version(STORE))
+    await worker_a.bump(STORE)  # upload handled by worker A
+    after = worker_b.get(STORE, PROMPT, await worker_b.version(STORE))
+    await backend.close()
+    return before, after
+
+before, after = asyncio.run(two_workers())
+assert before is not None, "Failed: Worker B should hit before the upload"
+assert after is None, "Failed: Worker B should not serve answers from before worker A's upload"
+print("  ✅ PASSED\n")
+
+
+# Test 5: An unreadable backend bypasses the cache instead of serving stale answers
+print("Test 5: Backend errors")
+
+
+class BrokenBackend(SessionBackend):
+    async def get(self, key):
+        raise ConnectionError("backend down")
+
+    async def set(self, key, value, ttl_seconds):
+        raise ConnectionError("backend down")
+
+cache = AnswerCache(ttl_seconds=60, backend=BrokenBackend())
+version = asyncio.run(cache.version(STORE))
+cache.set(STORE, PROMPT, "摘要內容", CITATIONS, version)
+asyncio.run(cache.bump(STORE))
+assert version is None and cache.get(STORE, PROMPT, version) is None and not cache.entries, \
+    "Failed: Cache should be bypassed when the version is unknown"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
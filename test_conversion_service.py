@@ -0,0 +1,199 @@
+"""
+Test script for the LibreOffice conversion service and conversion pipeline.
+
+Uses a fake soffice executable that sleeps and writes the expected output file,
+so the pool behaviour can be checked without LibreOffice installed.
+"""
+
+import asyncio
+import hashlib
+import stat
+import tempfile
+import time
+from pathlib import Path
+
+from conversion_pipeline import ConversionPipeline
+from conversion_service import LibreOfficeConverter
+
+FAKE_SOFFICE = """#!/bin/sh
+# Fake soffice: --convert-to EXT --outdir DIR INPUT
+sleep 0.3
+while [ $# -gt 0 ]; do
+  case "$1" in
+    --convert-to) ext="$2"; shift ;;
+    --outdir) outdir="$2"; shift ;;
+    --terminate_after_init) exit 0 ;;
+    -*) ;;
+    *) input="$1" ;;
+  esac
+  shift
+done
+case "$input" in
+  *broken*) echo "Error: source file could not be loaded" >&2; exit 1 ;;
+  *slow*) sleep 5 ;;
+esac
+name=$(basename "$input"); touch "$outdir/${name%.*}.$ext"
+"""
+
+work_dir = Path(tempfile.mkdtemp())
+fake_binary = work_dir / "soffice"
+fake_binary.write_text(FAKE_SOFFICE)
+fake_binary.chmod(fake_binary.stat().st_mode | stat.S_IEXEC)
+
+
+def make_converter(num_workers: int) -> LibreOfficeConverter:
+    converter = LibreOfficeConverter(num_workers=num_workers, profile_root=str(work_dir / "profiles"))
+    converter.binary = str(fake_binary)
+    return converter
+
+
+def make_input(name: str) -> Path:
+    path = work_dir / name
+    path.write_bytes(b"legacy office file")
+    return path
+
+
+print("Testing LibreOffice conversion service...\n")
+
+# Test 1: Successful conversion
+print("Test 1: Successful conversion")
+converter = make_converter(num_workers=2)
+success, output, message = asyncio.run(converter.convert(make_input("report.doc"), "docx"))
+print(f"  Result: {success}, {output.name if output else None}, {message}")
+assert success and output == work_dir / "report.docx", "Failed: Should produce report.docx"
+print("  ✅ PASSED\n")
+
+# Test 2: Workers run in parallel, capped at num_workers, without blocking the loop
+print("Test 2: Concurrency cap")
+async def convert_batch(converter, count):
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.05)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        converter.convert(make_input(f"deck_{i}.ppt"), "pptx") for i in range(count)
+    ))
+    elapsed = time.perf_counter() - start
+    beat.cancel()
+    return results, elapsed, ticks
+
+converter = make_converter(num_workers=2)
+results, elapsed, ticks = asyncio.run(convert_batch(converter, 4))
+print(f"  4 conversions on 2 workers: {elapsed:.2f}s, heartbeat ticks: {ticks}")
+assert all(success for success, _, _ in results), "Failed: All conversions should succeed"
+assert 0.55 < elapsed < 1.0, "Failed: 4 jobs on 2 workers should take about two rounds"
+assert ticks >= 10, "Failed: Event loop should stay responsive during conversions"
+print("  ✅ PASSED\n")
+
+# Test 3: Failures and timeouts are reported and free the worker
+print("Test 3: Failure and timeout")
+async def failures(converter):
+    broken = await converter.convert(make_input("broken.doc"), "docx")
+    slow = await converter.convert(make_input("slow.doc"), "docx", timeout=0.5)
+    after = await converter.convert(make_input("after.doc"), "docx")
+    return broken, slow, after
+
+converter = make_converter(num_workers=1)
+broken, slow, after = asyncio.run(failures(converter))
+print(f"  broken: {broken[2].strip()}")
+print(f"  slow: {slow[2]}")
+assert not broken[0] and "could not be loaded" in broken[2], "Failed: Should surface LibreOffice error"
+assert not slow[0] and "超時" in slow[2], "Failed: Should time out"
+assert after[0], "Failed: Worker should be released after a timeout"
+print("  ✅ PASSED\n")
+
+# Test 4: Missing LibreOffice
+print("Test 4: LibreOffice not installed")
+converter = make_converter(num_workers=1)
+converter.binary = None
+success, output, message = asyncio.run(converter.convert(make_input("x.doc"), "docx"))
+assert not success and message == "LibreOffice 未安裝", "Failed: Should report missing LibreOffice"
+print("  ✅ PASSED\n")
+
+# Test 5: Identical content skips LibreOffice, whatever the file name
+print("Test 5: Conversion cache")
+async def convert_twice(pipeline):
+    first = await pipeline.convert(make_input("group_a_report.doc"), ".doc")
+    second = await pipeline.convert(make_input("group_b_copy.doc"), ".doc")
+    return first, second
+
+converter = make_converter(num_workers=1)
+pipeline = ConversionPipeline(converter, cache_dir=str(work_dir / "cache"))
+pipeline.register(".doc", "docx", timeout=5)
+start = time.perf_counter()
+first, second = asyncio.run(convert_twice(pipeline))
+elapsed = time.perf_counter() - start
+print(f"  stats: {pipeline.get_stats()}, elapsed: {elapsed:.2f}s")
+assert first[0] and second[0], "Failed: Both conversions should succeed"
+assert second[1] == work_dir / "group_b_copy.docx" and second[1].exists(), "Failed: Cached output should be copied"
+assert pipeline.get_stats()["hits"] == 1 and pipeline.get_stats()["misses"] == 1, "Failed: Second call should hit"
+assert elapsed < 0.55, "Failed: Cache hit should not run LibreOffice"
+assert pipeline.get_rule(".xls") is None, "Failed: Unregistered formats have no rule"
+digest = hashlib.sha256(b"legacy office file").hexdigest()
+cached_path = pipeline.cached_output(digest, ".doc")
+assert cached_path == work_dir / "cache" / f"{digest}.docx", "Failed: Cached output path"
+pipeline.release(cached_path)
+assert not pipeline.pinned, "Failed: Released output should be unpinned"
+assert pipeline.cached_output("0" * 64, ".doc") is None, "Failed: Unknown content is not cached"
+print("  ✅ PASSED\n")
+
+# Test 6: Size-bounded LRU eviction
+print("Test 6: LRU eviction")
+async def fill_cache(pipeline):
+    for i in range(3):
+        path = work_dir / f"lru_{i}.doc"
+        path.write_bytes(f"content {i}".encode())
+        await pipeline.convert(path, ".doc")
+
+class SizedConverter(LibreOfficeConverter):
+    async def convert(self, input_path, target_ext, timeout=60):
+        output = input_path.parent / f"{input_path.stem}.{target_ext}"
+        output.write_bytes(b"x" * 40)
+        return True, output, "轉換成功"
+
+pipeline = ConversionPipeline(SizedConverter(num_workers=1), cache_dir=str(work_dir / "lru_cache"), max_cache_bytes=100)
+pipeline.register(".doc", "docx")
+asyncio.run(fill_cache(pipeline))
+stats = pipeline.get_stats()
+print(f"  stats: {stats}")
+assert stats["entries"] == 2 and stats["bytes"] == 80, "Failed: Oldest entry should be evicted"
+assert len(list((work_dir / "lru_cache").iterdir())) == 2, "Failed: Evicted file should be deleted"
+print("  ✅ PASSED\n")
+
+# Test 7: An output being uploaded is not evicted
+print("Test 7: Pinned output survives eviction")
+pipeline = ConversionPipeline(SizedConverter(num_workers=1), cache_dir=str(work_dir / "pin_cache"), max_cache_bytes=50)
+pipeline.register(".doc", "docx")
+(work_dir / "pin.doc").write_bytes(b"content pinned")
+asyncio.run(pipeline.convert(work_dir / "pin.doc", ".doc"))
+pinned_path = pipeline.cached_output(hashlib.sha256(b"content pinned").hexdigest(), ".doc")
+asyncio.run(fill_cache(pipeline))
+print(f"  stats: {pipeline.get_stats()}")
+assert pinned_path.exists(), "Failed: Pinned output should not be evicted"
+assert pipeline.get_stats()["bytes"] == 80, "Failed: Only the pinned and newest outputs should remain"
+pipeline.release(pinned_path)
+assert not pinned_path.exists(), "Failed: Output should be evicted once released"
+assert pipeline.get_stats()["bytes"] == 40, "Failed: Cache should shrink back under its limit"
+print("  ✅ PASSED\n")
+
+# Test 8: close() removes only a profile directory the converter created
+print("Test 8: Profile cleanup")
+owned = LibreOfficeConverter(num_workers=1)
+owned.profiles[0].mkdir(parents=True)
+provided = make_converter(num_workers=1)
+provided.profiles[0].mkdir(parents=True, exist_ok=True)
+asyncio.run(owned.close())
+asyncio.run(provided.close())
+assert not owned.profile_root.exists(), "Failed: Temp profile directory should be removed"
+assert provided.profile_root.exists(), "Failed: Caller's profile directory should be kept"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
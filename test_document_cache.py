@@ -0,0 +1,84 @@
+"""
+Test script for the per-store document list cache.
+"""
+
+import time
+
+from document_cache import DocumentCache
+
+print("Testing document cache...\n")
+
+
+def doc(name: str) -> dict:
+    return {'name': f"fileSearchStores/s1/documents/{name}", 'display_name': f"{name}.pdf"}
+
+
+# Test 1: Hits, misses and TTL expiry
+print("Test 1: TTL")
+cache = DocumentCache(ttl_seconds=0.2, empty_ttl_seconds=0.2)
+assert cache.get("user_a") is None, "Failed: Unknown store should miss"
+cache.set("user_a", [doc("a")])
+assert cache.get("user_a") == [doc("a")], "Failed: Fresh entry should hit"
+time.sleep(0.25)
+assert cache.get("user_a") is None, "Failed: Expired entry should miss"
+print(f"  hits: {cache.hits}, misses: {cache.misses}")
+assert (cache.hits, cache.misses) == (1, 2)
+print("  ✅ PASSED\n")
+
+# Test 2: Empty lists expire sooner than non-empty ones
+print("Test 2: Empty list TTL")
+cache = DocumentCache(ttl_seconds=60, empty_ttl_seconds=0.1)
+cache.set("user_empty", [])
+cache.set("user_full", [doc("a")])
+assert cache.get("user_empty") == [], "Failed: Fresh empty list should hit"
+time.sleep(0.15)
+assert cache.get("user_empty") is None, "Failed: Empty list should expire after empty_ttl_seconds"
+assert cache.get("user_full") == [doc("a")], "Failed: Non-empty list should keep the full TTL"
+print("  ✅ PASSED\n")
+
+# Test 3: Uploads and deletes update cached lists in place
+print("Test 3: In-place updates")
+cache = DocumentCache(ttl_seconds=60)
+cache.set("user_a", [doc("a"), doc("b")])
+cache.add_document("user_a", doc("c"))
+cache.add_document("user_a", doc("c"))
+cache.add_document("user_uncached", doc("x"))
+assert [d['display_name'] for d in cache.get("user_a")] == ["a.pdf", "b.pdf", "c.pdf"], "Failed: add_document"
+assert cache.get("user_uncached") is None, "Failed: Uncached stores should not be created"
+assert cache.remove_document(doc("b")['name']) is True, "Failed: remove_document should find the entry"
+assert cache.remove_document(doc("zzz")['name']) is False
+assert [d['display_name'] for d in cache.get("user_a")] == ["a.pdf", "c.pdf"]
+print("  ✅ PASSED\n")
+
+# Test 4: Returned lists are copies; invalidate drops the entry
+print("Test 4: Copies and invalidation")
+cache.get("user_a").append(doc("mutated"))
+assert len(cache.get("user_a")) == 2, "Failed: Callers should not mutate the cached list"
+cache.invalidate("user_a")
+cache.invalidate("user_missing")
+assert cache.get("user_a") is None, "Failed: Invalidated store should miss"
+print("  ✅ PASSED\n")
+
+# Test 5: "Has documents" flags without a full list
+print("Test 5: Has documents flag")
+cache = DocumentCache(ttl_seconds=0.2)
+assert cache.has_documents("user_a") is None, "Failed: Unknown store"
+cache.mark_has_documents("user_a")
+assert cache.has_documents("user_a") is True, "Failed: Flag should answer the check"
+cache.remove_document(doc("a")['name'])
+assert cache.has_documents("user_a") is None, "Failed: A delete may empty the store"
+cache.add_document("user_a", doc("a"))
+assert cache.has_documents("user_a") is True, "Failed: An upload flags the store"
+cache.set("user_a", [])
+assert cache.has_documents("user_a") is False, "Failed: A fetched list wins over the flag"
+cache.mark_has_documents("user_b")
+cache.invalidate("user_b")
+assert cache.has_documents("user_b") is None, "Failed: invalidate should drop the flag"
+cache.mark_has_documents("user_c")
+time.sleep(0.25)
+assert cache.has_documents("user_c") is None, "Failed: Flag should expire with the TTL"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
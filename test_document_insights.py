@@ -0,0 +1,67 @@
+"""
+Test script for precomputed document insights.
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from document_insights import DocumentInsights
+
+STORE = "group_G1"
+DOC = "fileSearchStores/s1/documents/d1"
+CITATIONS = [{'type': 'file', 'title': '季報.pdf', 'text': '營收成長 12%'}]
+
+insights = DocumentInsights(db_path=str(Path(tempfile.mkdtemp()) / "insights.db"))
+
+print("Testing document insights...\n")
+
+# Test 1: Quick Reply prompt lookup
+print("Test 1: Lookup by button prompt")
+asyncio.run(insights.save(STORE, DOC, "季報.pdf", "summary", "請幫我生成「季報.pdf」這個檔案的摘要", "季報摘要", CITATIONS))
+asyncio.run(insights.save(STORE, DOC, "季報.pdf", "key_points", "請幫我整理「季報.pdf」的重點", "季報重點", CITATIONS))
+assert asyncio.run(insights.lookup(STORE, "請幫我生成「季報.pdf」這個檔案的摘要")) == ("季報摘要", CITATIONS), "Failed: Summary lookup"
+assert asyncio.run(insights.lookup(STORE, "請幫我整理「季報.pdf」的重點"))[0] == "季報重點", "Failed: Key points lookup"
+assert asyncio.run(insights.lookup("group_other", "請幫我整理「季報.pdf」的重點")) is None, "Failed: Other stores should miss"
+assert asyncio.run(insights.has(DOC, "summary")), "Failed: has() should see the summary"
+print("  ✅ PASSED\n")
+
+# Test 2: Free-text question naming the file
+print("Test 2: Question about a file")
+assert asyncio.run(insights.find_summary_for_question(STORE, "季報在講什麼？")) == ("季報摘要", CITATIONS), "Failed: Should match file stem"
+assert asyncio.run(insights.find_summary_for_question(STORE, "季報的營收是多少？")) is None, "Failed: Other questions go to the model"
+assert asyncio.run(insights.find_summary_for_question(STORE, "年報在講什麼？")) is None, "Failed: Unknown file should miss"
+for question in ("請問「季報.pdf」這份文件在說什麼", "「季報.pdf」在講什麼？", "幫我生成季報的摘要", "季報 summary"):
+    assert asyncio.run(insights.find_summary_for_question(STORE, question)) == ("季報摘要", CITATIONS), f"Failed: {question}"
+print("  ✅ PASSED\n")
+
+# Test 3: Only whole-file questions are intercepted
+print("Test 3: Specific questions go to the model")
+asyncio.run(insights.save(STORE, "fileSearchStores/s1/documents/d2", "ai.pdf", "summary", "ai 摘要 prompt", "AI 摘要", []))
+asyncio.run(insights.save(STORE, "fileSearchStores/s1/documents/d3", "合約.docx", "summary", "合約 摘要 prompt", "合約摘要", []))
+asyncio.run(insights.save(STORE, "fileSearchStores/s1/documents/d4", "training_plan.pdf", "summary", "plan prompt", "計畫摘要", []))
+misses = [
+    "Tell me about the training plan",     # "ai" inside "training", generic "about"
+    "What is AI about?",                   # stem too short to name the file on its own
+    "合約第三條在說什麼？跟付款期限有關嗎",      # a question about part of the file
+    "季報和年報的差異是什麼",
+]
+for question in misses:
+    assert asyncio.run(insights.find_summary_for_question(STORE, question)) is None, f"Failed: Should not intercept {question!r}"
+assert asyncio.run(insights.find_summary_for_question(STORE, "What is ai.pdf about?")) == ("AI 摘要", []), "Failed: Full file name"
+assert asyncio.run(insights.find_summary_for_question(STORE, "合約在說什麼？")) == ("合約摘要", []), "Failed: Whole-file question"
+assert asyncio.run(insights.find_summary_for_question(STORE, "summarize training_plan")) == ("計畫摘要", []), "Failed: English"
+print("  ✅ PASSED\n")
+
+# Test 4: Deleting the document drops its insights
+print("Test 4: Forget on delete")
+asyncio.run(insights.forget_document(DOC))
+assert asyncio.run(insights.lookup(STORE, "請幫我生成「季報.pdf」這個檔案的摘要")) is None, "Failed: Insights should be removed"
+assert not asyncio.run(insights.has(DOC, "key_points")), "Failed: Insights should be removed"
+print("  ✅ PASSED\n")
+
+asyncio.run(insights.close())
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
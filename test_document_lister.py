@@ -0,0 +1,151 @@
+"""
+Test script for paged document listing.
+
+Runs DocumentLister against a local stub of the REST documents endpoint that
+pages with nextPageToken, and counts the REST calls each operation makes.
+"""
+
+import asyncio
+
+from aiohttp import web
+
+from document_cache import DocumentCache
+from document_lister import DocumentLister
+from http_pool import HttpClientPool
+from single_flight import SingleFlight
+
+DOCUMENTS = 25
+
+
+class StubDocumentsApi:
+    """Serves DOCUMENTS documents for fileSearchStores/s1, 404 for fileSearchStores/gone."""
+
+    def __init__(self):
+        self.requests = []  # (store, pageSize, pageToken)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        store = request.match_info['store']
+        page_size = int(request.query['pageSize'])
+        offset = int(request.query.get('pageToken') or 0)
+        self.requests.append((store, page_size, offset))
+        if store == 'gone':
+            return web.json_response({'error': 'not found'}, status=404)
+        docs = [
+            {'name': f"fileSearchStores/{store}/documents/d{i}", 'displayName': f"doc{i}.pdf"}
+            for i in range(offset, min(offset + page_size, DOCUMENTS))
+        ]
+        body = {'documents': docs}
+        if offset + page_size < DOCUMENTS:
+            body['nextPageToken'] = str(offset + page_size)
+        return web.json_response(body)
+
+
+async def with_lister(scenario):
+    api = StubDocumentsApi()
+    app = web.Application()
+    app.router.add_get("/v1beta/fileSearchStores/{store}/documents", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    stores = {'user_a': 'fileSearchStores/s1', 'user_gone': 'fileSearchStores/gone'}
+    forgotten = []
+
+    async def resolve_store(store_name):
+        return stores.get(store_name)
+
+    async def forget_store(store_name):
+        forgotten.append(store_name)
+
+    pool = HttpClientPool()
+    lister = DocumentLister(
+        pool,
+        f"http://127.0.0.1:{port}/v1beta",
+        "test-key",
+        resolve_store=resolve_store,
+        forget_store=forget_store,
+        document_cache=DocumentCache(ttl_seconds=60),
+        flights=SingleFlight(),
+        page_size=10
+    )
+    try:
+        return await scenario(lister, api, forgotten)
+    finally:
+        await pool.close()
+        await runner.cleanup()
+
+
+print("Testing document lister...\n")
+
+# Test 1: Iteration follows nextPageToken to the last page
+print("Test 1: nextPageToken paging")
+
+
+async def iterate_all(lister, api, forgotten):
+    return [doc['display_name'] async for doc in lister.iter_documents('user_a')], api.requests
+
+names, requests = asyncio.run(with_lister(iterate_all))
+print(f"  {len(names)} documents in {len(requests)} requests: {requests}")
+assert names == [f"doc{i}.pdf" for i in range(DOCUMENTS)], "Failed: All documents in order"
+assert [offset for _, _, offset in requests] == [0, 10, 20], "Failed: Should follow nextPageToken"
+print("  ✅ PASSED\n")
+
+# Test 2: has_documents stops after one document and caches both answers
+print("Test 2: has_documents")
+
+
+async def check_has_documents(lister, api, forgotten):
+    found = await lister.has_documents('user_a')
+    missing = await lister.has_documents('user_unknown')
+    repeated = [await lister.has_documents('user_a') for _ in range(5)]
+    return found, missing, repeated, list(api.requests), lister.document_cache.get('user_unknown')
+
+found, missing, repeated, requests, cached = asyncio.run(with_lister(check_has_documents))
+assert found is True and missing is False, "Failed: has_documents results"
+assert repeated == [True] * 5, "Failed: Repeated checks should still find documents"
+assert requests == [('s1', 1, 0)], "Failed: Should request a single one-document page, then use the cache"
+assert cached == [], "Failed: Unknown store should be cached as empty"
+print("  ✅ PASSED\n")
+
+# Test 3: Carousel pages: has_next, total, and only the pages needed
+print("Test 3: Carousel pages")
+
+
+async def carousel_pages(lister, api, forgotten):
+    first = await lister.get_page('user_a', 1, 10)
+    first_requests = len(api.requests)
+    last = await lister.get_page('user_a', 3, 10)
+    cached = await lister.get_page('user_a', 2, 10)
+    return first, first_requests, last, cached, len(api.requests)
+
+first, first_requests, last, cached, total_requests = asyncio.run(with_lister(carousel_pages))
+docs, has_next, total = first
+print(f"  page 1: {len(docs)} docs, has_next={has_next}, total={total}, {first_requests} requests")
+assert len(docs) == 10 and has_next is True and total is None, "Failed: Page 1 of an unfinished listing"
+assert first_requests == 2, "Failed: Page 1 needs one document past the page (two REST pages of 10)"
+docs, has_next, total = last
+print(f"  page 3: {len(docs)} docs, has_next={has_next}, total={total}")
+assert [d['display_name'] for d in docs] == [f"doc{i}.pdf" for i in range(20, 25)], "Failed: Last page contents"
+assert has_next is False and total == DOCUMENTS, "Failed: Last page should know the total"
+docs, has_next, total = cached
+assert len(docs) == 10 and has_next is True and total == DOCUMENTS, "Failed: Page from the cached full list"
+assert total_requests == 5, "Failed: Cached full list should not need more requests"
+print("  ✅ PASSED\n")
+
+# Test 4: A store deleted on the server is forgotten
+print("Test 4: Deleted store")
+
+
+async def deleted_store(lister, api, forgotten):
+    docs = [doc async for doc in lister.iter_documents('user_gone')]
+    return docs, forgotten
+
+docs, forgotten = asyncio.run(with_lister(deleted_store))
+assert docs == [] and forgotten == ['user_gone'], "Failed: 404 should forget the store mapping"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
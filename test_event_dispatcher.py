@@ -0,0 +1,141 @@
+"""
+Test script for the background event dispatcher.
+"""
+
+import asyncio
+import time
+
+from event_dispatcher import EventDispatcher
+
+print("Testing event dispatcher...\n")
+
+
+# Test 1: Events from the same chat keep their order
+async def run_per_chat_ordering():
+    processed = []
+
+    async def handler(chat_id, seq):
+        # Earlier events sleep longer, so any reordering would show up
+        await asyncio.sleep(0.01 * (5 - seq))
+        processed.append((chat_id, seq))
+
+    dispatcher = EventDispatcher(handler, num_workers=4, queue_size=10)
+    dispatcher.start()
+    for seq in range(5):
+        for chat_id in ("group_A", "group_B"):
+            await dispatcher.submit(chat_id, chat_id, seq)
+    await dispatcher.stop()
+    return processed, dispatcher.get_stats()
+
+print("Test 1: Per-chat ordering")
+processed, stats = asyncio.run(run_per_chat_ordering())
+for chat_id in ("group_A", "group_B"):
+    order = [seq for c, seq in processed if c == chat_id]
+    print(f"  {chat_id}: {order} (Expected: [0, 1, 2, 3, 4])")
+    assert order == [0, 1, 2, 3, 4], "Failed: Events for one chat must stay in order"
+assert stats['processed'] == 10, "Failed: All events should be processed"
+print("  ✅ PASSED\n")
+
+
+# Test 2: Different chats are processed in parallel and submit() returns immediately
+async def run_parallel_chats():
+    async def handler(chat_id):
+        await asyncio.sleep(0.2)
+
+    dispatcher = EventDispatcher(handler, num_workers=8, queue_size=10)
+    dispatcher.start()
+    start = time.perf_counter()
+    for i in range(8):
+        await dispatcher.submit(f"user_{i}", f"user_{i}")
+    submit_elapsed = time.perf_counter() - start
+    await dispatcher.stop()
+    return submit_elapsed, time.perf_counter() - start
+
+print("Test 2: Parallel chats")
+submit_elapsed, total_elapsed = asyncio.run(run_parallel_chats())
+print(f"  submit: {submit_elapsed * 1000:.1f}ms, total: {total_elapsed:.2f}s")
+assert submit_elapsed < 0.05, "Failed: submit() should not wait for handlers"
+assert total_elapsed < 1.0, "Failed: Different chats should run concurrently"
+print("  ✅ PASSED\n")
+
+
+# Test 3: Full queue applies backpressure, then drops
+async def run_backpressure():
+    release = asyncio.Event()
+
+    async def handler(n):
+        await release.wait()
+
+    dispatcher = EventDispatcher(handler, num_workers=1, queue_size=2, enqueue_timeout=0.05)
+    dispatcher.start()
+    results = []
+    for n in range(5):
+        results.append(await dispatcher.submit("group_busy", n))
+        await asyncio.sleep(0)
+    release.set()
+    await dispatcher.stop()
+    return results, dispatcher.get_stats()
+
+print("Test 3: Backpressure")
+results, stats = asyncio.run(run_backpressure())
+print(f"  submit results: {results}, stats: {stats}")
+# One job is taken by the worker, two fill the queue, the rest are dropped
+assert results == [True, True, True, False, False], "Failed: Overflow should be dropped"
+assert stats['dropped'] == 2, "Failed: Dropped events should be counted"
+assert stats['processed'] == 3, "Failed: Accepted events should be processed"
+print("  ✅ PASSED\n")
+
+
+# Test 4: Handler errors don't kill the worker
+async def run_handler_errors():
+    seen = []
+
+    async def handler(n):
+        if n == 0:
+            raise RuntimeError("boom")
+        seen.append(n)
+
+    dispatcher = EventDispatcher(handler, num_workers=1, queue_size=10)
+    dispatcher.start()
+    await dispatcher.submit("user_x", 0)
+    await dispatcher.submit("user_x", 1)
+    await dispatcher.stop()
+    return seen, dispatcher.get_stats()
+
+print("Test 4: Handler errors")
+seen, stats = asyncio.run(run_handler_errors())
+assert seen == [1], "Failed: Worker should continue after an error"
+assert stats['failed'] == 1, "Failed: Errors should be counted"
+print("  ✅ PASSED\n")
+
+# Test 5: A slow chat does not hold up other chats
+async def run_slow_chat():
+    finished = {}
+    start = time.perf_counter()
+
+    async def handler(chat_id, seconds):
+        await asyncio.sleep(seconds)
+        finished.setdefault(chat_id, []).append(time.perf_counter() - start)
+
+    dispatcher = EventDispatcher(handler, num_workers=2, queue_size=20)
+    dispatcher.start()
+    # Three slow jobs (e.g. .ppt conversions) in one chat, quick questions in many others
+    for _ in range(3):
+        await dispatcher.submit("group_slow", "group_slow", 0.3)
+    for i in range(10):
+        await dispatcher.submit(f"user_{i}", f"user_{i}", 0.01)
+    await dispatcher.stop()
+    return finished
+
+print("Test 5: Slow chat isolation")
+finished = asyncio.run(run_slow_chat())
+quick_done = max(t for chat_id, times in finished.items() if chat_id != "group_slow" for t in times)
+slow_done = finished["group_slow"]
+print(f"  other chats done after {quick_done:.2f}s, slow chat jobs at {[round(t, 2) for t in slow_done]}")
+assert quick_done < 0.25, "Failed: Other chats should not wait behind the slow chat"
+assert slow_done == sorted(slow_done) and slow_done[-1] >= 0.9, "Failed: Slow chat jobs should run one at a time"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,126 @@
+"""
+Load test for the async Gemini access layer.
+
+Starts a local stub Gemini server that answers generateContent slowly, then
+fires concurrent "webhooks" at it and measures how long a cheap webhook (one
+that never touches Gemini) has to wait while the slow answers are in flight.
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+
+from aiohttp import web
+from google import genai
+from google.genai import types
+
+from gemini_client import AsyncGeminiClient
+
+STUB_DELAY = 0.5          # seconds the stub takes per generateContent
+CONCURRENT_QUERIES = 10   # slow RAG answers in flight at once
+PROBE_INTERVAL = 0.02     # how often the cheap webhook fires
+
+
+async def stub_generate_content(request: web.Request) -> web.Response:
+    await asyncio.sleep(STUB_DELAY)
+    return web.json_response({
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": "stub answer"}]},
+            "finishReason": "STOP"
+        }]
+    })
+
+
+def start_stub_server() -> tuple[asyncio.AbstractEventLoop, web.AppRunner, str]:
+    """Run the stub in its own thread so blocking clients cannot starve it."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", stub_generate_content)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(serve(), loop)
+    started.wait(5)
+    return loop, state["runner"], f"http://127.0.0.1:{state['port']}/"
+
+
+def stop_stub_server(loop: asyncio.AbstractEventLoop, runner: web.AppRunner):
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+async def probe_latencies(stop: asyncio.Event) -> list:
+    """Simulate cheap webhooks and record how late each one gets served."""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        latencies.append(time.perf_counter() - start - PROBE_INTERVAL)
+    return latencies
+
+
+async def run_load(use_async_layer: bool) -> tuple[float, list]:
+    stub_loop, stub_runner, base_url = start_stub_server()
+    client = genai.Client(api_key="stub", http_options=types.HttpOptions(base_url=base_url))
+    gemini = AsyncGeminiClient(client)
+
+    async def slow_webhook(i: int):
+        if use_async_layer:
+            response = await gemini.generate_content(model="gemini-2.5-flash", contents=f"q{i}")
+        else:
+            # The pre-refactor code path: a sync SDK call inside an async handler
+            response = client.models.generate_content(model="gemini-2.5-flash", contents=f"q{i}")
+        assert response.text == "stub answer"
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_latencies(stop))
+    await asyncio.sleep(PROBE_INTERVAL)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(slow_webhook(i) for i in range(CONCURRENT_QUERIES)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    latencies = await probe
+    stop_stub_server(stub_loop, stub_runner)
+    return elapsed, latencies
+
+
+def report(label: str, elapsed: float, latencies: list):
+    print(f"  {label}: {CONCURRENT_QUERIES} queries in {elapsed:.2f}s, "
+          f"cheap webhook delay p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"max={max(latencies) * 1000:.1f}ms")
+
+
+print("Testing async Gemini layer under load...\n")
+
+# Test 1: Blocking baseline (sync SDK calls inside async handlers)
+print("Test 1: Blocking baseline")
+sync_elapsed, sync_latencies = asyncio.run(run_load(use_async_layer=False))
+report("sync", sync_elapsed, sync_latencies)
+assert sync_elapsed >= CONCURRENT_QUERIES * STUB_DELAY * 0.9, "Baseline should serialize queries"
+print("  ✅ PASSED\n")
+
+# Test 2: Async layer keeps the event loop responsive
+print("Test 2: Async layer")
+async_elapsed, async_latencies = asyncio.run(run_load(use_async_layer=True))
+report("async", async_elapsed, async_latencies)
+assert async_elapsed < CONCURRENT_QUERIES * STUB_DELAY / 2, "Queries should run concurrently"
+assert max(async_latencies) < STUB_DELAY / 2, "Cheap webhooks should not wait for Gemini"
+assert max(async_latencies) < max(sync_latencies), "Async layer should beat the blocking baseline"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
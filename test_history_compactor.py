@@ -0,0 +1,88 @@
+"""
+Test script for token-budgeted history compaction.
+"""
+
+import asyncio
+
+from google import genai
+from google.genai import types
+
+from chat_session_manager import ChatSessionManager
+from gemini_client import AsyncGeminiClient
+from history_compactor import SUMMARY_PREFIX, HistoryCompactor
+
+summaries = []
+
+
+async def fake_summarize(prompt: str) -> str:
+    summaries.append(prompt)
+    await asyncio.sleep(0.05)
+    return f"摘要 #{len(summaries)}：用戶叫小明，正在讀季報。"
+
+
+def simulate_turn(chat, question: str, answer: str):
+    """Append a user/model turn to a chat without calling the API."""
+    chat.record_history(
+        user_input=types.Content(role='user', parts=[types.Part(text=question)]),
+        model_output=[types.Content(role='model', parts=[types.Part(text=answer)])],
+        automatic_function_calling_history=[],
+        is_valid=True
+    )
+
+
+def texts(chat):
+    return [content.parts[0].text for content in chat.get_history()]
+
+
+print("Testing history compaction...\n")
+
+# Test 1: Under budget, nothing happens
+print("Test 1: Under budget")
+compactor = HistoryCompactor(fake_summarize, token_budget=10_000, keep_turns=2)
+history = [
+    types.Content(role='user', parts=[types.Part(text="你好")]),
+    types.Content(role='model', parts=[types.Part(text="你好！")]),
+]
+assert asyncio.run(compactor.compact(history)) is None, "Failed: Short history should be left alone"
+assert not summaries, "Failed: No summary call expected"
+print("  ✅ PASSED\n")
+
+# Test 2: Long session is compacted in the background, keeping the last K turns
+print("Test 2: Compaction in a session")
+async def long_session():
+    compactor = HistoryCompactor(fake_summarize, token_budget=600, keep_turns=2)
+    manager = ChatSessionManager(AsyncGeminiClient(genai.Client(api_key="test-key")), compactor=compactor)
+    for i in range(8):
+        async with manager.session_lock("U1"):
+            chat = await manager.get_or_create_session("U1", "fileSearchStores/s1")
+            simulate_turn(chat, f"第 {i} 個問題：" + "季報內容" * 20, f"第 {i} 個回答：" + "營收成長" * 20)
+            await manager.end_turn("U1")
+        compaction = asyncio.create_task(manager.compact_session("U1"))
+        if i == 7:
+            # A turn finishing while the summary is being written must not be lost
+            async with manager.session_lock("U1"):
+                simulate_turn(chat, "最後一題", "最後回答")
+                await manager.end_turn("U1")
+        await compaction
+    chat = await manager.get_or_create_session("U1", "fileSearchStores/s1")
+    return texts(chat), manager.get_stats(), compactor
+
+history, stats, compactor = asyncio.run(long_session())
+print(f"  history: {[text[:12] for text in history]}")
+print(f"  stats: requests={stats['requests']}, tokens_saved={stats['tokens_saved']}, "
+      f"per request={stats['tokens_saved_per_request']:.0f}, compaction={stats['compaction']}")
+assert history[0].startswith(SUMMARY_PREFIX), "Failed: History should start with the summary"
+assert history[-2:] == ["最後一題", "最後回答"], "Failed: Turn added during summarization should be kept"
+assert any(text.startswith("第 7 個問題") for text in history), "Failed: Recent turns should stay verbatim"
+assert not any(text.startswith("第 0 個問題") for text in history), "Failed: Old turns should be summarized"
+assert stats['tokens_saved'] > 0 and stats['tokens_saved_per_request'] > 0, "Failed: Savings should be reported"
+print("  ✅ PASSED\n")
+
+# Test 3: Previous summary is folded into the next one
+print("Test 3: Rolling summary")
+assert any("摘要 #1" in prompt for prompt in summaries[1:]), "Failed: Earlier summary should feed the next one"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,99 @@
+"""
+Benchmark for the shared keep-alive HTTP pool.
+
+Simulates the REST calls made per message (loading animation + document list)
+against a local stub server and counts how many new connections are opened with
+the shared pool vs. a fresh connection per call (the old requests.* behaviour).
+"""
+
+import asyncio
+import time
+
+from aiohttp import web
+
+from http_pool import HttpClientPool
+
+MESSAGES = 50
+
+
+async def stub_handler(request: web.Request) -> web.Response:
+    return web.json_response({'documents': []})
+
+
+async def start_stub_server() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", stub_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def handle_message(pool: HttpClientPool, base_url: str):
+    """The REST calls a normal text question made before the pool existed."""
+    async with pool.session.post(f"{base_url}/v2/bot/chat/loading/start", json={}) as response:
+        await response.read()
+    async with pool.session.get(f"{base_url}/v1beta/fileSearchStores/x/documents") as response:
+        await response.json()
+
+
+# (method, url, seconds, status) reported by the shared pool's latency callback
+request_timings = []
+
+
+async def run_benchmark(shared: bool) -> tuple[dict, float]:
+    runner, base_url = await start_stub_server()
+    totals = {'connections_created': 0, 'requests_sent': 0}
+    start = time.perf_counter()
+
+    if shared:
+        pool = HttpClientPool(on_request_done=lambda *timing: request_timings.append(timing))
+        for _ in range(MESSAGES):
+            await handle_message(pool, base_url)
+        totals = pool.get_stats()
+        await pool.close()
+    else:
+        for _ in range(MESSAGES):
+            # One throwaway session per call, like requests.post/get without a Session
+            for call in ("post", "get"):
+                pool = HttpClientPool()
+                url = f"{base_url}/v2/bot/chat/loading/start" if call == "post" else f"{base_url}/v1beta/x/documents"
+                async with getattr(pool.session, call)(url) as response:
+                    await response.read()
+                stats = pool.get_stats()
+                totals['connections_created'] += stats['connections_created']
+                totals['requests_sent'] += stats['requests_sent']
+                await pool.close()
+
+    elapsed = time.perf_counter() - start
+    await runner.cleanup()
+    return totals, elapsed
+
+
+print("Benchmarking shared HTTP pool...\n")
+
+print("Test 1: Fresh connection per call")
+fresh_stats, fresh_elapsed = asyncio.run(run_benchmark(shared=False))
+print(f"  {MESSAGES} messages: {fresh_stats['requests_sent']} requests, "
+      f"{fresh_stats['connections_created']} connections, {fresh_elapsed:.2f}s")
+assert fresh_stats['connections_created'] == fresh_stats['requests_sent'], "Failed: Each call should connect"
+print("  ✅ PASSED\n")
+
+print("Test 2: Shared keep-alive pool")
+pool_stats, pool_elapsed = asyncio.run(run_benchmark(shared=True))
+print(f"  {MESSAGES} messages: {pool_stats['requests_sent']} requests, "
+      f"{pool_stats['connections_created']} connections, {pool_elapsed:.2f}s")
+print(f"  connections per message: {fresh_stats['connections_created'] / MESSAGES:.2f} -> "
+      f"{pool_stats['connections_created'] / MESSAGES:.2f}")
+assert pool_stats['requests_sent'] == MESSAGES * 2, "Failed: All requests should be counted"
+assert pool_stats['connections_created'] == 1, "Failed: Sequential calls should reuse one connection"
+assert len(request_timings) == MESSAGES * 2, "Failed: Every request should report its latency"
+assert request_timings[0][0] == "POST" and request_timings[0][1].endswith("/chat/loading/start")
+assert all(timing[3] == 200 for timing in request_timings), "Failed: Response status should be reported"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
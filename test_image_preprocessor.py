@@ -0,0 +1,76 @@
+"""
+Test script for image pre-processing before Gemini vision.
+"""
+
+import asyncio
+import io
+
+from PIL import Image
+
+from image_preprocessor import ImagePreprocessor, sniff_image_type
+
+print("Testing image preprocessor...\n")
+
+
+def make_image(size, mode='RGB', format='JPEG', orientation=None):
+    image = Image.new(mode, size, (200, 30, 30) if mode == 'RGB' else (200, 30, 30, 128))
+    output = io.BytesIO()
+    kwargs = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation      # Orientation
+        exif[0x010F] = 'PhoneMaker'     # Make
+        kwargs['exif'] = exif.tobytes()
+    image.save(output, format=format, **kwargs)
+    return output.getvalue()
+
+
+preprocessor = ImagePreprocessor(max_dimension=1024, quality=80)
+
+# Test 1: Format is sniffed from the bytes
+print("Test 1: Format sniffing")
+assert sniff_image_type(make_image((10, 10))) == 'image/jpeg'
+assert sniff_image_type(make_image((10, 10), format='PNG')) == 'image/png'
+assert sniff_image_type(make_image((10, 10), format='WEBP')) == 'image/webp'
+assert sniff_image_type(b'not an image') is None
+print("  ✅ PASSED\n")
+
+# Test 2: Large photos are downscaled, rotated and stripped of EXIF
+print("Test 2: Downscale, orientation and EXIF")
+original = make_image((4000, 3000), orientation=6)  # Rotated 90° on display
+data, mime_type = asyncio.run(preprocessor.prepare_async(original))
+with Image.open(io.BytesIO(data)) as image:
+    print(f"  {len(original)} -> {len(data)} bytes, {image.size}, {mime_type}")
+    assert mime_type == 'image/jpeg', "Failed: Should be JPEG"
+    assert image.size == (768, 1024), "Failed: Should be upright and at most 1024 px"
+    assert not image.getexif(), "Failed: EXIF should be removed"
+print("  ✅ PASSED\n")
+
+# Test 3: Transparency is kept (WebP); a misnamed PNG is detected correctly
+print("Test 3: Transparency")
+data, mime_type = preprocessor.prepare(make_image((2000, 500), mode='RGBA', format='PNG'))
+with Image.open(io.BytesIO(data)) as image:
+    assert mime_type == 'image/webp' and image.mode == 'RGBA', "Failed: Alpha should be kept"
+    assert image.size == (1024, 256), "Failed: Should be downscaled"
+print("  ✅ PASSED\n")
+
+# Test 4: Small clean images are sent as-is when re-encoding would not help
+print("Test 4: Small image kept")
+small = make_image((64, 64), format='PNG')
+data, mime_type = preprocessor.prepare(small)
+assert (data, mime_type) == (small, 'image/png'), "Failed: Small PNG should be unchanged"
+print("  ✅ PASSED\n")
+
+# Test 5: Undecodable data falls back to the original bytes
+print("Test 5: Fallback")
+data, mime_type = preprocessor.prepare(b'\xff\xd8\xff truncated')
+assert data == b'\xff\xd8\xff truncated' and mime_type == 'image/jpeg', "Failed: Should send original"
+stats = preprocessor.get_stats()
+print(f"  stats: {stats}")
+assert stats['images'] == 4 and stats['failures'] == 1, "Failed: Counters"
+assert stats['bytes_out'] < stats['bytes_in'], "Failed: Should save bytes overall"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
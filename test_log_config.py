@@ -0,0 +1,53 @@
+"""
+Test script for structured logging.
+"""
+
+import json
+import logging
+import queue
+
+from log_config import JsonFormatter, _QueueHandler, parse_module_levels
+
+print("Testing log config...\n")
+
+# Test 1: Per-module levels
+print("Test 1: Module levels")
+levels = parse_module_levels("main=debug, chat_session_manager=WARNING,,bad")
+assert levels == {'main': 'DEBUG', 'chat_session_manager': 'WARNING'}, "Failed: Should parse name=LEVEL pairs"
+print("  ✅ PASSED\n")
+
+# Test 2: Records go through the queue as JSON with extra fields and tracebacks
+print("Test 2: JSON records")
+records = queue.SimpleQueue()
+logger = logging.getLogger("test_log_config")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+logger.addHandler(_QueueHandler(records))
+
+logger.info("Stored %s citations for %s", 3, "group_G1", extra={'store': 'group_G1'})
+try:
+    raise ValueError("bad page token")
+except ValueError:
+    logger.exception("Error listing documents in store")
+
+first = json.loads(JsonFormatter().format(records.get_nowait()))
+second = json.loads(JsonFormatter().format(records.get_nowait()))
+print(f"  {first}")
+assert first['message'] == "Stored 3 citations for group_G1" and first['level'] == 'INFO', "Failed: Message"
+assert first['store'] == 'group_G1' and first['logger'] == 'test_log_config', "Failed: Extra fields"
+assert second['level'] == 'ERROR' and 'ValueError: bad page token' in second['exc_info'], "Failed: Traceback"
+print("  ✅ PASSED\n")
+
+# Test 3: Disabled levels never format their arguments
+print("Test 3: Lazy formatting")
+class Expensive:
+    def __str__(self):
+        raise AssertionError("formatted although DEBUG is disabled")
+
+logger.debug("Mentionees: %s", Expensive())
+assert records.empty(), "Failed: Debug record should be dropped"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,58 @@
+"""
+Test script for the Prometheus metrics registry.
+"""
+
+import time
+
+from metrics import MetricsRegistry
+
+print("Testing metrics...\n")
+
+registry = MetricsRegistry()
+stages = registry.histogram("stage_duration_seconds", "Duration of pipeline stages", "stage", buckets=(0.1, 1, 10))
+lookups = registry.counter("citation_lookups_total", "Citation lookups", "result")
+
+# Test 1: Histogram buckets are cumulative
+print("Test 1: Histogram")
+for seconds in (0.05, 0.5, 0.7, 30):
+    stages.observe("conversion", seconds)
+with stages.time("download"):
+    time.sleep(0.01)
+text = registry.render()
+assert 'linebot_stage_duration_seconds_bucket{stage="conversion",le="0.1"} 1' in text, "Failed: le=0.1"
+assert 'linebot_stage_duration_seconds_bucket{stage="conversion",le="1.0"} 3' in text, "Failed: le=1"
+assert 'linebot_stage_duration_seconds_bucket{stage="conversion",le="+Inf"} 4' in text, "Failed: +Inf"
+assert 'linebot_stage_duration_seconds_count{stage="download"} 1' in text, "Failed: time() should observe"
+assert "# TYPE linebot_stage_duration_seconds histogram" in text, "Failed: TYPE line"
+print("  ✅ PASSED\n")
+
+# Test 2: Counters and label escaping
+print("Test 2: Counter")
+lookups.inc("hit")
+lookups.inc("hit")
+lookups.inc('mi"ss')
+text = registry.render()
+assert 'linebot_citation_lookups_total{result="hit"} 2' in text, "Failed: Counter value"
+assert 'linebot_citation_lookups_total{result="mi\\"ss"} 1' in text, "Failed: Label should be escaped"
+print("  ✅ PASSED\n")
+
+# Test 3: Component stats become gauges/counters; a failing collector does not break the scrape
+print("Test 3: Component stats")
+registry.add_stats("sessions", lambda: {
+    'active': 12, 'occupancy': 0.012, 'evicted': 3, 'backend': 'redis',
+    'compaction': {'compactions': 5}
+}, counters=('evicted', 'compaction_compactions'))
+registry.add_stats("broken", lambda: 1 / 0)
+text = registry.render()
+print("  " + "\n  ".join(line for line in text.splitlines() if "sessions" in line))
+assert "# TYPE linebot_sessions_active gauge\nlinebot_sessions_active 12" in text, "Failed: Gauge"
+assert "linebot_sessions_occupancy 0.012" in text, "Failed: Float gauge"
+assert "# TYPE linebot_sessions_evicted_total counter\nlinebot_sessions_evicted_total 3" in text, "Failed: Counter"
+assert "linebot_sessions_compaction_compactions_total 5" in text, "Failed: Nested stats"
+assert "backend" not in text, "Failed: Non-numeric values should be skipped"
+assert "# collector broken failed" in text and text.endswith("\n"), "Failed: Broken collector"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
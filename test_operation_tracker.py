@@ -0,0 +1,105 @@
+"""
+Test script for OperationTracker backoff polling and background watching.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from operation_tracker import OperationTracker
+
+
+class FakeGemini:
+    """Operation becomes done after done_after seconds; the first `failures` polls raise."""
+
+    def __init__(self, done_after: float, failures: int = 0):
+        self.done_after = done_after
+        self.failures = failures
+        self.started = time.monotonic()
+        self.calls = 0
+
+    async def get_operation(self, operation):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("503 UNAVAILABLE")
+        done = time.monotonic() - self.started >= self.done_after
+        return SimpleNamespace(name=operation.name, done=done, error=None)
+
+
+def pending_operation():
+    return SimpleNamespace(name="operations/test", done=False, error=None)
+
+
+print("Testing OperationTracker...\n")
+
+# Test 1: Delays grow between polls, so a slow operation needs few polls
+print("Test 1: Exponential backoff")
+gemini = FakeGemini(done_after=1.0)
+tracker = OperationTracker(gemini, initial_delay=0.05, max_delay=0.4, jitter=0)
+operation = asyncio.run(tracker.wait(pending_operation(), timeout=5))
+print(f"  done: {operation.done}, polls: {gemini.calls}")
+assert operation.done, "Failed: Operation should complete"
+assert gemini.calls <= 6, "Failed: Backoff should keep the poll count low"
+print("  ✅ PASSED\n")
+
+# Test 2: wait() returns the unfinished operation at the timeout
+print("Test 2: Timeout")
+gemini = FakeGemini(done_after=10)
+tracker = OperationTracker(gemini, initial_delay=0.05, max_delay=0.1)
+start = time.perf_counter()
+operation = asyncio.run(tracker.wait(pending_operation(), timeout=0.3))
+elapsed = time.perf_counter() - start
+print(f"  done: {operation.done}, elapsed: {elapsed:.2f}s")
+assert not operation.done and elapsed < 0.5, "Failed: Should stop polling at the timeout"
+print("  ✅ PASSED\n")
+
+# Test 3: Background watch calls back on completion and on deadline
+print("Test 3: Background watch")
+async def watch_both():
+    results = []
+
+    async def on_done(final):
+        results.append(final.done)
+
+    fast = OperationTracker(FakeGemini(done_after=0.2), initial_delay=0.05, max_delay=0.1)
+    slow = OperationTracker(FakeGemini(done_after=10), initial_delay=0.05, max_delay=0.1)
+    await asyncio.gather(
+        fast.watch(pending_operation(), on_done, timeout=2),
+        slow.watch(pending_operation(), on_done, timeout=0.3)
+    )
+    return results, fast.get_stats(), slow.get_stats()
+
+results, fast_stats, slow_stats = asyncio.run(watch_both())
+print(f"  results: {sorted(results)}, fast: {fast_stats}, slow: {slow_stats}")
+assert sorted(results) == [False, True], "Failed: Both outcomes should be reported"
+assert fast_stats['completed'] == 1 and slow_stats['timed_out'] == 1, "Failed: Outcomes should be counted"
+assert fast_stats['watching'] == 0, "Failed: Finished watches should be released"
+print("  ✅ PASSED\n")
+
+# Test 4: Transient poll errors are retried, in wait() and in background watches
+print("Test 4: Poll errors")
+gemini = FakeGemini(done_after=0.2, failures=2)
+tracker = OperationTracker(gemini, initial_delay=0.05, max_delay=0.1)
+operation = asyncio.run(tracker.wait(pending_operation(), timeout=2))
+print(f"  done: {operation.done}, stats: {tracker.get_stats()}")
+assert operation.done, "Failed: Poll errors should be retried until the operation completes"
+assert tracker.get_stats()['poll_errors'] == 2, "Failed: Poll errors should be counted"
+
+
+async def watch_with_errors():
+    results = []
+
+    async def on_done(final):
+        results.append(final.done)
+
+    tracker = OperationTracker(FakeGemini(done_after=0.2, failures=1), initial_delay=0.05, max_delay=0.1)
+    await tracker.watch(pending_operation(), on_done, timeout=2)
+    return results
+
+results = asyncio.run(watch_with_errors())
+assert results == [True], "Failed: A failed poll should not end the watch"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
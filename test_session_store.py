@@ -0,0 +1,70 @@
+"""
+Test script for the bounded LRU + TTL session store.
+"""
+
+import asyncio
+import time
+
+from session_store import SessionStore
+
+print("Testing session store...\n")
+
+# Test 1: LRU eviction at the entry cap
+print("Test 1: LRU eviction")
+removed = []
+store = SessionStore(max_entries=3, ttl_seconds=60, on_remove=lambda k, v, reason: removed.append((k, reason)))
+for user in ("a", "b", "c"):
+    store.set(user, {"chat": user})
+store.get("a")  # "b" is now the least recently used
+store.set("d", {"chat": "d"})
+print(f"  keys: {list(store.entries)}, removed: {removed}")
+assert "b" not in store and "a" in store and len(store) == 3, "Failed: Least recently used entry should be evicted"
+assert removed == [("b", "evicted")], "Failed: Eviction should be reported"
+print("  ✅ PASSED\n")
+
+# Test 2: Idle timeout is measured from the last access
+print("Test 2: TTL refresh on access")
+store = SessionStore(max_entries=10, ttl_seconds=0.2)
+store.set("active", 1)
+store.set("idle", 2)
+time.sleep(0.12)
+store.get("active")
+time.sleep(0.12)
+reaped = store.reap()
+print(f"  reaped: {reaped}, remaining: {list(store.entries)}")
+assert reaped == 1 and "active" in store and "idle" not in store, "Failed: Only the idle session should expire"
+assert store.get_stats()["heap_size"] == 1, "Failed: Active session should be re-queued once"
+print("  ✅ PASSED\n")
+
+# Test 3: Reaping touches only due sessions
+print("Test 3: Reap cost with many live sessions")
+store = SessionStore(max_entries=200_000, ttl_seconds=3600)
+for i in range(100_000):
+    store.set(f"user_{i}", i)
+start = time.perf_counter()
+for _ in range(1000):
+    store.reap()
+elapsed = time.perf_counter() - start
+print(f"  1000 reaps over 100k sessions: {elapsed * 1000:.1f}ms")
+assert elapsed < 0.1, "Failed: Reaping should not scan every session"
+print("  ✅ PASSED\n")
+
+# Test 4: Background reaper
+print("Test 4: Background reaper")
+async def run_reaper():
+    store = SessionStore(max_entries=10, ttl_seconds=0.1)
+    for user in ("a", "b"):
+        store.set(user, user)
+    store.start_reaper(interval=0.05)
+    await asyncio.sleep(0.3)
+    await store.stop_reaper()
+    return store.get_stats()
+
+stats = asyncio.run(run_reaper())
+print(f"  stats: {stats}")
+assert stats["active"] == 0 and stats["expired"] == 2 and stats["heap_size"] == 0, "Failed: Reaper should expire sessions"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
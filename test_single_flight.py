@@ -0,0 +1,69 @@
+"""
+Test script for request coalescing (single-flight).
+"""
+
+import asyncio
+
+from single_flight import SingleFlight
+
+print("Testing single-flight...\n")
+
+
+async def burst(flight, calls, keys, fail=False):
+    async def query(key):
+        calls.append(key)
+        await asyncio.sleep(0.1)
+        if fail:
+            raise RuntimeError("quota exceeded")
+        return f"answer for {key}"
+
+    return await asyncio.gather(
+        *(flight.do(key, lambda key=key: query(key)) for key in keys),
+        return_exceptions=True
+    )
+
+
+# Test 1: A burst of identical requests makes one call
+print("Test 1: Identical concurrent requests")
+flight = SingleFlight()
+calls = []
+key = ('query', 'group_G1', '請幫我整理「季報.pdf」的重點', 'gemini-2.5-flash')
+results = asyncio.run(burst(flight, calls, [key] * 20))
+print(f"  calls: {len(calls)}, stats: {flight.get_stats()}")
+assert len(calls) == 1 and len(set(results)) == 1, "Failed: 20 identical requests should share one call"
+assert flight.get_stats() == {'calls': 1, 'shared': 19, 'in_flight': 0}, "Failed: Counters"
+print("  ✅ PASSED\n")
+
+# Test 2: Different keys are not merged, and finished calls are not reused
+print("Test 2: Distinct keys")
+calls = []
+asyncio.run(burst(flight, calls, ['a', 'b', 'a']))
+asyncio.run(burst(flight, calls, ['a']))
+assert calls == ['a', 'b', 'a'], "Failed: Only concurrent identical keys should be merged"
+print("  ✅ PASSED\n")
+
+# Test 3: Errors reach every caller; a cancelled caller doesn't cancel the others
+print("Test 3: Errors and cancellation")
+calls = []
+results = asyncio.run(burst(SingleFlight(), calls, ['x'] * 3, fail=True))
+assert len(calls) == 1 and all(isinstance(r, RuntimeError) for r in results), "Failed: Error should be shared"
+
+async def cancel_one():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    first = asyncio.create_task(flight.do('k', slow))
+    second = asyncio.create_task(flight.do('k', slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    return await second
+
+assert asyncio.run(cancel_one()) == "done", "Failed: Remaining caller should still get the result"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,54 @@
+"""
+Test script for spooled download buffers.
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from spooled_content import SpooledContent
+
+print("Testing spooled content...\n")
+
+spill_dir = Path(tempfile.mkdtemp()) / "uploads"
+
+
+async def fill(content, chunks):
+    for chunk in chunks:
+        await content.write(chunk)
+    return await content.read_bytes()
+
+
+# Test 1: Small content never touches the disk
+print("Test 1: In memory")
+content = SpooledContent(spill_threshold=1024, spill_dir=spill_dir, suffix=".pdf")
+data = asyncio.run(fill(content, [b"%PDF-1.7 ", b"x" * 500]))
+assert data == b"%PDF-1.7 " + b"x" * 500 and content.in_memory, "Failed: Should stay in memory"
+assert content.open().read() == data, "Failed: Stream should start at the beginning"
+assert not spill_dir.exists(), "Failed: Nothing should be written to disk"
+content.close()
+print("  ✅ PASSED\n")
+
+# Test 2: Large content spills to a temporary file, removed on close
+print("Test 2: Spill to disk")
+with SpooledContent(spill_threshold=1024, spill_dir=spill_dir, suffix=".pdf") as content:
+    data = asyncio.run(fill(content, [b"a" * 700, b"b" * 700, b"c" * 700]))
+    path = content.path
+    print(f"  spilled to {path.name}, {content.size} bytes")
+    assert not content.in_memory and path.suffix == ".pdf", "Failed: Should spill"
+    assert data == b"a" * 700 + b"b" * 700 + b"c" * 700, "Failed: Content should be intact"
+assert not path.exists(), "Failed: Temporary file should be removed"
+print("  ✅ PASSED\n")
+
+# Test 3: to_path() materializes small content for LibreOffice
+print("Test 3: Materialize for conversion")
+with SpooledContent(spill_threshold=1024, spill_dir=spill_dir, suffix=".ppt") as content:
+    asyncio.run(fill(content, [b"legacy slides"]))
+    path = asyncio.run(content.to_path())
+    assert path.read_bytes() == b"legacy slides" and path.suffix == ".ppt", "Failed: File should hold the content"
+assert not path.exists(), "Failed: Temporary file should be removed"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,91 @@
+"""
+Test script for SQLite queries run off the event loop.
+"""
+
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from sqlite_db import SQLiteDatabase
+
+work_dir = Path(tempfile.mkdtemp())
+SCHEMA = ["CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, value TEXT NOT NULL)"]
+
+print("Testing SQLite database helper...\n")
+
+# Test 1: Reads, writes and batch writes
+print("Test 1: Queries")
+async def queries():
+    db = SQLiteDatabase(str(work_dir / "queries.db"), schema=SCHEMA)
+    await db.execute("INSERT INTO items (key, value) VALUES (?, ?)", ("a", "1"))
+    await db.executemany("INSERT INTO items (key, value) VALUES (?, ?)", [("b", "2"), ("c", "3")])
+    one = await db.fetchone("SELECT value FROM items WHERE key = ?", ("b",))
+    missing = await db.fetchone("SELECT value FROM items WHERE key = ?", ("zzz",))
+    rows = await db.fetchall("SELECT key FROM items ORDER BY key")
+    startup_rows = db.fetchall_now("SELECT COUNT(*) FROM items")
+    await db.close()
+    return one, missing, rows, startup_rows
+
+one, missing, rows, startup_rows = asyncio.run(queries())
+assert one == ("2",) and missing is None, "Failed: fetchone"
+assert rows == [("a",), ("b",), ("c",)], "Failed: fetchall"
+assert startup_rows == [(3,)], "Failed: fetchall_now"
+print("  ✅ PASSED\n")
+
+# Test 2: A failed write is rolled back and the connection stays usable
+print("Test 2: Rollback")
+async def failed_write():
+    db = SQLiteDatabase(str(work_dir / "rollback.db"), schema=SCHEMA)
+    try:
+        await db.executemany("INSERT INTO items (key, value) VALUES (?, ?)", [("a", "1"), ("a", "duplicate")])
+    except sqlite3.IntegrityError:
+        pass
+    else:
+        raise AssertionError("Failed: Duplicate key should raise")
+    await db.execute("INSERT INTO items (key, value) VALUES (?, ?)", ("b", "2"))
+    rows = await db.fetchall("SELECT key FROM items")
+    await db.close()
+    return rows
+
+assert asyncio.run(failed_write()) == [("b",)], "Failed: Batch should be rolled back as a whole"
+print("  ✅ PASSED\n")
+
+# Test 3: Waiting on another worker's write lock does not block the event loop
+print("Test 3: Lock wait off the event loop")
+async def lock_wait():
+    db_path = str(work_dir / "locked.db")
+    db = SQLiteDatabase(db_path, schema=SCHEMA)
+    # Another worker process holding the write lock for 0.3s
+    other_worker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    other_worker.execute("BEGIN IMMEDIATE")
+    asyncio.get_running_loop().call_later(0.3, other_worker.execute, "COMMIT")
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await db.execute("INSERT INTO items (key, value) VALUES (?, ?)", ("a", "1"))
+    elapsed = time.perf_counter() - start
+    ticker_task.cancel()
+    row = await db.fetchone("SELECT value FROM items WHERE key = ?", ("a",))
+    await db.close()
+    other_worker.close()
+    return elapsed, ticks, row
+
+elapsed, ticks, row = asyncio.run(lock_wait())
+print(f"  write waited {elapsed:.2f}s for the lock, event loop ticked {ticks} times meanwhile")
+assert row == ("1",), "Failed: Write should complete once the lock is released"
+assert ticks >= 10, "Failed: Event loop should keep running while the write waits"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,95 @@
+"""
+Test script for the persistent store registry.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from store_registry import StoreRegistry
+
+
+class MockStore:
+    def __init__(self, name, display_name):
+        self.name = name
+        self.display_name = display_name
+
+
+class MockGemini:
+    """Stands in for AsyncGeminiClient and counts API calls."""
+
+    def __init__(self, stores):
+        self.stores = [MockStore(name, display_name) for display_name, name in stores.items()]
+        self.list_calls = 0
+        self.create_calls = 0
+
+    async def list_stores(self):
+        self.list_calls += 1
+        await asyncio.sleep(0.05)
+        return list(self.stores)
+
+    async def create_store(self, display_name):
+        self.create_calls += 1
+        await asyncio.sleep(0.05)
+        store = MockStore(f"fileSearchStores/new-{display_name}", display_name)
+        self.stores.append(store)
+        return store.name
+
+
+print("Testing store registry...\n")
+db_path = os.path.join(tempfile.mkdtemp(), "registry.db")
+existing = {f"user_U{i}": f"fileSearchStores/s{i}" for i in range(200)}
+
+# Test 1: Concurrent misses share one bulk listing
+print("Test 1: Single-flight bulk load")
+gemini = MockGemini(existing)
+registry = StoreRegistry(gemini, db_path=db_path)
+
+async def resolve_many():
+    return await asyncio.gather(*(registry.resolve(f"user_U{i}") for i in range(50)))
+
+names = asyncio.run(resolve_many())
+print(f"  list calls: {gemini.list_calls} (Expected: 1)")
+assert names == [f"fileSearchStores/s{i}" for i in range(50)], "Failed: Wrong store names"
+assert gemini.list_calls == 1, "Failed: Concurrent misses should share one listing"
+print("  ✅ PASSED\n")
+
+# Test 2: Unknown names don't trigger a listing per user
+print("Test 2: Rate-limited misses")
+async def resolve_unknown():
+    return [await registry.resolve(f"group_G{i}") for i in range(20)]
+
+results = asyncio.run(resolve_unknown())
+print(f"  list calls: {gemini.list_calls} (Expected: 1)")
+assert results == [None] * 20, "Failed: Unknown stores should resolve to None"
+assert gemini.list_calls == 1, "Failed: Misses within refresh_interval should not list again"
+print("  ✅ PASSED\n")
+
+# Test 3: Concurrent ensure() creates one store
+print("Test 3: Single-flight store creation")
+async def ensure_many():
+    return await asyncio.gather(*(registry.ensure("group_new") for _ in range(10)))
+
+created = asyncio.run(ensure_many())
+print(f"  create calls: {gemini.create_calls} (Expected: 1)")
+assert set(created) == {"fileSearchStores/new-group_new"}, "Failed: All callers should get the same store"
+assert gemini.create_calls == 1, "Failed: Only one store should be created"
+asyncio.run(registry.close())
+print("  ✅ PASSED\n")
+
+# Test 4: Index survives a restart
+print("Test 4: Persistence across restarts")
+gemini_after_restart = MockGemini({})
+registry = StoreRegistry(gemini_after_restart, db_path=db_path)
+name = asyncio.run(registry.resolve("group_new"))
+print(f"  resolved: {name}, list calls: {gemini_after_restart.list_calls} (Expected: 0)")
+assert name == "fileSearchStores/new-group_new", "Failed: Mapping should be loaded from SQLite"
+assert gemini_after_restart.list_calls == 0, "Failed: Restart should not require a listing"
+asyncio.run(registry.forget("group_new"))
+assert asyncio.run(registry.resolve("group_new")) is None, "Failed: forget() should drop the mapping"
+asyncio.run(registry.close())
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,92 @@
+"""
+Test script for incremental delivery of streamed answers.
+"""
+
+import asyncio
+import time
+
+from streaming_reply import StreamingReply, find_cut
+
+
+def run_stream(chunks, delay, **kwargs):
+    """Feed chunks with a delay between them; return (sent segments with timestamps)."""
+    sent = []
+
+    async def send(text, is_first, is_last):
+        sent.append((time.perf_counter() - start, text, is_first, is_last))
+
+    async def produce():
+        stream = StreamingReply(send, **kwargs)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            await stream.feed(chunk)
+        await stream.finish()
+
+    start = time.perf_counter()
+    asyncio.run(produce())
+    return sent
+
+
+print("Testing streaming reply...\n")
+
+# Test 1: First sentence goes out long before generation ends
+print("Test 1: Early first segment")
+answer = "這份報告的重點有三項，以下逐一說明。" + "".join(
+    f"第{i}點：營收較去年同期成長，主要來自海外市場與新產品線的貢獻。\n" for i in range(1, 40)
+)
+chunks = [answer[i:i + 20] for i in range(0, len(answer), 20)]
+sent = run_stream(chunks, delay=0.02, first_chunk_seconds=1.5, min_first_chars=10, segment_chars=500)
+total = sent[-1][0]
+print(f"  first segment at {sent[0][0]:.2f}s of {total:.2f}s: {sent[0][1]!r}")
+print(f"  segments: {[len(text) for _, text, _, _ in sent]}")
+assert sent[0][0] < 0.2 and sent[0][1] == "這份報告的重點有三項，以下逐一說明。", "Failed: First sentence should be sent at once"
+assert sent[0][2] and not any(first for _, _, first, _ in sent[1:]), "Failed: Only the first segment uses the reply token"
+assert sent[-1][3] and not any(last for _, _, _, last in sent[:-1]), "Failed: Only the final segment is last"
+assert "".join(text for _, text, _, _ in sent) == answer, "Failed: Segments should add up to the answer"
+assert all(len(text) <= 500 for _, text, _, _ in sent), "Failed: Segments should respect the size limit"
+assert all(text.endswith(("\n", "。")) for _, text, _, _ in sent[:-1]), "Failed: Segments should end at boundaries"
+print("  ✅ PASSED\n")
+
+# Test 2: No sentence boundary yet - send what we have after first_chunk_seconds
+print("Test 2: First segment deadline")
+sent = run_stream(["一段很長而且還沒有結束的句子"] * 12, delay=0.05, first_chunk_seconds=0.3, min_first_chars=10)
+print(f"  first segment at {sent[0][0]:.2f}s")
+assert 0.3 <= sent[0][0] < 0.45, "Failed: First segment should be sent at the deadline"
+print("  ✅ PASSED\n")
+
+# Test 3: Short answer is a single reply
+print("Test 3: Short answer")
+sent = run_stream(["好的", "，沒問題。"], delay=0, min_first_chars=40)
+assert [(text, first, last) for _, text, first, last in sent] == [("好的，沒問題。", True, True)], "Failed: Should be one reply"
+assert find_cut("abc", 10) == 3 and find_cut("一二三。四五", 10) == 4, "Failed: find_cut"
+print("  ✅ PASSED\n")
+
+# Test 4: A failed push stops the delivery without breaking the stream
+print("Test 4: Failed push")
+
+
+async def run_failing_push():
+    attempts = []
+
+    async def send(text, is_first, is_last):
+        attempts.append((text, is_first))
+        if not is_first:
+            raise RuntimeError("429 Too Many Requests")
+
+    stream = StreamingReply(send, min_first_chars=5, segment_chars=20)
+    for chunk in ["第一句話已經完整。", "後面還有很長的內容，" * 3, "以及最後一段。"]:
+        await stream.feed(chunk)
+    await stream.finish()
+    return stream, attempts
+
+stream, attempts = asyncio.run(run_failing_push())
+print(f"  attempts: {[(text, first) for text, first in attempts]}, error: {stream.error}")
+assert stream.stopped and "429" in str(stream.error), "Failed: Error should be recorded"
+assert len(attempts) == 2 and attempts[0] == ("第一句話已經完整。", True), "Failed: Nothing should be sent after a failed push"
+assert stream.delivered_chars == len("第一句話已經完整。"), "Failed: Only the reply was delivered"
+assert stream.text.endswith("以及最後一段。"), "Failed: Text should keep accumulating"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,102 @@
+"""
+Test script for tracing spans (built-in console exporter).
+"""
+
+import asyncio
+import logging
+
+from tracing import NoopSpan, Tracer
+
+print("Testing tracing...\n")
+
+# Capture exported spans from the tracing logger
+records = []
+
+
+class ListHandler(logging.Handler):
+    def emit(self, record):
+        records.append(record)
+
+
+tracing_logger = logging.getLogger("tracing")
+tracing_logger.addHandler(ListHandler())
+tracing_logger.setLevel(logging.INFO)
+tracing_logger.propagate = False
+
+tracer = Tracer("console")
+
+# Test 1: Nested spans share the trace and point at their parent
+print("Test 1: Nested spans")
+
+
+async def handle_event():
+    with tracer.span("line.event", **{'linebot.store': 'user_abc'}):
+        with tracer.span("documents.list", **{'linebot.store': 'user_abc', 'unset': None}) as span:
+            span.set_attribute('linebot.documents.count', 3)
+
+
+asyncio.run(handle_event())
+child, root = records
+assert root.span == "line.event" and root.parent_span_id is None, "Failed: Root span should have no parent"
+assert child.parent_span_id == root.span_id, "Failed: Child should point at the root span"
+assert child.trace_id == root.trace_id, "Failed: Spans should share the trace ID"
+assert child.attributes == {'linebot.store': 'user_abc', 'linebot.documents.count': 3}, "Failed: Attributes"
+assert child.status == 'OK' and child.duration_ms >= 0
+print("  ✅ PASSED\n")
+
+# Test 2: Concurrent tasks get separate traces
+print("Test 2: Concurrent tasks")
+records.clear()
+
+
+async def handle_two_events():
+    await asyncio.gather(handle_event(), handle_event())
+
+
+asyncio.run(handle_two_events())
+roots = [record for record in records if record.span == "line.event"]
+assert len(roots) == 2 and roots[0].trace_id != roots[1].trace_id, "Failed: Each task should start its own trace"
+for record in records:
+    if record.span == "documents.list":
+        assert record.trace_id in {root.trace_id for root in roots}
+print("  ✅ PASSED\n")
+
+# Test 3: Exceptions mark the span as failed and propagate
+print("Test 3: Errors")
+records.clear()
+try:
+    with tracer.span("gemini.generate_content"):
+        raise RuntimeError("quota exceeded")
+except RuntimeError:
+    pass
+else:
+    raise AssertionError("Failed: Exception should propagate")
+assert records[0].status == 'ERROR' and records[0].error == "RuntimeError: quota exceeded", "Failed: Error status"
+print("  ✅ PASSED\n")
+
+# Test 4: record() adds a finished call under the current span
+print("Test 4: Recorded calls")
+records.clear()
+with tracer.span("line.event") as root_span:
+    tracer.record("http line_reply", 0.25, **{'http.response.status_code': 200})
+    tracer.record("http line_push", 0.1, error="HTTP 429")
+reply, push, root = records
+assert reply.parent_span_id == root.span_id, "Failed: Recorded span should nest under the current span"
+assert reply.duration_ms == 250.0 and reply.status == 'OK'
+assert push.status == 'ERROR' and push.error == "HTTP 429"
+print("  ✅ PASSED\n")
+
+# Test 5: Disabled tracer exports nothing
+print("Test 5: Disabled")
+records.clear()
+disabled = Tracer("none")
+with disabled.span("line.event", **{'linebot.store': 'user_abc'}) as span:
+    span.set_attribute('linebot.documents.count', 1)
+    disabled.record("http line_reply", 0.1)
+assert isinstance(span, NoopSpan) and not disabled.enabled, "Failed: Should be a no-op span"
+assert records == [], "Failed: Nothing should be exported"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,118 @@
+"""
+Test script for skipping re-uploads of identical files.
+
+Checks the content-hash index (hit, miss, pruning against a fresh document
+list), that deleting a document through main.delete_document forgets it, and
+that an entry missing from a stale cached list is checked against a fresh one.
+"""
+
+import asyncio
+import os
+import tempfile
+import warnings
+from pathlib import Path
+
+from upload_index import UploadIndex
+
+work_dir = Path(tempfile.mkdtemp())
+DOC_A = "fileSearchStores/s1/documents/a"
+DOC_B = "fileSearchStores/s1/documents/b"
+
+print("Testing upload index...\n")
+
+# Test 1: Hits are per (content hash, store)
+print("Test 1: Hit and miss")
+index = UploadIndex(db_path=str(work_dir / "index.db"))
+asyncio.run(index.record("hash-a", "user_a", DOC_A, "report.pdf"))
+assert asyncio.run(index.lookup("hash-a", "user_a")) == {'document_name': DOC_A, 'display_name': "report.pdf"}, "Failed: Hit"
+assert asyncio.run(index.lookup("hash-a", "group_b")) is None, "Failed: Same file in another store should miss"
+assert asyncio.run(index.lookup("hash-other", "user_a")) is None, "Failed: Different content should miss"
+print("  ✅ PASSED\n")
+
+# Test 2: Entries are checked against a fresh document list when one is cached
+print("Test 2: Pruning against the document list")
+asyncio.run(index.record("hash-b", "user_a", DOC_B, "notes.txt"))
+assert asyncio.run(index.find("hash-a", "user_a", None))['document_name'] == DOC_A, "Failed: Unknown list should trust the entry"
+assert asyncio.run(index.find("hash-a", "user_a", [{'name': DOC_A}]))['document_name'] == DOC_A, "Failed: Listed document"
+assert asyncio.run(index.find("hash-b", "user_a", [{'name': DOC_A}])) is None, "Failed: Missing document should not be reused"
+assert asyncio.run(index.lookup("hash-b", "user_a")) is None, "Failed: Missing document should be pruned"
+print("  ✅ PASSED\n")
+
+# Test 3: Entries survive a restart and are dropped when their document is deleted
+print("Test 3: Persistence and forget_document")
+asyncio.run(index.record("hash-a", "group_b", DOC_A, "report.pdf"))
+asyncio.run(index.close())
+index = UploadIndex(db_path=str(work_dir / "index.db"))
+assert asyncio.run(index.lookup("hash-a", "user_a")) is not None, "Failed: Entries should persist"
+asyncio.run(index.forget_document(DOC_A))
+assert asyncio.run(index.lookup("hash-a", "user_a")) is None and asyncio.run(index.lookup("hash-a", "group_b")) is None, \
+    "Failed: forget_document should drop every entry of the document"
+asyncio.run(index.close())
+print("  ✅ PASSED\n")
+
+# Test 4: Deleting a document from the carousel forgets its upload
+print("Test 4: main.delete_document forgets the upload")
+os.environ.update({
+    'ChannelSecret': os.environ.get('ChannelSecret', 'test-secret'),
+    'ChannelAccessToken': os.environ.get('ChannelAccessToken', 'test-token'),
+    'GOOGLE_API_KEY': os.environ.get('GOOGLE_API_KEY', 'test-key'),
+    'STORE_REGISTRY_DB': str(work_dir / "registry.db"),
+    'CONVERSION_CACHE_DIR': str(work_dir / "conversion_cache"),
+    'UPLOAD_DIR': str(work_dir / "uploads"),
+    'SESSION_BACKEND': 'memory',
+    'LOG_LEVEL': 'WARNING',
+})
+with warnings.catch_warnings():
+    # Deprecated SDK classes and FastAPI on_event used by main
+    warnings.simplefilter("ignore", DeprecationWarning)
+    import main  # noqa: E402
+
+deleted = []
+
+
+async def fake_delete_document(document_name):
+    deleted.append(document_name)
+
+main.gemini.delete_document = fake_delete_document
+asyncio.run(main.upload_index.record("hash-a", "user_a", DOC_A, "report.pdf"))
+main.document_cache.set("user_a", [{'name': DOC_A, 'display_name': "report.pdf"}])
+assert asyncio.run(main.find_existing_upload("hash-a", "user_a")) is not None, "Failed: Should be found before the delete"
+assert asyncio.run(main.delete_document(DOC_A)) is True, "Failed: Delete should succeed"
+assert deleted == [DOC_A], "Failed: Should call the Gemini delete"
+assert asyncio.run(main.upload_index.lookup("hash-a", "user_a")) is None, "Failed: Delete should forget the upload"
+assert main.document_cache.get("user_a") == [], "Failed: Delete should update the cached document list"
+assert asyncio.run(main.find_existing_upload("hash-a", "user_a")) is None, "Failed: Same file should be uploaded again"
+print("  ✅ PASSED\n")
+
+# Test 5: A stale cached list is not enough to drop an entry
+print("Test 5: Verification against a fresh listing")
+DOC_C = "fileSearchStores/s1/documents/c"
+server_documents = [{'name': DOC_A}, {'name': DOC_C}]
+listings = []
+
+
+async def fake_iter_documents(store_name, page_size=None):
+    listings.append(store_name)
+    for doc in list(server_documents):
+        yield doc
+
+main.document_lister.iter_documents = fake_iter_documents
+# Uploaded through another worker after this worker cached the store's list
+asyncio.run(main.upload_index.record("hash-c", "user_a", DOC_C, "slides.pdf"))
+main.document_cache.set("user_a", [{'name': DOC_A}])
+assert asyncio.run(main.find_existing_upload("hash-c", "user_a")) is not None, "Failed: Fresh listing has the document"
+assert asyncio.run(main.upload_index.lookup("hash-c", "user_a")) is not None, "Failed: Entry should be kept"
+assert listings == ["user_a"], "Failed: Missing document should be checked with one fresh listing"
+assert asyncio.run(main.find_existing_upload("hash-c", "user_a")) is not None, "Failed: Refreshed list is cached"
+assert listings == ["user_a"], "Failed: Refreshed cache should answer the second lookup"
+
+# Deleted outside the bot: the fresh listing confirms it is gone
+server_documents.remove({'name': DOC_C})
+main.document_cache.set("user_a", [{'name': DOC_A}])
+assert asyncio.run(main.find_existing_upload("hash-c", "user_a")) is None, "Failed: Deleted document should not be reused"
+assert asyncio.run(main.upload_index.lookup("hash-c", "user_a")) is None, "Failed: Confirmed missing entry is dropped"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
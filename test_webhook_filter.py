@@ -0,0 +1,152 @@
+"""
+Test script for webhook decoding and the pre-filter, with a benchmark against
+full SDK parsing.
+
+The payloads follow the LINE webhook format: a busy group where most text
+messages do not mention the bot, plus occasional mentions, files and postbacks.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import warnings
+
+from linebot import WebhookParser
+from linebot.deprecations import LineBotSdkDeprecationWarning
+from linebot.models import MessageEvent, PostbackEvent
+
+from webhook_decoder import WebhookDecoder
+from webhook_filter import WebhookFilter
+
+BOT_ID = "Ubot0000000000000000000000000000"
+SECRET = "channel-secret"
+
+# The v2 models the bot uses warn on every object built
+warnings.filterwarnings("ignore", category=LineBotSdkDeprecationWarning)
+
+print("Testing webhook filter...\n")
+
+
+def text_event(i, source_type="group", mention_bot=False):
+    message = {"id": str(i), "type": "text", "quoteToken": "q", "text": f"訊息 {i}：今天的會議改到下午三點"}
+    if mention_bot:
+        message["text"] = "@Bot 幫我整理重點"
+        message["mention"] = {"mentionees": [{"index": 0, "length": 4, "userId": BOT_ID, "type": "user"}]}
+    elif i % 3 == 0:
+        message["mention"] = {"mentionees": [{"index": 0, "length": 5, "userId": "Uother", "type": "user"}]}
+    source = {"type": source_type, "userId": f"U{i % 7}"}
+    if source_type == "group":
+        source["groupId"] = "Cgroup"
+    return {
+        "type": "message", "mode": "active", "timestamp": 1700000000000 + i,
+        "source": source, "webhookEventId": f"E{i}", "replyToken": f"r{i}",
+        "deliveryContext": {"isRedelivery": False}, "message": message
+    }
+
+
+def other_event(kind, i):
+    event = text_event(i)
+    if kind == "file":
+        event["message"] = {"id": str(i), "type": "file", "fileName": "季報.pdf", "fileSize": 1024}
+    elif kind == "sticker":
+        event["message"] = {"id": str(i), "type": "sticker", "packageId": "1", "stickerId": "1", "stickerResourceType": "STATIC"}
+    elif kind == "postback":
+        del event["message"]
+        event["type"] = "postback"
+        event["postback"] = {"data": "action=list_files&page=2"}
+    elif kind == "join":
+        del event["message"]
+        event["type"] = "join"
+    return event
+
+
+# Test 1: Which events pass
+print("Test 1: Relevance")
+webhook_filter = WebhookFilter()
+payload = {"destination": BOT_ID, "events": [
+    text_event(1),                       # group chatter -> dropped
+    text_event(3),                       # mentions someone else -> dropped
+    text_event(4, mention_bot=True),     # mentions the bot
+    text_event(5, source_type="user"),   # 1-on-1
+    other_event("file", 6),
+    other_event("postback", 7),
+    other_event("sticker", 8),           # no handler -> dropped
+    other_event("join", 9),              # no handler -> dropped
+]}
+kept = webhook_filter.filter(payload)
+assert [event["webhookEventId"] for event in kept] == ["E4", "E5", "E6", "E7"], "Failed: Wrong events kept"
+events = [webhook_filter.build_event(event) for event in kept]
+assert isinstance(events[0], MessageEvent) and events[0].message.mention.mentionees[0].user_id == BOT_ID
+assert isinstance(events[3], PostbackEvent), "Failed: Postback should be built as PostbackEvent"
+assert webhook_filter.get_stats() == {"events": 8, "dropped": 4}, "Failed: Counters"
+print("  ✅ PASSED\n")
+
+# Test 2: Signature is checked on the raw bytes, as the SDK does on text
+print("Test 2: Signature and decoding")
+decoder = WebhookDecoder(SECRET)
+body = json.dumps(payload, ensure_ascii=False).encode()
+signature = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+parser = WebhookParser(SECRET)
+assert decoder.verify(body, signature) and parser.signature_validator.validate(body.decode(), signature)
+assert not decoder.verify(body + b" ", signature), "Failed: Modified body should be rejected"
+assert not decoder.verify(body, "not base64!"), "Failed: Malformed signature should be rejected"
+assert decoder.decode(body) == payload, "Failed: Decoded payload should match"
+try:
+    decoder.decode(b"[1, 2]")
+    assert False, "Failed: Non-object body should raise"
+except ValueError:
+    pass
+print("  ✅ PASSED\n")
+
+# Test 3: Benchmark against full SDK parsing of recorded group traffic
+print("Test 3: Benchmark")
+bodies = []
+for n in range(200):
+    events = [text_event(n * 10 + k) for k in range(9)]
+    events.append(text_event(n * 10 + 9, mention_bot=(n % 5 == 0)))
+    if n % 20 == 0:
+        events.append(other_event("file", n))
+    bodies.append(json.dumps({"destination": BOT_ID, "events": events}, ensure_ascii=False).encode())
+signatures = [
+    base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    for body in bodies
+]
+
+
+def full_parse():
+    # What handle_callback used to do: decode, json.loads for destination, then parse again
+    handled = 0
+    for body, signature in zip(bodies, signatures):
+        text = body.decode()
+        json.loads(text).get("destination")
+        for event in parser.parse(text, signature):
+            handled += isinstance(event, (MessageEvent, PostbackEvent))
+    return handled
+
+
+def pre_filtered():
+    handled = 0
+    for body, signature in zip(bodies, signatures):
+        assert decoder.verify(body, signature)
+        for event in webhook_filter.filter(decoder.decode(body)):
+            handled += isinstance(webhook_filter.build_event(event), (MessageEvent, PostbackEvent))
+    return handled
+
+
+results = {}
+for name, run in (("full SDK parse", full_parse), ("decode + pre-filter", pre_filtered)):
+    start = time.perf_counter()
+    for _ in range(3):
+        count = run()
+    results[name] = (time.perf_counter() - start) / 3
+    print(f"  {name}: {results[name] * 1000:.1f} ms for {len(bodies)} webhooks ({count} events built/handled)")
+speedup = results["full SDK parse"] / results["decode + pre-filter"]
+print(f"  speedup: {speedup:.1f}x")
+assert speedup > 2, "Failed: Pre-filter should be much cheaper than parsing every event"
+print("  ✅ PASSED\n")
+
+print("=" * 50)
+print("All tests passed! ✅")
+print("=" * 50)
@@ -0,0 +1,171 @@
+"""
+Tracing spans for the webhook -> Gemini -> LINE path.
+
+Spans use the OpenTelemetry API when it is installed, so whatever SDK and
+exporter the deployment configures (e.g. OTLP to a local collector) receives
+them. Without OpenTelemetry, a built-in console exporter writes finished spans
+through the logging setup (one JSON line per span).
+"""
+
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # Optional: console spans still work without it
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# Span of the current task, for the built-in console exporter
+_current_span: contextvars.ContextVar[Optional["ConsoleSpan"]] = contextvars.ContextVar('current_span', default=None)
+
+
+def _clean(attributes: dict) -> dict:
+    # OpenTelemetry only accepts str/bool/int/float (or sequences of them); None is dropped
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+class NoopSpan:
+    """Span used when tracing is disabled."""
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, attributes: dict):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+class ConsoleSpan:
+    """Span of the built-in console exporter."""
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["ConsoleSpan"]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = _clean(attributes)
+        self.status = 'OK'
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict):
+        self.attributes.update(_clean(attributes))
+
+    def is_recording(self) -> bool:
+        return True
+
+    def export(self, duration: float):
+        logger.info(
+            "span %s %.1f ms", self.name, duration * 1000,
+            extra={
+                'span': self.name,
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_span_id': self.parent_id,
+                'duration_ms': round(duration * 1000, 3),
+                'status': self.status,
+                'error': self.error,
+                'attributes': self.attributes,
+            }
+        )
+
+
+class Tracer:
+    """
+    Creates spans around outbound calls.
+
+    Features:
+    - "otel": OpenTelemetry API spans (exported by the configured SDK)
+    - "console": built-in spans logged as JSON, nested per asyncio task
+    - "none": no-op spans with no per-call cost beyond a function call
+    - Exceptions mark the span as failed and are re-raised
+    - record() adds an already finished call (e.g. from an HTTP client hook)
+    """
+
+    def __init__(self, exporter: str = "none", service_name: str = "linebot-gemini"):
+        """
+        Initialize Tracer.
+
+        Args:
+            exporter: "otel", "console" or "none"; "otel" falls back to
+                      "console" when OpenTelemetry is not installed
+            service_name: Instrumentation name reported with OpenTelemetry spans
+        """
+        exporter = exporter.lower()
+        if exporter == "otel" and otel_trace is None:
+            logger.warning("opentelemetry-api is not installed, writing spans to the console instead")
+            exporter = "console"
+        self.exporter = exporter
+        self.otel_tracer = otel_trace.get_tracer(service_name) if exporter == "otel" else None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        return self.exporter in ("otel", "console")
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator:
+        """
+        Trace a block as a span (child of the current span, if any).
+
+        Args:
+            name: Span name (e.g. "gemini.generate_content")
+            **attributes: Initial span attributes (None values are skipped)
+
+        Yields:
+            Span with set_attribute()/set_attributes()
+        """
+        if self.otel_tracer is not None:
+            with self.otel_tracer.start_as_current_span(name, attributes=_clean(attributes)) as span:
+                yield span
+            return
+        if self.exporter != "console":
+            yield NoopSpan()
+            return
+
+        span = ConsoleSpan(name, attributes, _current_span.get())
+        token = _current_span.set(span)
+        started = time.monotonic()
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = 'ERROR', f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.export(time.monotonic() - started)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None, **attributes):
+        """
+        Add a span for a call that already finished, ending now.
+
+        Args:
+            name: Span name
+            seconds: Duration of the call
+            error: Error description if the call failed
+            **attributes: Span attributes
+        """
+        if self.otel_tracer is not None:
+            end_ns = time.time_ns()
+            span = self.otel_tracer.start_span(
+                name, attributes=_clean(attributes), start_time=end_ns - int(seconds * 1e9)
+            )
+            if error:
+                span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, error))
+            span.end(end_time=end_ns)
+        elif self.exporter == "console":
+            span = ConsoleSpan(name, attributes, _current_span.get())
+            if error:
+                span.status, span.error = 'ERROR', error
+            span.export(seconds)
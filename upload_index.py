@@ -0,0 +1,114 @@
+"""
+Content-addressed upload index.
+
+Maps the SHA-256 of an uploaded file to the document it produced in each store,
+so sending the same file to the same chat again is answered immediately instead
+of being uploaded and indexed a second time.
+"""
+
+import logging
+import time
+from typing import List, Optional
+
+from sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class UploadIndex:
+    """
+    SQLite-backed (content hash, store) -> document mapping.
+
+    Features:
+    - Lookup by SHA-256 of the original downloaded bytes
+    - Persists across restarts (can share the store registry's database file)
+    - Queries run off the event loop
+    - Entries are removed when their document is deleted
+    """
+
+    def __init__(self, db_path: str = "store_registry.db"):
+        """
+        Initialize UploadIndex.
+
+        Args:
+            db_path: SQLite file holding the index
+        """
+        self.db = SQLiteDatabase(db_path, schema=[
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "content_hash TEXT NOT NULL, store_name TEXT NOT NULL, "
+            "document_name TEXT NOT NULL, display_name TEXT, created_at REAL NOT NULL, "
+            "PRIMARY KEY (content_hash, store_name))",
+            "CREATE INDEX IF NOT EXISTS uploads_document ON uploads (document_name)"
+        ])
+
+    async def lookup(self, content_hash: str, store_name: str) -> Optional[dict]:
+        """
+        Find an earlier upload of the same content to a store.
+
+        Args:
+            content_hash: SHA-256 hex digest of the file
+            store_name: Store display name (e.g. "group_xxx")
+
+        Returns:
+            Dict with 'document_name' and 'display_name', or None
+        """
+        row = await self.db.fetchone(
+            "SELECT document_name, display_name FROM uploads WHERE content_hash = ? AND store_name = ?",
+            (content_hash, store_name)
+        )
+        if row is None:
+            return None
+        return {'document_name': row[0], 'display_name': row[1]}
+
+    async def find(self, content_hash: str, store_name: str, documents: Optional[List[dict]] = None) -> Optional[dict]:
+        """
+        Find an earlier upload, checked against the store's current documents.
+        An entry whose document is missing from the list is dropped.
+
+        Args:
+            content_hash: SHA-256 hex digest of the file
+            store_name: Store display name
+            documents: Document list of the store fetched just now, or None if
+                       unknown (the entry is then trusted). Never pass a cached
+                       list: it may predate an upload made by another worker
+
+        Returns:
+            Dict with 'document_name' and 'display_name', or None
+        """
+        existing = await self.lookup(content_hash, store_name)
+        if existing is None or documents is None:
+            return existing
+        if not any(doc['name'] == existing['document_name'] for doc in documents):
+            logger.info("Indexed document no longer exists: %s", existing['document_name'])
+            await self.forget_document(existing['document_name'])
+            return None
+        return existing
+
+    async def record(self, content_hash: str, store_name: str, document_name: str, display_name: Optional[str] = None):
+        """
+        Remember that content was indexed as a document in a store.
+
+        Args:
+            content_hash: SHA-256 hex digest of the file
+            store_name: Store display name
+            document_name: Full document name (fileSearchStores/.../documents/...)
+            display_name: File name shown to users
+        """
+        await self.db.execute(
+            "INSERT OR REPLACE INTO uploads "
+            "(content_hash, store_name, document_name, display_name, created_at) VALUES (?, ?, ?, ?, ?)",
+            (content_hash, store_name, document_name, display_name, time.time())
+        )
+
+    async def forget_document(self, document_name: str):
+        """
+        Drop entries pointing at a deleted document.
+
+        Args:
+            document_name: Full document name
+        """
+        await self.db.execute("DELETE FROM uploads WHERE document_name = ?", (document_name,))
+
+    async def close(self):
+        """Close the SQLite connection."""
+        await self.db.close()
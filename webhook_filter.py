@@ -0,0 +1,111 @@
+"""
+Webhook pre-filter.
+
+In a busy group most text messages do not mention the bot and are ignored.
+The filter looks at the decoded webhook JSON and drops those events (and
+event types the bot does not handle) before any SDK model objects are built.
+"""
+
+from typing import List
+
+from linebot.models import MessageEvent, PostbackEvent
+
+# Event types the bot handles -> SDK class used to build them
+HANDLED_EVENT_TYPES = {
+    'message': MessageEvent,
+    'postback': PostbackEvent,
+}
+
+# Message types the bot handles (stickers, video, audio, location are ignored)
+HANDLED_MESSAGE_TYPES = {'text', 'file', 'image'}
+
+
+def mentions_user(message: dict, user_id: str) -> bool:
+    """
+    Whether a raw message mentions a user.
+
+    Args:
+        message: "message" object of a webhook event
+        user_id: User ID to look for (the bot's ID is the webhook "destination")
+    """
+    mentionees = (message.get('mention') or {}).get('mentionees') or []
+    return any(mentionee.get('userId') == user_id for mentionee in mentionees)
+
+
+class WebhookFilter:
+    """
+    Drops webhook events the bot would ignore, working on raw JSON.
+
+    Features:
+    - Unmentioned text messages in groups/rooms are dropped
+    - Event and message types without a handler (follow, sticker, ...) are dropped
+    - Files, images and postbacks always pass
+    - Counters for received and dropped events
+    """
+
+    def __init__(self):
+        """Initialize WebhookFilter."""
+        self.metrics = {
+            'events': 0,
+            'dropped': 0,
+        }
+
+    def is_relevant(self, event: dict, destination: str) -> bool:
+        """
+        Whether a raw event needs handling.
+
+        Args:
+            event: Event object from the webhook body
+            destination: Bot's user ID (webhook "destination")
+        """
+        event_type = event.get('type')
+        if event_type not in HANDLED_EVENT_TYPES:
+            return False
+        if event_type != 'message':
+            return True
+        message = event.get('message') or {}
+        message_type = message.get('type')
+        if message_type not in HANDLED_MESSAGE_TYPES:
+            return False
+        if message_type != 'text' or (event.get('source') or {}).get('type') == 'user':
+            return True
+        return mentions_user(message, destination)
+
+    def filter(self, payload: dict) -> List[dict]:
+        """
+        Keep the events of a decoded webhook body that need handling.
+
+        Args:
+            payload: Decoded webhook body ({"destination": ..., "events": [...]})
+
+        Returns:
+            Raw events to handle, in their original order
+        """
+        destination = payload.get('destination', '')
+        events = payload.get('events') or []
+        kept = [event for event in events if self.is_relevant(event, destination)]
+        self.metrics['events'] += len(events)
+        self.metrics['dropped'] += len(events) - len(kept)
+        return kept
+
+    def build_event(self, raw_event: dict):
+        """
+        Build the SDK event object for a raw event returned by filter().
+        Called by the worker handling the event, not in the webhook request.
+
+        Args:
+            raw_event: Event object from the webhook body
+
+        Returns:
+            MessageEvent or PostbackEvent
+        """
+        return HANDLED_EVENT_TYPES[raw_event['type']].new_from_json_dict(raw_event)
+
+    def get_stats(self) -> dict:
+        """
+        Get filter counters.
+
+        Returns:
+            Dict with events received and events dropped
+        """
+        return dict(self.metrics)